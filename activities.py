@@ -0,0 +1,223 @@
+import json
+import os
+from collections import deque
+from datetime import date, timedelta
+
+from filelock import FileLock
+
+# 乡村亲子活动：活动类型 -> 具体活动
+ACTIVITY_TYPES = {
+    "农耕体验": ["插秧体验", "蔬菜采摘", "喂养小动物"],
+    "自然探索": ["昆虫观察", "植物标本制作", "野外定向"],
+    "手工制作": ["陶艺制作", "草编工艺", "农产品加工"],
+    "科普课堂": ["农业科技课", "生态系统探索", "食品安全课堂"],
+}
+
+TIME_SLOTS = ["上午 9:00-11:00", "下午 14:00-16:00"]
+
+# 每个 (活动, 日期, 时段) 的名额
+SLOT_CAPACITY = 20
+
+# 亲子年票：价格、有效期、每次同行人数上限
+PASS_PRICE = 300
+PASS_DAYS = 365
+PASS_MAX_PARTICIPANTS = 4
+
+
+class ActivityBookings:
+    # 亲子活动预订：按 (活动, 日期, 时段) 计数占用名额，满员后进入先进先出的候补队列，
+    # 取消预订时自动按顺序递补（活动日期已过的不再递补）；候补可随时退出，过期的候补由 expire_waitlists 清掉；
+    # 年票按持有人建索引校验。所有操作追加写入日志，重启时回放
+    # capacity_fn(活动, 日期, 时段) 可按活动日历返回特定日期的名额，返回 None 时使用默认名额
+
+    def __init__(self, path=None, capacity=SLOT_CAPACITY, capacity_fn=None):
+        self.path = path
+        self.capacity = capacity
+        self.capacity_fn = capacity_fn
+        # 多个进程共用同一个日志：每次操作在文件锁内先回放其他进程追加的新记录，再检查名额、追加
+        self._lock = FileLock(path + ".lock" if path else None)
+        self._offset = 0
+        self.booked = {}
+        self.waitlists = {}
+        self.waiting = {}
+        self.bookings = {}
+        self._by_holder = {}
+        self._waiting_by_holder = {}
+        self.passes = {}
+        self._next_id = 1
+        self._catch_up()
+
+    def _catch_up(self):
+        # 回放日志中 _offset 之后的完整记录（启动时即从头回放）
+        if not self.path or not os.path.exists(self.path) or os.path.getsize(self.path) == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(json.loads(line))
+                self._offset += len(line)
+
+    def refresh(self):
+        with self._lock:
+            self._catch_up()
+
+    def _log(self, op):
+        # 调用方持锁且已 _catch_up
+        self._apply(op)
+        if self.path:
+            line = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._offset += len(line)
+
+    def _apply(self, op):
+        kind = op["op"]
+        if kind == "book":
+            booking = op["booking"]
+            key = (booking["activity"], booking["date"], booking["slot"])
+            self.booked[key] = self.booked.get(key, 0) + booking["participants"]
+            self.bookings[booking["id"]] = booking
+            self._by_holder.setdefault(booking["holder"], set()).add(booking["id"])
+            self._next_id = max(self._next_id, booking["id"] + 1)
+        elif kind == "wait":
+            booking = op["booking"]
+            key = (booking["activity"], booking["date"], booking["slot"])
+            self.waitlists.setdefault(key, deque()).append(booking)
+            self.waiting[booking["id"]] = booking
+            self._waiting_by_holder.setdefault(booking["holder"], set()).add(booking["id"])
+            self._next_id = max(self._next_id, booking["id"] + 1)
+        elif kind == "promote":
+            key = tuple(op["key"])
+            booking = self._unwait(key, self.waitlists[key][0]["id"])
+            self._apply({"op": "book", "booking": booking})
+        elif kind == "leave":
+            booking = self.waiting[op["id"]]
+            self._unwait((booking["activity"], booking["date"], booking["slot"]), op["id"])
+        elif kind == "cancel":
+            booking = self.bookings.pop(op["id"])
+            self._by_holder[booking["holder"]].discard(op["id"])
+            key = (booking["activity"], booking["date"], booking["slot"])
+            self.booked[key] -= booking["participants"]
+        elif kind == "pass":
+            self.passes[op["holder"]] = op["expires"]
+
+    def _unwait(self, key, booking_id):
+        # 从候补队列与索引中移除一条候补，返回该候补
+        booking = self.waiting.pop(booking_id)
+        self._waiting_by_holder[booking["holder"]].discard(booking_id)
+        waitlist = self.waitlists[key]
+        if waitlist[0]["id"] == booking_id:
+            waitlist.popleft()
+        else:
+            waitlist.remove(booking)
+        if not waitlist:
+            del self.waitlists[key]
+        return booking
+
+    def capacity_of(self, activity, day, slot):
+        if self.capacity_fn is not None:
+            capacity = self.capacity_fn(activity, day, slot)
+            if capacity is not None:
+                return capacity
+        return self.capacity
+
+    def remaining(self, activity, day, slot):
+        return self.capacity_of(activity, day, slot) - self.booked.get((activity, day.isoformat(), slot), 0)
+
+    def waitlist_length(self, activity, day, slot):
+        return len(self.waitlists.get((activity, day.isoformat(), slot), ()))
+
+    def has_valid_pass(self, holder, today=None):
+        expires = self.passes.get(holder)
+        return expires is not None and expires >= (today or date.today()).isoformat()
+
+    def buy_pass(self, holder, today=None):
+        expires = ((today or date.today()) + timedelta(days=PASS_DAYS)).isoformat()
+        with self._lock:
+            self._catch_up()
+            self._log({"op": "pass", "holder": holder, "expires": expires})
+        return expires
+
+    def book(self, activity, day, slot, participants, holder="", use_pass=False, waitlist=False):
+        # 返回 ("confirmed", 预订) / ("waitlisted", 候补位次) / ("full", None)
+        if use_pass:
+            if not self.has_valid_pass(holder):
+                raise ValueError("未找到有效的亲子年票")
+            if participants > PASS_MAX_PARTICIPANTS:
+                raise ValueError(f"年票每次限{PASS_MAX_PARTICIPANTS}人同行")
+        key = (activity, day.isoformat(), slot)
+        with self._lock:
+            self._catch_up()
+            booking = {
+                "id": self._next_id,
+                "activity": activity,
+                "date": key[1],
+                "slot": slot,
+                "participants": int(participants),
+                "holder": holder,
+                "pass": bool(use_pass),
+            }
+            # 已有人候补时新预订也排到队尾，保证先来先得
+            capacity = self.capacity_of(activity, day, slot)
+            if not self.waitlists.get(key) and self.booked.get(key, 0) + participants <= capacity:
+                self._log({"op": "book", "booking": booking})
+                return "confirmed", booking
+            if not waitlist:
+                return "full", None
+            self._log({"op": "wait", "booking": booking})
+            return "waitlisted", len(self.waitlists[key])
+
+    def cancel(self, booking_id, today=None):
+        # 取消预订并按候补顺序递补，返回被递补的预订列表；活动日期已过时不递补，该时段的候补一并清掉
+        with self._lock:
+            self._catch_up()
+            booking = self.bookings.get(booking_id)
+            if booking is None:
+                return []
+            self._log({"op": "cancel", "id": booking_id})
+            key = (booking["activity"], booking["date"], booking["slot"])
+            if key[1] < (today or date.today()).isoformat():
+                for waiting in list(self.waitlists.get(key, ())):
+                    self._log({"op": "leave", "id": waiting["id"]})
+                return []
+            capacity = self.capacity_of(booking["activity"], date.fromisoformat(booking["date"]), booking["slot"])
+            promoted = []
+            waitlist = self.waitlists.get(key)
+            while waitlist and self.booked.get(key, 0) + waitlist[0]["participants"] <= capacity:
+                promoted.append(waitlist[0])
+                self._log({"op": "promote", "key": list(key)})
+                waitlist = self.waitlists.get(key)
+            return promoted
+
+    def leave_waitlist(self, booking_id):
+        # 退出候补，返回被移除的候补；已递补或不存在时返回 None
+        with self._lock:
+            self._catch_up()
+            booking = self.waiting.get(booking_id)
+            if booking is not None:
+                self._log({"op": "leave", "id": booking_id})
+            return booking
+
+    def expire_waitlists(self, today=None):
+        # 清掉活动日期已过的候补，返回清掉的条数
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            self._catch_up()
+            expired = [booking["id"] for key, waitlist in self.waitlists.items() if key[1] < today for booking in waitlist]
+            for booking_id in expired:
+                self._log({"op": "leave", "id": booking_id})
+            return len(expired)
+
+    def bookings_of(self, holder):
+        return [self.bookings[i] for i in sorted(self._by_holder.get(holder, ()))]
+
+    def waitlist_of(self, holder):
+        # 持有人的候补 [(候补, 当前位次), ...]
+        entries = []
+        for booking_id in sorted(self._waiting_by_holder.get(holder, ())):
+            booking = self.waiting[booking_id]
+            waitlist = self.waitlists[(booking["activity"], booking["date"], booking["slot"])]
+            entries.append((booking, next(i for i, queued in enumerate(waitlist, 1) if queued["id"] == booking_id)))
+        return entries
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# 传感器读数在线异常检测：每条数据流（农场 x 传感器）维护 EWMA 均值/方差与最近若干步变化量的环形缓冲，
+# 每来一个读数 O(1) 更新（缓冲长度固定），所有数据流的状态放在同一组数组里一次向量化更新
+
+# 异常类型（位标志）
+SPIKE = 1       # 跳变：本步变化量相对近期变化量的稳健 z 分数过大，且读数已偏离 EWMA 均值
+OUTLIER = 2     # 偏离：读数相对 EWMA 均值/标准差的 z 分数过大
+STUCK = 4       # 卡死：连续多个读数完全相同
+FLATLINE = 8    # 平线：读数仍有微小变化，但波动幅度塌缩到远低于该流的历史水平
+
+FLAG_LABELS = {SPIKE: "跳变", OUTLIER: "偏离", STUCK: "卡死", FLATLINE: "平线"}
+
+ALPHA = 0.3             # EWMA 衰减系数
+WINDOW = 8              # 稳健 z 分数使用的最近变化量个数
+Z_THRESHOLD = 4.0
+ROBUST_THRESHOLD = 5.0
+STUCK_RUN = 6           # 连续相同读数达到该个数判为卡死
+JITTER_ALPHA = 0.5      # 近期波动（|变化量| 的快速 EWMA）
+BASELINE_ALPHA = 0.05   # 历史波动（|变化量| 的慢速 EWMA，卡死/平线期间冻结）
+FLAT_RATIO = 0.01       # 近期波动 / 历史波动 低于该比例判为平线
+WARMUP = WINDOW + 1     # 每条流前若干个读数只更新状态不告警
+
+# 各传感器的噪声下限：标准差与变化量尺度不低于该值，避免平稳时段的正常抖动被放大成告警
+NOISE_FLOOR = {
+    "温度(°C)": 1.0,
+    "湿度(%)": 3.0,
+    "光照(lux)": 100.0,
+    "土壤湿度(%)": 3.0,
+}
+DEFAULT_NOISE_FLOOR = 1.0
+
+# MAD 换算成正态分布标准差
+_MAD_TO_SIGMA = 1.4826
+
+
+class StreamDetector:
+    def __init__(self, n_streams, floor=DEFAULT_NOISE_FLOOR):
+        self.n_streams = n_streams
+        self.floor = np.broadcast_to(np.asarray(floor, dtype=np.float64), (n_streams,)).copy()
+        self.count = np.zeros(n_streams, dtype=np.int64)
+        self.mean = np.zeros(n_streams)
+        self.var = np.zeros(n_streams)
+        self.last = np.zeros(n_streams)
+        self.steps = np.zeros((n_streams, WINDOW))
+        self.run = np.zeros(n_streams, dtype=np.int64)
+        self.jitter = np.zeros(n_streams)
+        self.baseline = np.zeros(n_streams)
+
+    def update(self, values, streams=None):
+        # 每条流一个新读数（streams 为空时按流号顺序给出全部流），返回 (标志, 评分)；NaN 读数跳过
+        streams = np.arange(self.n_streams) if streams is None else np.asarray(streams)
+        x = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(x)
+        streams, x = streams[present], x[present]
+        flags = np.zeros(len(present), dtype=np.int8)
+        scores = np.zeros(len(present))
+        if not len(x):
+            return flags, scores
+
+        count = self.count[streams]
+        floor = self.floor[streams]
+        mean, var = self.mean[streams], self.var[streams]
+        steps = self.steps[streams]
+        first = count == 0
+        step = np.where(first, 0.0, x - self.last[streams])
+
+        # 先用更新前的状态打分
+        std = np.sqrt(var)
+        z = (x - mean) / np.maximum(std, floor)
+        median = np.median(steps, axis=1)
+        mad = np.median(np.abs(steps - median[:, None]), axis=1)
+        robust_z = (step - median) / np.maximum(mad * _MAD_TO_SIGMA, floor)
+        run = np.where(first | (step != 0), 0, self.run[streams] + 1)
+        jitter = self.jitter[streams] + JITTER_ALPHA * (np.abs(step) - self.jitter[streams])
+        baseline = self.baseline[streams]
+
+        armed = count >= WARMUP
+        spike = armed & (np.abs(robust_z) > ROBUST_THRESHOLD) & (np.abs(z) > Z_THRESHOLD / 2)
+        outlier = armed & (np.abs(z) > Z_THRESHOLD)
+        stuck = run >= STUCK_RUN - 1
+        flat = armed & ~stuck & (jitter < FLAT_RATIO * baseline)
+        flag = spike * SPIKE | outlier * OUTLIER | stuck * STUCK | flat * FLATLINE
+
+        # 异常读数截断到阈值再并入统计，避免一次尖峰把均值和方差带偏
+        limit = Z_THRESHOLD * np.maximum(std, floor)
+        diff = np.where(armed, np.clip(x - mean, -limit, limit), x - mean)
+        self.mean[streams] = np.where(first, x, mean + ALPHA * diff)
+        self.var[streams] = np.where(first, 0.0, (1 - ALPHA) * (var + ALPHA * diff ** 2))
+        self.steps[streams, count % WINDOW] = np.where(first, 0.0, step)
+        self.baseline[streams] = np.where(stuck | flat, baseline, baseline + BASELINE_ALPHA * (np.abs(step) - baseline))
+        self.last[streams] = x
+        self.run[streams] = run
+        self.jitter[streams] = jitter
+        self.count[streams] = count + 1
+
+        flags[present] = flag
+        scores[present] = np.maximum(np.abs(z), np.abs(robust_z))
+        return flags, scores
+
+    def scan(self, matrix):
+        # matrix: (时间步, 流数) 的读数矩阵，逐时间步更新，返回同形状的 (标志, 评分)
+        matrix = np.asarray(matrix, dtype=np.float64)
+        flags = np.zeros(matrix.shape, dtype=np.int8)
+        scores = np.zeros(matrix.shape)
+        for t in range(len(matrix)):
+            flags[t], scores[t] = self.update(matrix[t])
+        return flags, scores
+
+
+def flag_names(flag):
+    return "、".join(label for bit, label in FLAG_LABELS.items() if flag & bit)
+
+
+def detect_frames(frames, columns):
+    # frames: {农场: DataFrame(时间 + 指标列)}；所有农场与指标作为独立数据流一起扫描，
+    # 返回告警表（农场, 时间, 指标, 数值, 类型, 评分），按时间倒序
+    farms = list(frames)
+    length = min(len(frame) for frame in frames.values()) if frames else 0
+    if not length:
+        return pd.DataFrame(columns=["农场", "时间", "指标", "数值", "类型", "评分"])
+    matrix = np.hstack([frames[farm][columns].to_numpy(dtype=np.float64)[-length:] for farm in farms])
+    floor = np.tile([NOISE_FLOOR.get(column, DEFAULT_NOISE_FLOOR) for column in columns], len(farms))
+    flags, scores = StreamDetector(matrix.shape[1], floor).scan(matrix)
+    t_idx, s_idx = np.nonzero(flags)
+    farm_idx, col_idx = np.divmod(s_idx, len(columns))
+    alerts = pd.DataFrame({
+        "农场": [farms[i] for i in farm_idx],
+        "时间": [frames[farms[f]]["时间"].iloc[len(frames[farms[f]]) - length + t] for f, t in zip(farm_idx, t_idx)],
+        "指标": [columns[i] for i in col_idx],
+        "数值": matrix[t_idx, s_idx],
+        "类型": [flag_names(flag) for flag in flags[t_idx, s_idx]],
+        "评分": scores[t_idx, s_idx].round(1),
+    })
+    return alerts.sort_values("时间", ascending=False, kind="stable").reset_index(drop=True)
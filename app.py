@@ -10,6 +10,31 @@ import json
 from datetime import datetime, timedelta
 import random
 
+from logistics import RfidEventLog, new_order_id
+from plots import PlotInventory, PLOT_SHAPES
+from yield_estimator import CROP_PARAMS, crops_for_season, estimate_all, format_quote
+from homestays import AvailabilityCalendar, HomestayPricing, HOMESTAYS, HORIZON_DAYS
+from membership import MembershipLedger, resolve_discount, FREE_STAY, FARM_ACTIVITY, FREE_ACTIVITY_TYPES, TIERS
+from activities import ActivityBookings, ACTIVITY_TYPES, TIME_SLOTS, PASS_PRICE, PASS_MAX_PARTICIPANTS
+from events import EventCalendar, Weekly
+from platform_stats import PlatformStats
+from carbon import CarbonLedger, cart_carbon
+from recommend import CoPurchaseIndex
+from search import ProductSearchIndex
+from catalog import CatalogStore, MALL, FRESH, diff as catalog_diff
+from dispatch import FulfilmentDispatcher
+from telemetry import TelemetryStore, overlay, SENSOR_COLUMNS
+from anomaly import detect_frames
+from forecast import SeasonalForecaster, forecast_frame, FORECAST_COLUMNS, HISTORY_HOURS, HORIZONS
+from assets import AssetRegistry
+from session import SessionStore, TOKEN_PARAM, new_token, valid_token
+from journal import EventJournal, EVENT_TYPES
+import metrics
+
+# 本次运行总耗时，页面末尾结束计时
+metrics.serve()
+rerun_span = metrics.start("整页运行")
+
 # 确保目录存在
 os.makedirs("data", exist_ok=True)
 os.makedirs("images", exist_ok=True)
@@ -36,6 +61,19 @@ st.set_page_config(
     }
 )
 
+# 会话状态外置（多进程部署时任一进程都能接续同一用户的登录、购物车与订单，后端见 session.py）
+@st.cache_resource
+def load_session_store():
+    return SessionStore.from_env()
+
+session_store = load_session_store()
+session_token = st.query_params.get(TOKEN_PARAM)
+if not valid_token(session_token):
+    session_token = new_token()
+    st.query_params[TOKEN_PARAM] = session_token
+with metrics.section("会话读取"):
+    session_store.restore(session_token, st.session_state)
+
 # 自定义CSS样式
 st.markdown("""
 <style>
@@ -79,6 +117,14 @@ st.markdown("""
         border-left: 5px solid #2196F3;
         margin: 1rem 0;
     }
+    .asset-figure {
+        margin: 0 0 1rem 0;
+    }
+    .asset-figure figcaption {
+        text-align: center;
+        color: #757575;
+        font-size: 0.875rem;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -106,6 +152,7 @@ with st.sidebar:
                     st.session_state.user_logged_in = True
                     st.session_state.username = username
                     st.session_state.user_role = user["role"]
+                    st.query_params[TOKEN_PARAM] = session_store.rotate(session_token, st.session_state)
                     st.success(f"欢迎回来，{username}！您的身份是：{user['role']}")
                     st.rerun()
                     break
@@ -118,6 +165,8 @@ with st.sidebar:
         if st.button("退出登录"):
             st.session_state.user_logged_in = False
             st.session_state.username = ""
+            st.session_state.pop("user_role", None)
+            st.query_params[TOKEN_PARAM] = session_store.rotate(session_token, st.session_state)
             st.rerun()
     
     st.markdown("---")
@@ -150,150 +199,42 @@ with st.sidebar:
     st.markdown("<div class='footer'>© 2025 绿链智田 版权所有</div>", unsafe_allow_html=True)
 
 # 3. 模拟数据准备
-# 商品数据
-@st.cache_data
-def load_products():
-    products = {
-        "有机大米": {
-            "price": 20, 
-            "origin": "河北农场", 
-            "trace_id": "XM12345", 
-            "stock": 100,
-            "description": "纯天然有机种植，无农药残留，口感醇厚",
-            "image": "images/resized/有机大米.png",
-            "carbon": 0.5,
-            "category": "粮油"
-        },
-        "茶叶": {
-            "price": 35,
-            "origin": "福建农场",
-            "trace_id": "CY13579",
-            "stock": 120,
-            "description": "高山云雾茶，清香醇厚，回甘持久",
-            "image": "images/resized/茶叶.png",
-            "carbon": 0.2,
-            "category": "饮品"
-        },
-        "面粉": {
-            "price": 18,
-            "origin": "河南农场",
-            "trace_id": "MF24680",
-            "stock": 150,
-            "description": "优质小麦研磨，细腻柔滑，适合烘焙",
-            "image": "images/resized/面粉.png",
-            "carbon": 0.3,
-            "category": "粮油"
-        },
-        "食用油": {
-            "price": 45,
-            "origin": "山东农场",
-            "trace_id": "SY35791",
-            "stock": 100,
-            "description": "物理压榨，零添加，健康食用",
-            "image": "images/resized/食用油.png",
-            "carbon": 0.4,
-            "category": "粮油"
-        },
-        "低碳苹果": {
-            "price": 15, 
-            "origin": "山东农场", 
-            "trace_id": "AP67890", 
-            "stock": 150,
-            "description": "低碳种植技术，减少30%碳排放，果肉脆甜",
-            "image": "images/resized/苹果.png",
-            "carbon": 0.3,
-            "category": "水果"
-        },
-        "生态蜂蜜": {
-            "price": 50, 
-            "origin": "云南农场", 
-            "trace_id": "HM54321", 
-            "stock": 80,
-            "description": "高山野生蜂蜜，纯天然无添加，营养丰富",
-            "image": "images/resized/生态蜂蜜.png",
-            "carbon": 0.2,
-            "category": "调味品"
-        },
-        "有机菠菜": {
-            "price": 8, 
-            "origin": "江苏农场", 
-            "trace_id": "BS78901", 
-            "stock": 200,
-            "description": "富含铁质和维生素，有机种植，新鲜采摘",
-            "image": "images/resized/菠菜.png",
-            "carbon": 0.1,
-            "category": "蔬菜"
-        },
-        "土鸡蛋": {
-            "price": 25, 
-            "origin": "安徽农场", 
-            "trace_id": "JD24680", 
-            "stock": 120,
-            "description": "散养土鸡产蛋，蛋黄色泽金黄，营养丰富",
-            "image": "images/resized/鸡蛋.png",
-            "carbon": 0.4,
-            "category": "禽蛋"
-        }
-    }
-    return products
+# 商品目录（内存映射的列式快照，落盘到 data/catalog，python catalog.py 发布新版本后热加载）
+@st.cache_resource
+def load_catalog_store():
+    return CatalogStore("data/catalog", seed="data/catalog.json")
 
-# 生鲜直供数据
-@st.cache_data
-def load_fresh_items():
-    fresh_items = {
-        "生态西红柿": {
-            "price": 15, 
-            "origin": "河北农场", 
-            "delivery_time": 6,
-            "image": "https://img.zcool.cn/community/01f9c55d31a173a8012187f4c1f5ba.jpg@1280w_1l_2o_100sh.jpg"
-        },
-        "新鲜土豆": {
-            "price": 10, 
-            "origin": "甘肃农场", 
-            "delivery_time": 8,
-            "image": "https://img.zcool.cn/community/01a4a85af3c3c9a801219741cd7b8b.jpg@1280w_1l_2o_100sh.jpg"
-        },
-        "有机白菜": {
-            "price": 8, 
-            "origin": "山东农场", 
-            "delivery_time": 5,
-            "image": "https://img.zcool.cn/community/01c2ce5d0e9f8aa801219c7748b2b9.jpg@1280w_1l_2o_100sh.jpg"
-        },
-        "山区胡萝卜": {
-            "price": 12, 
-            "origin": "陕西农场", 
-            "delivery_time": 7,
-            "image": "https://img.zcool.cn/community/01d0f05af3c3c9a801219741f6c3a0.jpg@1280w_1l_2o_100sh.jpg"
-        }
-    }
-    return fresh_items
+# 商城每页显示的商品数
+PAGE_SIZE = 30
+
+# 各农场气候差异：(温度偏移°C, 土壤湿度偏移%)
+FARM_CLIMATE = {
+    "河北农场": (-2.0, -3.0),
+    "山东农场": (0.0, 2.0),
+    "云南农场": (3.0, 5.0),
+}
 
 # 农场监测数据（模拟）
 @st.cache_data
-def generate_farm_data():
+def generate_farm_data(farm="河北农场", hours=24):
+    temp_offset, soil_offset = FARM_CLIMATE[farm]
     now = datetime.now()
-    dates = [now - timedelta(hours=i) for i in range(24)]
+    dates = [now - timedelta(hours=i) for i in range(hours)]
     dates.reverse()
     
     # 生成更真实的温度数据（白天高，晚上低）
     temperatures = []
     for date in dates:
         hour = date.hour
-        # 模拟日夜温差
-        if 6 <= hour <= 18:  # 白天
-            base_temp = 25 + 5 * np.sin(np.pi * (hour - 6) / 12)
-        else:  # 晚上
-            if hour < 6:
-                base_temp = 20 - 5 * np.sin(np.pi * hour / 12)
-            else:
-                base_temp = 20 - 5 * np.sin(np.pi * (hour - 18) / 6)
+        # 模拟日夜温差（正午最高、午夜最低，连续变化）
+        base_temp = 22.5 + 7.5 * np.sin(np.pi * (hour - 6) / 12)
         
         # 添加随机波动
-        temp = base_temp + np.random.uniform(-1, 1)
+        temp = base_temp + temp_offset + np.random.uniform(-1, 1)
         temperatures.append(temp)
     
     # 湿度与温度有一定反相关
-    humidity = [max(min(100 - temp + np.random.uniform(40, 50), 95), 40) for temp in temperatures]
+    humidity = [max(min(100 - temp + np.random.uniform(-5, 5), 95), 40) for temp in temperatures]
     
     # 光照强度（白天高，晚上低）
     light = []
@@ -307,7 +248,7 @@ def generate_farm_data():
         light.append(max(0, light_value))
     
     # 土壤湿度（较为稳定，有小幅波动）
-    soil_moisture = [60 + np.random.uniform(-5, 5) for _ in range(24)]
+    soil_moisture = [60 + soil_offset + np.random.uniform(-5, 5) for _ in range(hours)]
     
     farm_data = pd.DataFrame({
         "时间": dates,
@@ -319,14 +260,176 @@ def generate_farm_data():
     
     return farm_data
 
+# 农场传感器导入数据（进程内共享，落盘到 data/telemetry，监测面板读取小时汇总）
+@st.cache_resource
+def load_telemetry_store():
+    return TelemetryStore("data/telemetry")
+
+# 温度/土壤湿度预测模型（进程内共享，每个农场一组，新数据到达时增量更新）
+@st.cache_resource
+def load_forecasters():
+    return {farm: SeasonalForecaster(len(FORECAST_COLUMNS)) for farm in FARM_CLIMATE}
+
+# 图片静态资源（按显示宽度缩放、内容哈希命名，写入 static/img 由静态服务提供）
+@st.cache_resource
+def load_asset_registry():
+    return AssetRegistry()
+
+# RFID物流事件日志（进程内共享，落盘到 data/rfid）
+@st.cache_resource
+def load_rfid_log():
+    return RfidEventLog("data/rfid")
+
+# 共享农庄地块库存（进程内共享，落盘到 data/plots.json）
+@st.cache_resource
+def load_plot_inventory():
+    return PlotInventory("data/plots.json")
+
+# 民宿房态日历（进程内共享，落盘到 data/bookings.json）
+@st.cache_resource
+def load_homestay_calendar():
+    return AvailabilityCalendar("data/bookings.json")
+
+# 民宿动态房价表（规则变更时重建）
+@st.cache_resource
+def load_homestay_pricing():
+    return HomestayPricing()
+
+# 会员权益台账（进程内共享，落盘到 data/membership）
+@st.cache_resource
+def load_member_ledger():
+    return MembershipLedger("data/membership")
+
+# 活动日历（重复规则按月惰性展开并缓存）
+@st.cache_resource
+def load_event_calendar():
+    return EventCalendar()
+
+# 亲子活动名额、候补与年票（进程内共享，落盘到 data/activities.jsonl），活动日名额取自活动日历
+@st.cache_resource
+def load_activity_bookings():
+    return ActivityBookings("data/activities.jsonl", capacity_fn=load_event_calendar().slot_capacity)
+
+@metrics.timed("活动日历")
+def render_event_calendar(audience, limit=5, days=90):
+    # 未来90天的节庆/特别活动，每周例行活动单独汇总一行
+    weekday_names = "一二三四五六日"
+    special = [(day, rule) for day, rule in event_calendar.upcoming(days, audience) if not isinstance(rule, Weekly)]
+    if not special:
+        st.write(f"近{days}天暂无节庆活动")
+    for i, (day, rule) in enumerate(special[:limit], start=1):
+        st.write(f"{i}. {day.month}月{day.day}日 - {rule.title}（{rule.farm}）")
+    weekly = [rule for rule in event_calendar.rules if isinstance(rule, Weekly) and rule.audience == audience]
+    for rule in weekly:
+        st.write(f"每周{weekday_names[rule.weekday]} - {rule.title}")
+
+# 首页平台数据（增量维护，落盘到 data/platform_stats）
+@st.cache_resource
+def load_platform_stats():
+    stats = PlatformStats("data/platform_stats")
+    with open("data/users.json", "r", encoding="utf-8") as f:
+        users_data = json.load(f)
+    stats.register(farmers=[user["username"] for user in users_data["users"] if user["role"] == "农户"], farms=FARM_CLIMATE)
+    return stats
+
+# 家庭直供履约调度（农场库存落盘到 data/dispatch，首次启动取 data/farm_stock.json）
+@st.cache_resource
+def load_dispatcher():
+    return FulfilmentDispatcher("data/dispatch/stock.json", seed="data/farm_stock.json")
+
+# 碳足迹账本（进程内共享，落盘到 data/carbon）
+@st.cache_resource
+def load_carbon_ledger():
+    return CarbonLedger("data/carbon")
+
+# 交易日志（进程内共享，组提交落盘到 data/journal，重启时从最新快照恢复）
+@st.cache_resource
+def load_journal():
+    return EventJournal("data/journal")
+
+# 经常一起购买索引（由 python recommend.py 离线重建）
+@st.cache_resource
+def load_copurchase_index():
+    return CoPurchaseIndex("data/recommend")
+
+# 商品搜索索引，商品目录变化时增量更新
+@st.cache_resource
+def load_search_index():
+    return ProductSearchIndex()
+
+# 上次同步过的目录快照，新版本只与它比较差异
+@st.cache_resource
+def load_synced_catalog():
+    return {"snapshot": None}
+
+# 每批物化的商品行数（首次同步时为全部商品，分批避免一次性生成全部商品字典）
+CATALOG_SYNC_BATCH = 200_000
+
+# 商品目录每个版本只同步一次：按名称/内容哈希列与上一快照求差，只物化新增或变更的行，
+# 登记基地与商品数、增量更新搜索索引
+@st.cache_resource(max_entries=1)
+def sync_catalog(version, _catalog):
+    synced = load_synced_catalog()
+    previous = synced["snapshot"]
+    changed, _ = catalog_diff(previous, _catalog)
+    platform_stats.register(farms=set(_catalog.dictionaries["origin"]) - {""}, skus=[_catalog.text["name"][row] for row in changed.tolist()])
+    changed, removed = catalog_diff(previous, _catalog, MALL)
+    removed_names = [previous.text["name"][row] for row in removed.tolist()]
+    for start in range(0, max(len(changed), 1), CATALOG_SYNC_BATCH):
+        search_index.update(_catalog.records(changed[start:start + CATALOG_SYNC_BATCH]), removed_names if start == 0 else ())
+    synced["snapshot"] = _catalog
+    return version
+
+# 认种产量预估：同一数据版本下所有 农场 x 作物 x 面积 组合一次算出并缓存
+@st.cache_data
+def estimate_plot_yields(data_version, catalog_prices, _telemetry):
+    return estimate_all(_telemetry, catalog_prices)
+
+# 传感器异常检测：同一数据版本下所有农场的全部传感器流一起扫描一次
+@st.cache_data
+def detect_sensor_anomalies(data_version, _telemetry):
+    return detect_frames(_telemetry, list(SENSOR_COLUMNS.values()))
+
+# 温度/土壤湿度短期预测：数据版本变化时才吸收新数据，页面浏览直接读缓存
+@st.cache_data
+def forecast_farms(data_version, _history):
+    forecasters = load_forecasters()
+    return {farm: forecast_frame(forecasters[farm], history, FORECAST_COLUMNS, max(HORIZONS)) for farm, history in _history.items()}
+
 # 加载数据
-products = load_products()
-fresh_items = load_fresh_items()
-farm_data = generate_farm_data()
+with metrics.section("加载数据"):
+    catalog_store = load_catalog_store()
+    catalog = catalog_store.current()
+    telemetry_store = load_telemetry_store()
+    asset_registry = load_asset_registry()
+    # 有导入数据的农场用小时均值替换模拟值；预测使用最近72小时，其余模块使用最近24小时
+    farm_history = {farm: overlay(generate_farm_data(farm, HISTORY_HOURS), telemetry_store.hourly(farm, HISTORY_HOURS)) for farm in FARM_CLIMATE}
+    farm_telemetry = {farm: history.tail(24).reset_index(drop=True) for farm, history in farm_history.items()}
+    data_version = tuple(str(df["时间"].iloc[-1]) for df in farm_telemetry.values()) + (telemetry_store.version,)
+    rfid_log = load_rfid_log()
+    plot_inventory = load_plot_inventory()
+    homestay_calendar = load_homestay_calendar()
+    homestay_pricing = load_homestay_pricing()
+    member_ledger = load_member_ledger()
+    event_calendar = load_event_calendar()
+    activity_bookings = load_activity_bookings()
+    platform_stats = load_platform_stats()
+    carbon_ledger = load_carbon_ledger()
+    dispatcher = load_dispatcher()
+    copurchase_index = load_copurchase_index()
+    copurchase_index.refresh()
+    # 地块、房态、库存、活动名额可能被其他进程改过，渲染前读入（文件未变时只做一次 stat）
+    for shared_store in (plot_inventory, homestay_calendar, dispatcher, activity_bookings):
+        shared_store.refresh()
+    journal = load_journal()
+    journal.refresh()
+    search_index = load_search_index()
+    sync_catalog(catalog.version, catalog)
 
 # 4. 功能模块实现
 # 4.0 首页
 # 3. 主页内容
+page_span = metrics.start(f"页面:{page}", sample_profile=True)
 if page == "首页":
     st.markdown("<h1 class='main-header'>绿链智田 - 低碳智慧供应链赋能乡村振兴平台</h1>", unsafe_allow_html=True)
     
@@ -395,52 +498,80 @@ if page == "首页":
     # 数据展示
     st.markdown("<h2 class='sub-header'>平台数据</h2>", unsafe_allow_html=True)
     col1, col2, col3, col4 = st.columns(4)
+    stats = platform_stats.snapshot()
+    
+    def format_delta(delta):
+        return None if delta is None else f"{delta:+.0f}%"
     
     with col1:
-        st.metric("服务农户", "10,000+", "+15%")
+        value, delta = stats["服务农户"]
+        st.metric("服务农户", f"{value:,}", format_delta(delta))
     
     with col2:
-        st.metric("合作基地", "100+", "+8%")
+        value, delta = stats["合作基地"]
+        st.metric("合作基地", f"{value:,}", format_delta(delta))
     
     with col3:
-        st.metric("产品品类", "500+", "+20%")
+        value, delta = stats["产品品类"]
+        st.metric("产品品类", f"{value:,}", format_delta(delta))
     
     with col4:
-        st.metric("年交易额", "¥5000万", "+25%")
+        value, delta = stats["年交易额"]
+        st.metric("年交易额", f"¥{value / 10000:.1f}万" if value >= 10000 else f"¥{value:,.0f}", format_delta(delta))
 
 # 4.1 农产品自营商城
 elif page == "农产品自营商城":
     st.markdown("<h1 class='main-header'>农产品自营商城</h1>", unsafe_allow_html=True)
     st.markdown("<p>浏览高品质农特产品，区块链溯源确保安全透明。</p>", unsafe_allow_html=True)
     
-    # 商品筛选
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        category_filter = st.selectbox(
-            "商品分类", 
-            ["全部"] + list(set(product["category"] for product in products.values()))
-        )
-    
-    with col2:
-        price_range = st.slider("价格范围", 0, 100, (0, 100))
+    # 商品搜索与筛选放在同一个表单里，填完点"应用筛选"才重跑一次，输入过程中不触发重跑
+    mall_rows = catalog.rows(MALL)
+    with st.form("mall_filters"):
+        search_query = st.text_input("搜索商品", placeholder="输入商品名称、描述、产地或分类，如：有机、云南、茶")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            category_filter = st.selectbox(
+                "商品分类", 
+                ["全部"] + [catalog.dictionaries["category"][code] for code in np.unique(catalog.columns["category"][mall_rows])]
+            )
+        
+        with col2:
+            price_range = st.slider("价格范围", 0, 100, (0, 100))
+        
+        with col3:
+            # 有搜索词时按相关度排列，没有搜索词时"相关度"即默认顺序
+            sort_by = st.selectbox("排序方式", ["相关度", "价格从低到高", "价格从高到低", "碳足迹从低到高"])
+        
+        st.form_submit_button("应用筛选")
     
-    with col3:
-        sort_by = st.selectbox("排序方式", ["价格从低到高", "价格从高到低", "碳足迹从低到高"])
-    
-    # 筛选和排序商品
-    filtered_products = {}
-    for name, info in products.items():
-        if (category_filter == "全部" or info["category"] == category_filter) and \
-           (price_range[0] <= info["price"] <= price_range[1]):
-            filtered_products[name] = info
-    
-    # 排序
-    if sort_by == "价格从低到高":
-        sorted_products = dict(sorted(filtered_products.items(), key=lambda item: item[1]["price"]))
-    elif sort_by == "价格从高到低":
-        sorted_products = dict(sorted(filtered_products.items(), key=lambda item: item[1]["price"], reverse=True))
-    else:  # 碳足迹从低到高
-        sorted_products = dict(sorted(filtered_products.items(), key=lambda item: item[1]["carbon"]))
+    with metrics.section("商城:筛选排序"):
+        # 有搜索词时只保留命中的商品，按 BM25 相关度排列
+        if search_query.strip():
+            rows = np.array([catalog.find(name) for name, _ in search_index.search(search_query, limit=len(mall_rows))], dtype=np.int64)
+            rows = rows[rows >= 0]
+        else:
+            rows = mall_rows
+    
+        # 筛选和排序商品：直接在内存映射的列上计算，只取出当前页的商品
+        prices = catalog.columns["price"][rows]
+        mask = (prices >= price_range[0]) & (prices <= price_range[1])
+        if category_filter != "全部":
+            mask &= catalog.columns["category"][rows] == catalog.dictionaries["category"].index(category_filter)
+        rows = rows[mask]
+    
+        # 排序
+        if sort_by == "价格从低到高":
+            rows = rows[np.argsort(catalog.columns["price"][rows], kind="stable")]
+        elif sort_by == "价格从高到低":
+            rows = rows[np.argsort(-catalog.columns["price"][rows], kind="stable")]
+        elif sort_by == "碳足迹从低到高":
+            rows = rows[np.argsort(catalog.columns["carbon"][rows], kind="stable")]
+    
+        # 分页
+        page_count = (len(rows) + PAGE_SIZE - 1) // PAGE_SIZE
+        page_number = st.number_input(f"页码（共{page_count}页，{len(rows)}件商品）", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+        sorted_products = catalog.records(rows[(page_number - 1) * PAGE_SIZE:page_number * PAGE_SIZE])
     
     # 商品展示
     if not sorted_products:
@@ -464,16 +595,20 @@ elif page == "农产品自营商城":
                         </div>
                         """, unsafe_allow_html=True)
                         
-                        try:
-                            st.image(product_info["image"], width=300)
-                        except Exception as e:
-                            st.image("images/resized/placeholder.svg", width=300)
+                        with metrics.section("商城:商品图片"):
+                            st.markdown(asset_registry.img(product_info["image"], width=300, fallback="images/resized/placeholder.svg"), unsafe_allow_html=True)
                         st.write(product_info["description"])
                         
+                        # 经常一起购买
+                        bought_together = copurchase_index.suggest(product_name)
+                        if bought_together:
+                            st.caption(f"经常一起购买：{'、'.join(bought_together)}")
+                        
                         # 区块链溯源查询
                         if st.button(f"查询溯源信息 #{product_name}", key=f"trace_{product_name}"):
                             with st.spinner("正在查询区块链数据..."):
-                                time.sleep(1)  # 模拟查询延迟
+                                with metrics.section("模拟延迟"):
+                                    time.sleep(1)  # 模拟查询延迟
                                 st.success(f"""
                                 溯源结果：{product_name}
                                 - 种植日期：2025-01-15
@@ -512,23 +647,19 @@ elif page == "农产家庭直供":
     
     # 商品网格布局
     cols = st.columns(3)
-    fresh_items_list = [
-        {"name": "生态西红柿", "price": 8, "origin": "河北农场", "delivery_time": 6, "image": "images/resized/西红柿.png"},
-        {"name": "有机白菜", "price": 6, "origin": "山东农场", "delivery_time": 5, "image": "images/resized/白菜.png"},
-        {"name": "新鲜土豆", "price": 5, "origin": "甘肃农场", "delivery_time": 8, "image": "images/resized/土豆.png"},
-        {"name": "紫皮茄子", "price": 7, "origin": "河南农场", "delivery_time": 6, "image": "images/resized/茄子.png"},
-        {"name": "山区胡萝卜", "price": 4, "origin": "陕西农场", "delivery_time": 7, "image": "images/resized/胡萝卜.png"},
-        {"name": "新鲜辣椒", "price": 6, "origin": "四川农场", "delivery_time": 6, "image": "images/resized/辣椒.png"}
-    ]
-    
+    fresh_items_list = [catalog.record(row) for row in catalog.rows(FRESH)[:PAGE_SIZE].tolist()]
+    # 按当前填写的配送地址（未填写按北京）为每件商品选出送达最快的农场
+    fresh_address = st.session_state.get("fresh_address", "")
     for i, item in enumerate(fresh_items_list):
         with cols[i % 3]:
-            st.image(item["image"], caption=item["name"], width=300)
+            st.markdown(asset_registry.img(item["image"], width=300, caption=item["name"]), unsafe_allow_html=True)
+            plan = dispatcher.plan(item["name"], fresh_address)
+            eta_text = f"约{plan['eta_hours']:.0f}小时（发往{plan['city']}）" if plan else "暂无可配送的农场库存"
             st.markdown(f"""
             <div class='card'>
                 <p>价格：¥{item['price']}/斤</p>
-                <p>产地：{item['origin']}</p>
-                <p>预计配送时间：{item['delivery_time']}小时内</p>
+                <p>发货农场：{plan['farm'] if plan else item['origin']}</p>
+                <p>预计配送时间：{eta_text}</p>
             </div>
             """, unsafe_allow_html=True)
             
@@ -547,24 +678,49 @@ elif page == "农产家庭直供":
     
     with col1:
         st.subheader("配送信息")
-        address = st.text_input("配送地址")
+        address = st.text_input("配送地址", key="fresh_address")
         phone = st.text_input("联系电话")
         
         if 'selected_item' in st.session_state and st.button("立即下单"):
+            decision = None
             if address and phone:
+                decision = dispatcher.reserve(st.session_state.selected_item["name"], address, st.session_state.selected_quantity)
+                if decision is None:
+                    st.error("该地址暂无可配送的农场库存，请减少数量或更换商品")
+            if decision is not None:
                 with st.spinner("正在处理订单..."):
-                    time.sleep(1)
+                    with metrics.section("模拟延迟"):
+                        time.sleep(1)
+                    order_id = new_order_id()
+                    # 下单即写入"订单已确认"扫描事件
+                    rfid_log.ingest([order_id], [0], [int(time.time())])
+                    platform_stats.record_order(st.session_state.selected_total)
+                    selected_item = st.session_state.selected_item
+                    product_carbon, delivery_carbon = carbon_ledger.record_order(
+                        st.session_state.username or "游客",
+                        [(decision["farm"], selected_item["category"], selected_item["carbon"], st.session_state.selected_quantity)],
+                        address
+                    )
+                    journal.append("order", st.session_state.username or "游客", {
+                        "order_id": order_id,
+                        "items": [[selected_item["name"], st.session_state.selected_quantity]],
+                        "farm": decision["farm"],
+                    }, st.session_state.selected_total)
                     st.session_state.orders.append({
+                        "order_id": order_id,
                         "item": st.session_state.selected_item["name"],
                         "quantity": st.session_state.selected_quantity,
                         "total": st.session_state.selected_total,
                         "address": address,
                         "phone": phone,
                         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "farm": decision["farm"],
+                        "promised_at": decision["promised_at"].strftime("%Y-%m-%d %H:%M"),
                         "status": "已下单"
                     })
-                    st.success(f"已下单：{st.session_state.selected_item['name']} {st.session_state.selected_quantity}斤，预计{st.session_state.selected_item['delivery_time']}小时送达！")
-            else:
+                    st.success(f"已下单：{st.session_state.selected_item['name']} {st.session_state.selected_quantity}斤，由{decision['farm']}发货，预计{decision['promised_at'].strftime('%m月%d日%H:%M')}前送达！")
+                    st.info(f"本单碳足迹：{product_carbon + delivery_carbon:.2f}kg（商品{product_carbon:.2f}kg + 配送{delivery_carbon:.2f}kg）")
+            elif not (address and phone):
                 st.error("请填写完整的配送信息")
     
     with col2:
@@ -584,48 +740,23 @@ elif page == "农产家庭直供":
             st.subheader("订单状态")
             st.write(f"商品：{selected_order['item']} x {selected_order['quantity']}斤")
             st.write(f"下单时间：{selected_order['time']}")
+            if "promised_at" in selected_order:
+                st.write(f"发货农场：{selected_order['farm']}，承诺送达：{selected_order['promised_at']}")
             
-            # 模拟物流状态
-            with st.spinner("正在查询物流信息..."):
-                time.sleep(1)
-                
-                # 根据下单时间计算当前物流状态
-                order_time = datetime.strptime(selected_order['time'], "%Y-%m-%d %H:%M:%S")
-                now = datetime.now()
-                hours_passed = (now - order_time).total_seconds() / 3600
-                
-                # 物流状态进度条
-                if hours_passed < 1:
-                    progress = 0.2
-                    status = "订单已确认，正在准备"
-                elif hours_passed < 2:
-                    progress = 0.4
-                    status = "农场采摘完成"
-                elif hours_passed < 3:
-                    progress = 0.6
-                    status = "RFID分拣完成，正在配送中"
-                elif hours_passed < 4:
-                    progress = 0.8
-                    status = "已到达配送站点，即将送达"
-                else:
-                    progress = 1.0
-                    status = "已送达"
-                
-                st.progress(progress)
-                st.write(f"当前状态：{status}")
-                
-                # 物流详情
-                st.write("物流详情：")
-                if hours_passed >= 0:
-                    st.write(f"- {order_time.strftime('%H:%M:%S')} 订单已确认，正在准备")
-                if hours_passed >= 1:
-                    st.write(f"- {(order_time + timedelta(hours=1)).strftime('%H:%M:%S')} 农场采摘完成")
-                if hours_passed >= 2:
-                    st.write(f"- {(order_time + timedelta(hours=2)).strftime('%H:%M:%S')} RFID分拣完成，正在配送中")
-                if hours_passed >= 3:
-                    st.write(f"- {(order_time + timedelta(hours=3)).strftime('%H:%M:%S')} 已到达配送站点，即将送达")
-                if hours_passed >= 4:
-                    st.write(f"- {(order_time + timedelta(hours=4)).strftime('%H:%M:%S')} 已送达")
+            # 物流状态直接读取RFID最新事件索引
+            if "order_id" in selected_order:
+                progress, status = rfid_log.status(selected_order["order_id"])
+                timeline = rfid_log.timeline(selected_order["order_id"])
+            else:
+                progress, status, timeline = 0.0, "等待RFID扫描", []
+            
+            st.progress(progress)
+            st.write(f"当前状态：{status}")
+            
+            # 物流详情
+            st.write("物流详情：")
+            for station, scanned_at in timeline:
+                st.write(f"- {scanned_at.strftime('%H:%M:%S')} {station}")
             
             st.markdown("</div>", unsafe_allow_html=True)
             
@@ -639,6 +770,16 @@ elif page == "农产家庭直供":
             """, unsafe_allow_html=True)
         else:
             st.info("暂无订单记录，请先下单")
+        
+        # 管理员批量导入RFID扫描批次
+        if st.session_state.user_logged_in and st.session_state.get("user_role") == "管理员":
+            scan_file = st.file_uploader("导入RFID扫描批次（CSV：order_id, station, timestamp）", type="csv")
+            if scan_file is not None and st.button("导入扫描事件"):
+                try:
+                    count = rfid_log.ingest_frame(pd.read_csv(scan_file))
+                    st.success(f"已导入{count}条RFID扫描事件")
+                except (KeyError, ValueError) as e:
+                    st.error(f"导入失败：{e}")
 
 # 4.3 营养定期送服务
 elif page == "营养定期送服务":
@@ -672,15 +813,19 @@ elif page == "营养定期送服务":
     
     # 用户信息输入
     st.subheader("输入健康信息")
-    age = st.slider("年龄", 1, 100, 30)
-    gender = st.selectbox("性别", ["男", "女"])
-    health_goals = st.multiselect("健康目标", ["减重", "增肌", "控糖", "降压", "提高免疫力的", "儿童成长"])
-    dietary_restrictions = st.multiselect("饮食限制", ["无", "素食", "无麸质", "低盐", "低糖"])
+    # 健康信息在表单里一次提交，填写过程中不触发重跑
+    with st.form("health_profile"):
+        age = st.slider("年龄", 1, 100, 30)
+        gender = st.selectbox("性别", ["男", "女"])
+        health_goals = st.multiselect("健康目标", ["减重", "增肌", "控糖", "降压", "提高免疫力的", "儿童成长"])
+        dietary_restrictions = st.multiselect("饮食限制", ["无", "素食", "无麸质", "低盐", "低糖"])
+        generate_recipe = st.form_submit_button("生成个性化食谱")
     
     # 生成个性化食谱
-    if st.button("生成个性化食谱"):
+    if generate_recipe:
         with st.spinner("AI正在分析您的健康数据..."):
-            time.sleep(2)  # 模拟AI处理时间
+            with metrics.section("模拟延迟"):
+                time.sleep(2)  # 模拟AI处理时间
             
             # 根据用户选择生成食谱推荐
             st.subheader("您的个性化食谱")
@@ -784,7 +929,9 @@ elif page == "营养定期送服务":
     if st.button("确认订阅"):
         if address and phone:
             with st.spinner("正在处理订阅请求..."):
-                time.sleep(1)
+                with metrics.section("模拟延迟"):
+                    time.sleep(1)
+                journal.append("subscription", st.session_state.username or "游客", {"plan": plan, "meals": meals, "payment": payment}, price)
                 st.success(f"订阅成功！您已订阅{plan}营养套餐，首次配送将在3天内送达。")
                 
                 # 显示订阅详情
@@ -826,20 +973,21 @@ elif page == "共享农庄模块":
         # 根据选择显示对应农场的照片
         farm_image_path = os.path.join("images", f"{farm_location}.png")
         if os.path.exists(farm_image_path):
-            st.image(farm_image_path, caption=f"{farm_location}实景", width=600)
-        plot_size = st.selectbox("地块面积", ["5平米", "10平米", "20平米"])
+            st.markdown(asset_registry.img(farm_image_path, width=600, caption=f"{farm_location}实景"), unsafe_allow_html=True)
+        plot_size = st.selectbox("地块面积", list(PLOT_SHAPES))
+        
+        # 各农场剩余可认种地块
+        plot_inventory.release_expired()
+        availability = plot_inventory.availability()
+        st.write("剩余地块：")
+        st.table(pd.DataFrame(availability).T.rename_axis("农场"))
         
         # 作物选择
         st.subheader("选择作物")
         season = st.radio("种植季节", ["春季", "夏季", "秋季"])
         
         # 根据季节显示不同作物
-        if season == "春季":
-            crops = ["菠菜", "生菜", "胡萝卜", "草莓"]
-        elif season == "夏季":
-            crops = ["西红柿", "黄瓜", "茄子", "辣椒"]
-        else:
-            crops = ["白菜", "萝卜", "南瓜", "土豆"]
+        crops = crops_for_season(season)
         
         crop = st.selectbox("种植作物", crops)
         
@@ -855,16 +1003,10 @@ elif page == "共享农庄模块":
         st.subheader("价格与收益")
         st.write(f"认种费用: ¥{base_price}/季")
         
-        # 预估产量和价值
-        if plot_size == "5平米":
-            estimated_yield = "15-20kg"
-            estimated_value = "¥300-400"
-        elif plot_size == "10平米":
-            estimated_yield = "30-40kg"
-            estimated_value = "¥600-800"
-        else:
-            estimated_yield = "60-80kg"
-            estimated_value = "¥1200-1600"
+        # 预估产量和价值（基于作物参数、农场监测数据和商城当前价格）
+        catalog_prices = catalog.price_map([params[7] for params in CROP_PARAMS.values() if params[7]])
+        yield_quotes = estimate_plot_yields(data_version, catalog_prices, farm_telemetry)
+        estimated_yield, estimated_value = format_quote(yield_quotes.loc[(farm_location, crop, plot_size)])
         
         st.write(f"预估产量: {estimated_yield}")
         st.write(f"预估价值: {estimated_value}")
@@ -872,9 +1014,18 @@ elif page == "共享农庄模块":
         # 认种按钮
         if st.button("确认认种"):
             with st.spinner("正在处理认种请求..."):
-                time.sleep(1)
-                st.success(f"认种成功！您已认种{farm_location}的{plot_size}地块，种植{crop}，费用¥{base_price}。")
-                st.info(f"种植周期：约90天，预计收获日期：{(datetime.now() + timedelta(days=90)).strftime('%Y-%m-%d')}")
+                with metrics.section("模拟延迟"):
+                    time.sleep(1)
+                allocation = plot_inventory.allocate(farm_location, plot_size, crop, owner=st.session_state.username)
+                if allocation is None:
+                    st.error(f"{farm_location}暂无空闲的{plot_size}地块，请选择其他农场或面积。")
+                else:
+                    journal.append("plot", st.session_state.username or "游客", {
+                        "farm": farm_location, "size": plot_size, "crop": crop,
+                        "plot_no": allocation["plot_no"], "season_end": allocation["season_end"],
+                    }, base_price)
+                    st.success(f"认种成功！您已认种{farm_location}的{plot_size}地块（编号{allocation['plot_no']}），种植{crop}，费用¥{base_price}。")
+                    st.info(f"种植周期：约90天，预计收获日期：{allocation['season_end']}")
         
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -884,6 +1035,22 @@ elif page == "共享农庄模块":
         
         # 选择查看的农场
         farm_to_monitor = st.selectbox("选择监测农场", ["河北农场", "山东农场", "云南农场"])
+        farm_data = farm_telemetry[farm_to_monitor]
+        if telemetry_store.hourly(farm_to_monitor, hours=1).empty:
+            st.caption("数据来源：模拟数据")
+        else:
+            st.caption(f"数据来源：传感器导入，截至{farm_data['时间'].iloc[-1].strftime('%Y-%m-%d %H:%M')}")
+        
+        # 农户与管理员导入传感器数据（大文件请用 python telemetry.py 文件 导入）
+        if st.session_state.user_logged_in and st.session_state.get("user_role") in ("农户", "管理员"):
+            with st.expander("导入传感器数据"):
+                telemetry_file = st.file_uploader("CSV（farm, sensor, timestamp, value）或 InfluxDB 行协议", type=["csv", "lp", "txt"])
+                if telemetry_file is not None and st.button("导入传感器数据"):
+                    report = telemetry_store.import_file(telemetry_file)
+                    st.success(f"读取{report['rows']:,}行，写入{report['accepted']:,}行，重复{report['duplicates']:,}行，{report['rows_per_second']:,.0f}行/秒")
+                    rejected = {reason: count for reason, count in report["rejected"].items() if count}
+                    if rejected:
+                        st.warning("拒绝：" + "，".join(f"{reason}{count:,}行" for reason, count in rejected.items()))
         
         # 显示实时数据
         st.subheader("实时环境数据")
@@ -907,13 +1074,47 @@ elif page == "共享农庄模块":
         
         # 环境数据图表
         st.subheader("24小时环境趋势")
-        chart_data = farm_data.melt(id_vars=["时间"], value_vars=["温度(°C)", "湿度(%)", "土壤湿度(%)"])
-        fig = px.line(chart_data, x="时间", y="value", color="variable", title="环境参数变化趋势")
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # 光照单独图表（因为数值范围差异大）
-        light_fig = px.line(farm_data, x="时间", y="光照(lux)", title="光照强度变化")
-        st.plotly_chart(light_fig, use_container_width=True)
+        horizon_labels = {f"{hours}小时": hours for hours in HORIZONS}
+        forecast_hours = horizon_labels[st.radio("预测时长", list(horizon_labels), horizontal=True)]
+        with metrics.section("农庄:环境图表"):
+            sensor_alerts = detect_sensor_anomalies(data_version, farm_telemetry)
+            farm_forecast = forecast_farms(data_version, farm_history)[farm_to_monitor]
+            farm_forecast = farm_forecast[farm_forecast["时间"] <= farm_forecast["时间"].min() + timedelta(hours=forecast_hours - 1)]
+            sensor_alerts = sensor_alerts[sensor_alerts["农场"] == farm_to_monitor]
+            chart_data = farm_data.melt(id_vars=["时间"], value_vars=["温度(°C)", "湿度(%)", "土壤湿度(%)"])
+            fig = px.line(chart_data, x="时间", y="value", color="variable", title="环境参数变化趋势")
+            light_fig = px.line(farm_data, x="时间", y="光照(lux)", title="光照强度变化")
+            
+            # 预测以同色虚线接在实测曲线之后，阴影为90%预测区间
+            for column in FORECAST_COLUMNS:
+                predicted = farm_forecast[farm_forecast["指标"] == column]
+                color = next(trace.line.color for trace in fig.data if trace.name == column)
+                fig.add_trace(go.Scatter(x=pd.concat([predicted["时间"], predicted["时间"][::-1]]), y=pd.concat([predicted["上限"], predicted["下限"][::-1]]),
+                                         fill="toself", fillcolor=color, opacity=0.15, line=dict(width=0), hoverinfo="skip", showlegend=False))
+                fig.add_trace(go.Scatter(x=[farm_data["时间"].iloc[-1], *predicted["时间"]], y=[farm_data[column].iloc[-1], *predicted["预测"]],
+                                         mode="lines", line=dict(color=color, dash="dash"), name=f"{column}预测（{predicted['模型'].iloc[0]}）"))
+            
+            # 异常读数以红色叉号叠加在趋势图上（光照单独图表，因为数值范围差异大）
+            for chart, flagged in ((fig, sensor_alerts[sensor_alerts["指标"] != "光照(lux)"]), (light_fig, sensor_alerts[sensor_alerts["指标"] == "光照(lux)"])):
+                if not flagged.empty:
+                    chart.add_trace(go.Scatter(x=flagged["时间"], y=flagged["数值"], mode="markers", name="异常",
+                                               marker=dict(color="red", symbol="x", size=11),
+                                               customdata=flagged[["指标", "类型"]], hovertemplate="%{customdata[0]}：%{y:.1f}<br>%{customdata[1]}<extra></extra>"))
+            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(light_fig, use_container_width=True)
+        
+        # 传感器异常告警（按时间倒序）
+        st.subheader("传感器告警")
+        if sensor_alerts.empty:
+            st.success("近24小时传感器读数正常")
+        else:
+            # 同一指标同一类型的连续告警合并为一条，显示最近一次
+            grouped = sensor_alerts.groupby(["指标", "类型"], sort=False)
+            for (sensor, kind), alert_count in grouped.size().items():
+                latest = grouped.get_group((sensor, kind)).iloc[0]
+                st.warning(f"{latest['时间'].strftime('%m-%d %H:%M')} {sensor}读数{latest['数值']:.1f}，疑似{kind}（近24小时{alert_count}次）")
+            with st.expander(f"全部{len(sensor_alerts)}条告警"):
+                st.dataframe(sensor_alerts.drop(columns="农场"), hide_index=True, use_container_width=True)
         
         # 智能灌溉状态
         st.subheader("智能灌溉状态")
@@ -923,6 +1124,11 @@ elif page == "共享农庄模块":
         else:
             st.success("土壤湿度正常，智能灌溉系统待机")
             irrigation_status = "待机"
+            # 预测区间上限也低于阈值时才提示，避免把噪声当成趋势
+            soil_forecast = farm_forecast[(farm_forecast["指标"] == "土壤湿度(%)") & (farm_forecast["上限"] < 55)]
+            if not soil_forecast.empty:
+                hours_ahead = (soil_forecast["时间"].iloc[0] - farm_data["时间"].iloc[-1]).total_seconds() / 3600
+                st.info(f"预计约{max(hours_ahead, 1):.0f}小时后土壤湿度降至55%以下，建议提前安排灌溉")
         
         st.write(f"灌溉系统状态: {irrigation_status}")
         st.write(f"上次灌溉时间: {(datetime.now() - timedelta(hours=random.randint(1, 24))).strftime('%Y-%m-%d %H:%M')}")
@@ -951,7 +1157,7 @@ elif page == "共享农庄模块":
     with col1:
         farm_image_path = os.path.join("images", f"{farm_to_view}.png")
         if os.path.exists(farm_image_path):
-            st.image(farm_image_path, caption=f"{farm_to_view}实景", width=600)
+            st.markdown(asset_registry.img(farm_image_path, width=600, caption=f"{farm_to_view}实景"), unsafe_allow_html=True)
         else:
             st.warning("农场实景图片暂未上传")
     
@@ -963,7 +1169,8 @@ elif page == "共享农庄模块":
         
         if st.button("模拟AR体验"):
             with st.spinner("正在加载AR体验..."):
-                time.sleep(2)
+                with metrics.section("模拟延迟"):
+                    time.sleep(2)
                 st.success("AR体验已就绪！")
                 st.write("您可以看到：")
                 st.write("- 作物生长状态")
@@ -988,56 +1195,77 @@ elif page == "会员民宿模块":
         location = st.selectbox("民宿地点", ["河北农庄", "山东农庄", "云南农庄"])
         
         # 根据地点显示不同民宿
-        if location == "河北农庄":
-            homestays = ["麦田小筑", "稻香阁", "果园别墅"]
-            images = [
-                "images/麦田小筑.png",
-                "images/稻香阁.png",
-                "images/果园别墅.png"
-            ]
-        elif location == "山东农庄":
-            homestays = ["海风木屋", "渔村小院", "山顶观景房"]
-            images = [
-                "https://img.zcool.cn/community/01f7e75e2d6926a801216518a2d7e1.jpg@1280w_1l_2o_100sh.jpg",
-                "https://img.zcool.cn/community/01c2ce5d0e9f8aa801219c7748b2b9.jpg@1280w_1l_2o_100sh.jpg",
-                "https://img.zcool.cn/community/01d0f05af3c3c9a801219741f6c3a0.jpg@1280w_1l_2o_100sh.jpg"
-            ]
-        else:
-            homestays = ["云端茶舍", "竹林别院", "花海木屋"]
-            images = [
-                "https://img.zcool.cn/community/031e2d75d8d65d0000012e7ed4b1c4.jpg",
-                "https://img.zcool.cn/community/01f9c55d31a173a8012187f4c1f5ba.jpg@1280w_1l_2o_100sh.jpg",
-                "https://img.zcool.cn/community/01a4a85af3c3c9a801219741cd7b8b.jpg@1280w_1l_2o_100sh.jpg"
-            ]
+        homestays = [name for name, _, _ in HOMESTAYS[location]]
+        images = [image for _, image, _ in HOMESTAYS[location]]
         
         homestay = st.selectbox("民宿类型", homestays)
         homestay_idx = homestays.index(homestay)
         
         # 显示民宿图片
-        st.image(images[homestay_idx], caption=homestay, width=400)
+        st.markdown(asset_registry.img(images[homestay_idx], width=400, caption=homestay), unsafe_allow_html=True)
         
-        # 预订信息
+        # 预订信息：日期、天数、人数填完点"查询空房"一次提交，取值范围由控件在浏览器端限制
         st.subheader("预订信息")
-        check_in = st.date_input("入住日期", datetime.now() + timedelta(days=1))
-        days = st.number_input("入住天数", min_value=1, max_value=7, value=2)
-        guests = st.number_input("入住人数", min_value=1, max_value=4, value=2)
-        
-        # 计算价格
-        base_price = 300 if location == "河北农庄" else (400 if location == "山东农庄" else 500)
-        total_price = base_price * days
-        
-        # 会员价格
-        member_price = total_price * 0.7
-        
-        st.write(f"原价: ¥{total_price}/晚")
-        st.write(f"会员价: ¥{member_price}/晚 (节省¥{total_price - member_price})")
+        with st.form("stay_query"):
+            check_in = st.date_input(
+                "入住日期",
+                datetime.now() + timedelta(days=1),
+                min_value=datetime.now(),
+                max_value=datetime.now() + timedelta(days=HORIZON_DAYS - 7)
+            )
+            days = st.number_input("入住天数", min_value=1, max_value=7, value=2)
+            guests = st.number_input("入住人数", min_value=1, max_value=4, value=2)
+            st.form_submit_button("查询空房")
+        
+        # 房态查询：所有农庄在该时段可住下入住人数的空房
+        free_by_homestay = homestay_calendar.search(check_in, days, guests)
+        free_rooms = free_by_homestay.get(homestay, 0)
+        if free_rooms:
+            st.write(f"{homestay}剩余空房: {free_rooms}间")
+        else:
+            st.warning(f"{homestay}在所选日期已无可住{guests}人的空房")
+        with st.expander("查看所有农庄空房"):
+            st.table(pd.DataFrame(
+                [(loc, name, free_by_homestay.get(name, 0)) for loc, properties in HOMESTAYS.items() for name, _, _ in properties],
+                columns=["农庄", "民宿", "空房数"]
+            ))
+        
+        # 计算价格（按入住日期逐晚计价，含季节、周末和节假日浮动）
+        stay_quote = homestay_pricing.quote(homestay, check_in, days)
+        total_price = stay_quote["非会员"]
+        
+        st.write(f"原价: ¥{total_price:.0f}（共{days}晚，均价¥{total_price / days:.0f}/晚）")
+        
+        # 会员价格：已是会员按当前等级折扣，否则预览会员权益中所选等级的价格
+        member_tier = member_ledger.tier(st.session_state.username)
+        use_free_stay = False
+        if member_tier:
+            member_price = total_price * resolve_discount(member_ledger, st.session_state.username, "homestay")
+            st.write(f"{member_tier}价: ¥{member_price:.0f} (节省¥{total_price - member_price:.0f})")
+            if member_ledger.can_redeem(st.session_state.username, FREE_STAY, nights=days):
+                free_stays = member_ledger.balance(st.session_state.username, FREE_STAY)
+                use_free_stay = st.checkbox(f"使用免费入住权益（剩余{free_stays}次）")
+        else:
+            preview_tier = st.session_state.get("membership_tier", "普通会员")
+            member_price = stay_quote[preview_tier]
+            st.write(f"{preview_tier}价: ¥{member_price:.0f} (节省¥{total_price - member_price:.0f}，加入会员后享受)")
         
         # 预订按钮
         if st.button("确认预订"):
             with st.spinner("正在处理预订请求..."):
-                time.sleep(1)
-                st.success(f"预订成功！您已预订{location}的{homestay}，入住日期{check_in.strftime('%Y-%m-%d')}，共{days}晚。")
-                st.info(f"请在入住当天14:00后到达，凭预订信息办理入住。")
+                with metrics.section("模拟延迟"):
+                    time.sleep(1)
+                booking = homestay_calendar.book(homestay, check_in, days, guests, guest_name=st.session_state.username)
+                if booking is None:
+                    st.error(f"{homestay}在所选日期已满房，请更换日期或民宿。")
+                else:
+                    st.success(f"预订成功！您已预订{location}的{homestay}{booking['room']}号房，入住日期{check_in.strftime('%Y-%m-%d')}，共{days}晚。")
+                    free_stay = use_free_stay and member_ledger.redeem(st.session_state.username, FREE_STAY, nights=days)
+                    if free_stay:
+                        st.info("已使用1次免费入住权益，本次入住免费。")
+                    journal.append("homestay", st.session_state.username or "游客", dict(booking, free_stay=bool(free_stay)),
+                                   0 if free_stay else member_price if member_tier else total_price)
+                    st.info(f"请在入住当天14:00后到达，凭预订信息办理入住。")
         
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1047,7 +1275,10 @@ elif page == "会员民宿模块":
         
         # 会员等级
         st.subheader("会员等级")
-        membership = st.radio("选择会员类型", ["普通会员", "银卡会员", "金卡会员"])
+        current_tier = member_ledger.tier(st.session_state.username)
+        if current_tier:
+            st.write(f"当前等级: {current_tier}（剩余免费入住{member_ledger.balance(st.session_state.username, FREE_STAY)}次）")
+        membership = st.radio("选择会员类型", ["普通会员", "银卡会员", "金卡会员"], key="membership_tier")
         
         # 会员权益
         st.subheader("权益详情")
@@ -1086,15 +1317,22 @@ elif page == "会员民宿模块":
         
         # 加入会员
         if st.button("加入会员"):
-            with st.spinner("正在处理会员申请..."):
-                time.sleep(1)
-                st.success(f"恭喜您成为{membership}！您将享受所有会员权益。")
+            if st.session_state.user_logged_in:
+                with st.spinner("正在处理会员申请..."):
+                    with metrics.section("模拟延迟"):
+                        time.sleep(1)
+                    expires = member_ledger.join(st.session_state.username, membership)
+                if expires is None:
+                    st.warning(f"您已是{current_tier}，会员到期后可重新加入。")
+                else:
+                    journal.append("membership", st.session_state.username, {"tier": membership, "expires": expires.isoformat()}, TIERS[membership]["fee"])
+                    st.success(f"恭喜您成为{membership}！您将享受所有会员权益，有效期至{expires.strftime('%Y-%m-%d')}。")
+            else:
+                st.error("请先登录后再加入会员！")
         
         # 会员活动
         st.subheader("近期会员活动")
-        st.write("1. 4月15日 - 春季采摘节")
-        st.write("2. 5月1日 - 五一农耕体验")
-        st.write("3. 6月1日 - 夏日露营之夜")
+        render_event_calendar("会员")
         
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -1130,25 +1368,19 @@ elif page == "乡村亲子模块":
     
     # 活动类型
     st.subheader("选择活动")
-    activity_type = st.selectbox("活动类型", ["农耕体验", "自然探索", "手工制作", "科普课堂"])
+    activity_type = st.selectbox("活动类型", list(ACTIVITY_TYPES))
     
     # 根据类型显示不同活动
+    activities = ACTIVITY_TYPES[activity_type]
     if activity_type == "农耕体验":
-        activities = ["插秧体验", "蔬菜采摘", "喂养小动物"]
         # 显示农耕体验活动图片
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.image("images/插秧体验.png", caption="插秧体验", width=300)
+            st.markdown(asset_registry.img("images/插秧体验.png", width=300, caption="插秧体验"), unsafe_allow_html=True)
         with col2:
-            st.image("images/蔬菜采摘.png", caption="蔬菜采摘", width=300)
+            st.markdown(asset_registry.img("images/蔬菜采摘.png", width=300, caption="蔬菜采摘"), unsafe_allow_html=True)
         with col3:
-            st.image("images/喂养小动物.png", caption="喂养小动物", width=300)
-    elif activity_type == "自然探索":
-        activities = ["昆虫观察", "植物标本制作", "野外定向"]
-    elif activity_type == "手工制作":
-        activities = ["陶艺制作", "草编工艺", "农产品加工"]
-    else:
-        activities = ["农业科技课", "生态系统探索", "食品安全课堂"]
+            st.markdown(asset_registry.img("images/喂养小动物.png", width=300, caption="喂养小动物"), unsafe_allow_html=True)
     
     activity = st.selectbox("具体活动", activities)
         
@@ -1162,33 +1394,104 @@ elif page == "乡村亲子模块":
         
         # 预订信息
     st.subheader("预订信息")
-    date = st.date_input("活动日期", datetime.now() + timedelta(days=3))
-    time_slot = st.selectbox("时间段", ["上午 9:00-11:00", "下午 14:00-16:00"])
-    participants = st.number_input("参与人数", min_value=1, max_value=4, value=2)
-        
-        # 计算价格
+    date = st.date_input("活动日期", datetime.now() + timedelta(days=3), min_value=datetime.now())
+    time_slot = st.selectbox("时间段", TIME_SLOTS)
+    participants = st.number_input("参与人数", min_value=1, max_value=10, value=2)
+    
+    # 名额与候补
+    remaining = activity_bookings.remaining(activity, date, time_slot)
+    waiting = activity_bookings.waitlist_length(activity, date, time_slot)
+    st.write(f"剩余名额: {remaining}/{activity_bookings.capacity_of(activity, date, time_slot)}" + (f"（候补{waiting}组）" if waiting else ""))
+    
+    # 年票持有人可凭年票预订
+    use_pass = False
+    if st.session_state.user_logged_in and activity_bookings.has_valid_pass(st.session_state.username):
+        use_pass = st.checkbox(f"使用亲子年票（每次限{PASS_MAX_PARTICIPANTS}人）")
+    join_waitlist = st.checkbox("名额不足时加入候补")
+        
+        # 计算价格（金卡会员免费参加农事体验，年票预订免费）
     price_per_person = 80
-    total_price = price_per_person * participants
+    total_price = price_per_person * participants * resolve_discount(member_ledger, st.session_state.username, "activity", activity_type)
+    if use_pass:
+        total_price = 0
         
         # 年票价格
-    annual_pass_price = 300
+    annual_pass_price = PASS_PRICE
         
-    st.write(f"单次价格: ¥{total_price} (¥{price_per_person}/人)")
-    st.write(f"年票价格: ¥{annual_pass_price}/年 (无限次参与，每次限4人)")
+    st.write(f"单次价格: ¥{total_price:.0f} (¥{price_per_person}/人)")
+    st.write(f"年票价格: ¥{annual_pass_price}/年 (无限次参与，每次限{PASS_MAX_PARTICIPANTS}人)")
+    
+    # 银卡会员每年可免费参加农事体验
+    use_free_activity = False
+    if activity_type in FREE_ACTIVITY_TYPES and total_price > 0 and member_ledger.can_redeem(st.session_state.username, FARM_ACTIVITY):
+        free_activities = member_ledger.balance(st.session_state.username, FARM_ACTIVITY)
+        use_free_activity = st.checkbox(f"使用免费农事体验权益（剩余{free_activities}次）")
         
         # 预订按钮
     col1, col2 = st.columns(2)
     with col1:
             if st.button("单次预订"):
                 with st.spinner("正在处理预订请求..."):
-                    time.sleep(1)
-                    st.success(f"预订成功！您已预订{date.strftime('%Y-%m-%d')} {time_slot}的{activity}活动，{participants}人参与。")
+                    with metrics.section("模拟延迟"):
+                        time.sleep(1)
+                    try:
+                        result, detail = activity_bookings.book(
+                            activity, date, time_slot, participants,
+                            holder=st.session_state.username, use_pass=use_pass, waitlist=join_waitlist
+                        )
+                    except ValueError as e:
+                        st.error(f"预订失败：{e}")
+                    else:
+                        if result == "confirmed":
+                            st.success(f"预订成功！您已预订{date.strftime('%Y-%m-%d')} {time_slot}的{activity}活动，{participants}人参与。")
+                            free_activity = use_free_activity and member_ledger.redeem(st.session_state.username, FARM_ACTIVITY)
+                            if free_activity:
+                                st.info("已使用1次免费农事体验权益。")
+                            journal.append("activity", st.session_state.username or "游客", detail, 0 if free_activity else total_price)
+                        elif result == "waitlisted":
+                            st.info(f"名额已满，您已加入候补（第{detail}位），有名额释放时将自动递补。")
+                        else:
+                            st.error("该时段名额已满，请选择其他时段或勾选加入候补。")
         
     with col2:
             if st.button("购买年票"):
-                with st.spinner("正在处理年票购买请求..."):
-                    time.sleep(1)
-                    st.success(f"年票购买成功！您可以无限次参与所有亲子活动，有效期至{(datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')}。")
+                if st.session_state.user_logged_in:
+                    with st.spinner("正在处理年票购买请求..."):
+                        with metrics.section("模拟延迟"):
+                            time.sleep(1)
+                        expires = activity_bookings.buy_pass(st.session_state.username)
+                        journal.append("pass", st.session_state.username, {"expires": expires}, PASS_PRICE)
+                        st.success(f"年票购买成功！您可以无限次参与所有亲子活动，有效期至{expires}。")
+                else:
+                    st.error("请先登录后再购买年票！")
+    
+    # 我的活动预订（取消后候补自动递补）与候补（可退出，活动日期已过的候补自动清掉）
+    if st.session_state.user_logged_in:
+        activity_bookings.expire_waitlists()
+        my_bookings = activity_bookings.bookings_of(st.session_state.username)
+        if my_bookings:
+            st.subheader("我的活动预订")
+            for booking in my_bookings:
+                booking_col, cancel_col = st.columns([3, 1])
+                with booking_col:
+                    st.write(f"{booking['date']} {booking['slot']} {booking['activity']}，{booking['participants']}人" + ("（年票）" if booking["pass"] else ""))
+                with cancel_col:
+                    if st.button("取消", key=f"cancel_activity_{booking['id']}"):
+                        promoted = activity_bookings.cancel(booking["id"])
+                        journal.append("activity_cancel", st.session_state.username, {"id": booking["id"], "promoted": len(promoted)})
+                        st.success("已取消预订" + (f"，{len(promoted)}组候补已自动递补" if promoted else ""))
+                        st.rerun()
+        my_waitlist = activity_bookings.waitlist_of(st.session_state.username)
+        if my_waitlist:
+            st.subheader("我的候补")
+            for booking, position in my_waitlist:
+                booking_col, leave_col = st.columns([3, 1])
+                with booking_col:
+                    st.write(f"{booking['date']} {booking['slot']} {booking['activity']}，{booking['participants']}人，候补第{position}位")
+                with leave_col:
+                    if st.button("退出候补", key=f"leave_waitlist_{booking['id']}"):
+                        activity_bookings.leave_waitlist(booking["id"])
+                        st.rerun()
         
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1209,11 +1512,7 @@ elif page == "乡村亲子模块":
         
         # 近期活动日历
     st.subheader("近期活动日历")
-    st.write("4月15日 - 春季插秧体验")
-    st.write("4月22日 - 地球日特别活动")
-    st.write("5月1日 - 劳动节农耕体验")
-    st.write("5月15日 - 昆虫观察与标本制作")
-    st.write("6月1日 - 儿童节特别活动")
+    render_event_calendar("亲子")
         
         # 教育理念
     st.markdown("""
@@ -1243,9 +1542,29 @@ elif page == "购物车":
         # 计算总价
         total = sum(item["total"] for item in st.session_state.cart)
         
+        # 会员农产品折扣
+        discount = resolve_discount(member_ledger, st.session_state.username, "product")
+        if discount < 1:
+            st.write(f"商品原价: ¥{total:.2f}，{member_ledger.tier(st.session_state.username)}{discount * 10:.0f}折优惠: -¥{total * (1 - discount):.2f}")
+            total = total * discount
+        
         # 显示总价
         st.subheader(f"总计: ¥{total:.2f}")
         
+        # 购物车碳足迹：商品碳足迹 x 数量 + 从产地到平台仓的配送碳足迹
+        cart_products = [catalog.get(item["name"]) or {"origin": "", "category": "", "carbon": 0.0} for item in st.session_state.cart]
+        carbon_lines = [
+            (product["origin"], product["category"], product["carbon"], item["quantity"])
+            for product, item in zip(cart_products, st.session_state.cart)
+        ]
+        product_carbon, delivery_carbon = cart_carbon([(carbon, quantity, origin) for origin, _, carbon, quantity in carbon_lines])
+        st.write(f"碳足迹: {product_carbon + delivery_carbon:.2f}kg（商品{product_carbon:.2f}kg + 配送{delivery_carbon:.2f}kg）")
+        
+        # 根据购物车内商品推荐经常一起购买的商品
+        bought_together = copurchase_index.suggest_for_cart([item["name"] for item in st.session_state.cart])
+        if bought_together:
+            st.info(f"经常一起购买：{'、'.join(bought_together)}")
+        
         # 结算按钮
         col1, col2 = st.columns(2)
         
@@ -1259,12 +1578,56 @@ elif page == "购物车":
             if st.button("结算"):
                 if st.session_state.user_logged_in:
                     with st.spinner("正在处理订单..."):
-                        time.sleep(2)
+                        with metrics.section("模拟延迟"):
+                            time.sleep(2)
+                        platform_stats.record_order(total)
+                        carbon_ledger.record_order(st.session_state.username, carbon_lines)
+                        copurchase_index.record_order([item["name"] for item in st.session_state.cart])
+                        journal.append("order", st.session_state.username, {"items": [[item["name"], item["quantity"]] for item in st.session_state.cart]}, total)
                         st.success("订单已提交！感谢您的购买。")
                         st.session_state.cart = []
                         st.rerun()
                 else:
                     st.error("请先登录后再结算！")
+    
+    # 个人碳足迹月度汇总
+    if st.session_state.user_logged_in:
+        my_carbon = carbon_ledger.user_summary(st.session_state.username)
+        if len(my_carbon):
+            st.subheader("我的碳足迹")
+            st.table(my_carbon.drop(columns="user").set_index("月份").round(2))
+        
+        # 交易记录（取自交易日志的内存投影）
+        my_events, my_counts = journal.history(st.session_state.username)
+        if my_events:
+            st.subheader("我的交易记录")
+            st.caption("，".join(f"{EVENT_TYPES[kind]}{count}次" for kind, count in my_counts.items()))
+            st.table(pd.DataFrame({
+                "时间": [datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") for _, ts, _, _ in my_events],
+                "类型": [EVENT_TYPES[kind] for _, _, kind, _ in my_events],
+                "金额": [f"¥{amount:.0f}" for _, _, _, amount in my_events],
+            }))
+        
+        # 管理员查看按农场、品类的月度碳足迹
+        if st.session_state.user_logged_in and st.session_state.get("user_role") == "管理员" and len(carbon_ledger):
+            with st.expander("平台碳足迹月报"):
+                st.write("按农场")
+                st.table(carbon_ledger.monthly("farm").set_index(["月份", "farm"]).round(2))
+                st.write("按品类")
+                st.table(carbon_ledger.monthly("category").set_index(["月份", "category"]).round(2))
+
+metrics.stop(page_span)
+
+# 管理员查看各页面、区块的耗时分位数
+if st.session_state.user_logged_in and st.session_state.get("user_role") == "管理员":
+    with st.sidebar.expander("性能监控"):
+        st.dataframe(metrics.REGISTRY.summary().round(1), hide_index=True)
+
+with metrics.section("会话写回"):
+    session_store.persist(session_token, st.session_state)
+
+metrics.stop(rerun_span)
+metrics.REGISTRY.flush()
 
 # 5. 主程序入口
 if __name__ == "__main__":
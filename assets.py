@@ -0,0 +1,87 @@
+import base64
+import hashlib
+import html
+import io
+import mimetypes
+import os
+import threading
+
+from PIL import Image
+
+# 图片静态资源：按显示宽度缩放后以内容哈希命名写入 static/img，由 Streamlit 静态服务（.streamlit/config.toml
+# 中 enableStaticServing）直接提供；地址带 ?v=哈希，浏览器长期缓存，内容变了地址随之变化
+# Streamlit 静态服务只按图片类型返回 jpg/png/gif/webp，其余格式（如 svg 占位图）内联为 data URI
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_DIR = "img"
+URL_PREFIX = "app/static/"
+STATIC_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+
+class AssetRegistry:
+    def __init__(self, static_dir=STATIC_DIR, url_prefix=URL_PREFIX):
+        self.directory = os.path.join(static_dir, ASSET_DIR)
+        self.url_prefix = url_prefix + ASSET_DIR + "/"
+        self._lock = threading.Lock()
+        self._urls = {}  # (源文件, 宽度) -> ((修改时间, 大小), 地址)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def url(self, path, width=None):
+        # 外部图片地址原样返回；源文件不存在或无法读取返回 None；源文件未变时直接返回上次的地址，不读文件
+        if path.startswith(("http://", "https://")):
+            return path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = (path, width)
+        cached = self._urls.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with self._lock:
+            try:
+                url = self._publish(path, width)
+            except OSError:  # 图片损坏等无法读取的情况按不存在处理
+                url = None
+            self._urls[key] = (signature, url)
+        return url
+
+    def _publish(self, path, width):
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, "rb") as f:
+            data = f.read()
+        if extension not in STATIC_EXTENSIONS:
+            mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+        # 与 st.image 一致：原图比显示宽度宽时缩放到显示宽度
+        if width:
+            image = Image.open(io.BytesIO(data))
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+                buffer = io.BytesIO()
+                image.save(buffer, format=_FORMATS[extension], optimize=True)
+                data = buffer.getvalue()
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        name = digest + extension
+        target = os.path.join(self.directory, name)
+        if not os.path.exists(target):
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        return f"{self.url_prefix}{name}?v={digest}"
+
+    def img(self, path, width=None, caption=None, fallback=None):
+        # 返回 <img> 标记（带可选标题），源文件不存在时用 fallback，都不存在返回空串
+        url = self.url(path, width) or (self.url(fallback, width) if fallback else None)
+        if url is None:
+            return ""
+        alt = html.escape(caption or os.path.splitext(os.path.basename(path))[0])
+        size = f" width='{width}'" if width else ""
+        markup = f"<img src='{html.escape(url)}' alt='{alt}'{size} loading='lazy' style='max-width: 100%; height: auto;'>"
+        if caption:
+            markup = f"<figure class='asset-figure'>{markup}<figcaption>{html.escape(caption)}</figcaption></figure>"
+        return markup
@@ -0,0 +1,58 @@
+# 节假日抢订压测：多线程同时预订同一批活动时段，检查是否超卖；退出候补与过期候补清理后日志回放是否一致
+# python bench/bench_activity_rush.py [并发请求数] [线程数]
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from activities import ACTIVITY_TYPES, TIME_SLOTS, ActivityBookings
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    holiday = date.today() + timedelta(days=10)
+    activities = ACTIVITY_TYPES["农耕体验"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = ActivityBookings(os.path.join(tmp, "activities.jsonl"))
+        rng = random.Random(0)
+        jobs = [(rng.choice(activities), rng.choice(TIME_SLOTS), rng.randint(1, 4)) for _ in range(requests)]
+
+        def submit(job):
+            activity, slot, participants = job
+            return engine.book(activity, holiday, slot, participants, holder=f"user{rng.random()}", waitlist=True)[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(submit, jobs))
+        elapsed = time.perf_counter() - start
+
+        oversold = [key for key, count in engine.booked.items() if count > engine.capacity_of(key[0], holiday, key[2])]
+        print(f"{requests}个并发预订，{threads}线程，耗时{elapsed:.2f}s，{requests / elapsed:,.0f} 次/秒")
+        print(f"确认{results.count('confirmed')}，候补{results.count('waitlisted')}，超卖时段{len(oversold)}个")
+
+        # 取消一半已确认预订，候补应自动递补且仍不超卖
+        confirmed = list(engine.bookings)
+        promoted = sum(len(engine.cancel(i)) for i in confirmed[::2])
+        oversold = [key for key, count in engine.booked.items() if count > engine.capacity_of(key[0], holiday, key[2])]
+        print(f"取消{len(confirmed[::2])}个预订，自动递补{promoted}个，超卖时段{len(oversold)}个")
+
+        # 三分之一的候补主动退出；到活动次日，剩余候补全部过期，不再递补
+        left = sum(engine.leave_waitlist(i) is not None for i in list(engine.waiting)[::3])
+        expired = engine.expire_waitlists(holiday + timedelta(days=1))
+        assert not engine.waitlists and not engine.waiting
+        assert engine.cancel(next(iter(engine.bookings)), holiday + timedelta(days=1)) == []
+        print(f"退出候补{left}个，过期清理{expired}个")
+
+        replayed = ActivityBookings(os.path.join(tmp, "activities.jsonl"))
+        print(f"日志回放一致：{replayed.booked == engine.booked and replayed.waitlists == engine.waitlists}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# 碳足迹月度汇总基准：python bench/bench_carbon_rollup.py [订单行数]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carbon import DIMENSIONS, CarbonLedger
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    sizes = {"user": 200_000, "farm": 10, "category": 6}
+    rng = np.random.default_rng(0)
+    ledger = CarbonLedger()
+    for dim, size in sizes.items():
+        for i in range(size):
+            ledger._code(dim, f"{dim}{i}")
+
+    start = time.perf_counter()
+    ledger.append_columns(
+        month=rng.integers(660, 672, rows),
+        user=rng.integers(0, sizes["user"], rows),
+        farm=rng.integers(0, sizes["farm"], rows),
+        category=rng.integers(0, sizes["category"], rows),
+        product=rng.uniform(0.1, 2.0, rows),
+        delivery=rng.uniform(0.01, 0.5, rows),
+    )
+    print(f"写入{rows:,}条订单行：{time.perf_counter() - start:.2f}s")
+
+    for dim in DIMENSIONS:
+        start = time.perf_counter()
+        table = ledger.monthly(dim)
+        print(f"按{dim}月度汇总：{len(table):,}组，{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    start = time.perf_counter()
+    ledger.user_summary("user42")
+    print(f"单用户汇总：{(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
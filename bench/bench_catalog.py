@@ -0,0 +1,95 @@
+# 商品目录基准：发布 N 行目录，测量打开快照的耗时与内存、按名查找、商城筛选排序、热加载切换和版本差异
+#   python bench/bench_catalog.py --rows 1000000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import CatalogStore, MALL, diff, publish
+
+
+def rss_bytes():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def make_columns(n, rng):
+    categories = np.array(["粮油", "饮品", "水果", "调味品", "蔬菜", "禽蛋"])
+    origins = np.array(["河北农场", "山东农场", "云南农场", "福建农场", "河南农场", "江苏农场"])
+    return {
+        "name": [f"商品{i:07d}" for i in range(n)],
+        "channel": np.where(rng.random(n) < 0.9, "mall", "fresh").tolist(),
+        "price": rng.integers(1, 100, n).astype(np.float64),
+        "stock": rng.integers(1, 500, n),
+        "carbon": rng.random(n).round(2),
+        "delivery_time": rng.integers(4, 12, n),
+        "category": categories[rng.integers(0, len(categories), n)].tolist(),
+        "origin": origins[rng.integers(0, len(origins), n)].tolist(),
+        "description": ["有机种植，新鲜直供"] * n,
+        "image": ["images/resized/placeholder.svg"] * n,
+        "trace_id": [f"TR{i:07d}" for i in range(n)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    columns = make_columns(args.rows, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog")
+        start = time.perf_counter()
+        publish(path, columns)
+        print(f"发布 {args.rows:,} 行：{time.perf_counter() - start:.2f}s")
+
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        store = CatalogStore(path)
+        snapshot = store.current()
+        print(f"打开快照：{(time.perf_counter() - start) * 1000:.1f} ms，RSS 增加 {(rss_bytes() - rss_before) / 2**20:.1f} MB")
+
+        names = [columns["name"][i] for i in rng.integers(0, args.rows, args.lookups).tolist()]
+        start = time.perf_counter()
+        assert all(snapshot.find(name) >= 0 for name in names)
+        print(f"按名查找：{(time.perf_counter() - start) / len(names) * 1e6:.1f} µs/次")
+
+        start = time.perf_counter()
+        rows = snapshot.rows(MALL)
+        prices = snapshot.columns["price"][rows]
+        rows = rows[(prices >= 10) & (prices <= 50) & (snapshot.columns["category"][rows] == snapshot.dictionaries["category"].index("粮油"))]
+        rows = rows[np.argsort(snapshot.columns["price"][rows], kind="stable")]
+        page = snapshot.records(rows[:30])
+        print(f"商城筛选排序并取一页：{(time.perf_counter() - start) * 1000:.1f} ms（命中 {len(rows):,} 行，物化 {len(page)} 行）")
+
+        start = time.perf_counter()
+        for _ in range(10_000):
+            store.current()
+        print(f"未变化时 current()：{(time.perf_counter() - start) / 10_000 * 1e6:.1f} µs/次")
+
+        columns["price"] = columns["price"] + 1
+        publish(path, columns)
+        start = time.perf_counter()
+        reloaded = store.current()
+        print(f"热加载 {snapshot.version} -> {reloaded.version}：{(time.perf_counter() - start) * 1000:.1f} ms")
+        assert reloaded.record(0)["price"] == snapshot.record(0)["price"] + 1
+
+        start = time.perf_counter()
+        changed, removed = diff(snapshot, reloaded, MALL)
+        print(f"版本差异（仅改价）：{(time.perf_counter() - start) * 1000:.1f} ms，需重建索引 {len(changed):,} 行，下架 {len(removed):,} 行")
+        assert not len(changed) and not len(removed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# 共现推荐索引基准：python bench/bench_copurchase.py [订单数] [商品数]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommend import CoPurchaseIndex
+
+
+def random_orders(rng, n_orders, n_skus):
+    # 商品热度按 Zipf 分布，每单 2~6 件
+    sizes = rng.integers(2, 7, n_orders)
+    skus = np.minimum(rng.zipf(1.3, sizes.sum()), n_skus) - 1
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    return [[f"sku{s}" for s in set(skus[offsets[i]:offsets[i + 1]].tolist())] for i in range(n_orders)]
+
+
+def main():
+    n_orders = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_skus = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    rng = np.random.default_rng(0)
+    orders = random_orders(rng, n_orders, n_skus)
+    index = CoPurchaseIndex()
+
+    start = time.perf_counter()
+    index.add_orders(orders)
+    elapsed = time.perf_counter() - start
+    print(f"全量构建：{n_orders:,}单，{len(index.data):,}个共现对，耗时{elapsed:.2f}s")
+
+    start = time.perf_counter()
+    index.similar = index.top_similar()
+    print(f"计算 top-{index.top_k}：{len(index.similar):,}个商品，耗时{time.perf_counter() - start:.2f}s")
+
+    new_orders = random_orders(rng, 10_000, n_skus)
+    start = time.perf_counter()
+    index.add_orders(new_orders)
+    index.similar = index.top_similar()
+    print(f"增量重建：1万单，耗时{time.perf_counter() - start:.2f}s")
+
+    names = [f"sku{i}" for i in rng.integers(0, n_skus, 100_000).tolist()]
+    start = time.perf_counter()
+    for name in names:
+        index.suggest(name)
+    print(f"渲染时查询：{(time.perf_counter() - start) / len(names) * 1e6:.2f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# 家庭直供调度基准：早高峰批量下单时每秒可完成的履约决策数
+#   python bench/bench_dispatch.py --orders 50000 --farms 2000
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dispatch import FulfilmentDispatcher, SHELF_HOURS
+from geo import CITY_COORDS, FARM_COORDS
+
+
+def make_orders(n, rng):
+    cities = list(CITY_COORDS)
+    skus = list(SHELF_HOURS)
+    return [
+        (skus[s], f"{cities[c]}市某区某路{i}号", int(q))
+        for i, (s, c, q) in enumerate(zip(rng.integers(0, len(skus), n), rng.integers(0, len(cities), n), rng.integers(1, 4, n)))
+    ]
+
+
+def synthetic_farms(n, rng):
+    # 在国内大致范围内随机撒点，每个农场随机种一半的生鲜
+    farms = {f"农场{i:05d}": (float(lat), float(lon)) for i, (lat, lon) in enumerate(zip(rng.uniform(20, 45, n), rng.uniform(100, 125, n)))}
+    farms.update(FARM_COORDS)
+    dispatcher = FulfilmentDispatcher(farm_coords=farms)
+    for farm in farms:
+        for sku in SHELF_HOURS:
+            if rng.random() < 0.5:
+                dispatcher._set(farm, sku, int(rng.integers(50, 500)))
+    return dispatcher
+
+
+def run(label, dispatcher, orders, reserve):
+    now = datetime(2026, 10, 19, 8, 0)
+    call = dispatcher.reserve if reserve else dispatcher.plan
+    start = time.perf_counter()
+    served = sum(call(sku, address, quantity, now) is not None for sku, address, quantity in orders)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(orders) / elapsed:10,.0f} 次/秒  {elapsed / len(orders) * 1e6:7.1f} µs/次  可履约 {served / len(orders):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--farms", type=int, default=2_000, help="合成农场网络规模")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    orders = make_orders(args.orders, rng)
+
+    seed = os.path.join(ROOT, "data", "farm_stock.json")
+    run(f"决策（{len(FARM_COORDS)} 个农场）", FulfilmentDispatcher(seed=seed), orders, reserve=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        dispatcher = FulfilmentDispatcher(os.path.join(tmp, "stock.json"), seed=seed)
+        run("决策并扣库存（落盘）", dispatcher, orders[:5_000], reserve=True)
+    run(f"决策（{args.farms:,} 个农场）", synthetic_farms(args.farms, rng), orders, reserve=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# 传感器预测基准：S 条数据流的整体拟合、逐小时增量更新与 72 小时预测耗时
+#   python bench/bench_forecast.py --streams 10000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecast import ALPHAS, GAMMAS, HISTORY_HOURS, HORIZONS, PERIOD, SeasonalForecaster
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=10_000)
+    parser.add_argument("--hours", type=int, default=48, help="增量吸收的小时数")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    total = HISTORY_HOURS + args.hours + max(HORIZONS)
+    hours = np.arange(total)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, args.streams)
+    matrix = 20 + 7.5 * np.sin(2 * np.pi * hours / PERIOD + phase) + rng.normal(0, 0.6, (total, args.streams))
+
+    forecaster = SeasonalForecaster(args.streams)
+    start = time.perf_counter()
+    forecaster.fit(matrix[:HISTORY_HOURS])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for t in range(HISTORY_HOURS, HISTORY_HOURS + args.hours):
+        forecaster.update(matrix[t])
+    update_seconds = (time.perf_counter() - start) / args.hours
+
+    start = time.perf_counter()
+    mean, lower, upper, _ = forecaster.forecast(max(HORIZONS))
+    forecast_seconds = time.perf_counter() - start
+
+    actual = matrix[HISTORY_HOURS + args.hours:]
+    print(f"{args.streams:,} 条流，历史 {HISTORY_HOURS} 小时")
+    print(f"整体拟合 {fit_seconds * 1e3:8.1f} ms（系数网格 {len(ALPHAS) * len(GAMMAS)} 组）")
+    print(f"增量更新 {update_seconds * 1e3:8.2f} ms/小时  {args.streams / update_seconds:12,.0f} 读数/秒")
+    print(f"{max(HORIZONS)} 小时预测 {forecast_seconds * 1e3:8.1f} ms")
+    print(f"平均绝对误差 {np.abs(actual - mean).mean():.2f}，90% 区间覆盖率 {((actual >= lower) & (actual <= upper)).mean():.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# 交易日志基准：写盘失败与多写入方的行为检查、批量追加吞吐、多线程逐条追加时的组提交效果、重启恢复耗时（快照 + 尾部 vs 全量回放）
+#   python bench/bench_journal.py                                   默认 1000 万条
+#   python bench/bench_journal.py --events 1000000 --threads 1 8 32
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import EVENT_TYPES, SNAPSHOT_EVERY, EventJournal
+
+# 事件类型占比（下单为主）
+MIX = {"order": 0.7, "activity": 0.08, "homestay": 0.06, "plot": 0.04, "subscription": 0.04,
+       "membership": 0.03, "pass": 0.03, "activity_cancel": 0.02}
+
+
+def make_events(rng, n, n_users):
+    kinds = np.array(list(MIX))[rng.choice(len(MIX), n, p=list(MIX.values()))]
+    users = rng.integers(0, n_users, n)
+    amounts = np.round(rng.lognormal(4, 1, n), 2)
+    return [(kind, f"user{user}", {"items": [["有机大米", 2]]} if kind == "order" else {}, amount)
+            for kind, user, amount in zip(kinds.tolist(), users.tolist(), amounts.tolist())]
+
+
+def bulk_append(path, n_events, n_users, batch, rng):
+    journal = EventJournal(path)
+    elapsed = 0.0
+    for offset in range(0, n_events, batch):
+        events = make_events(rng, min(batch, n_events - offset), n_users)
+        start = time.perf_counter()
+        journal.append_many(events)
+        elapsed += time.perf_counter() - start
+    journal.close()
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"批量追加 {n_events:,} 条（每批 {batch}）：{elapsed:.1f}s，{n_events / elapsed:,.0f} 条/s，"
+          f"{journal.commits:,} 次 fsync，{size / 2**20:,.0f} MB，快照到 #{journal.snapshot_seq:,}")
+
+
+def concurrent_append(n_threads, per_thread, n_users, rng):
+    # 每个线程逐条 append（每条都等到落盘），统计每次 fsync 平均带走几条
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = EventJournal(tmp)
+        events = make_events(rng, n_threads * per_thread, n_users)
+
+        def writer(part):
+            for kind, user, data, amount in part:
+                journal.append(kind, user, data, amount)
+
+        threads = [threading.Thread(target=writer, args=(events[i::n_threads],)) for i in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        journal.close()
+        print(f"{n_threads:>3} 线程逐条追加 {len(events):,} 条：{len(events) / elapsed:,.0f} 条/s，"
+              f"{journal.commits:,} 次 fsync（平均每次 {len(events) / journal.commits:.1f} 条）")
+
+
+def check_failed_append():
+    # 写盘失败的批次整批作废：调用方收到异常，记录之后不会随别的提交落盘，重启后也不存在
+    class FailingJournal(EventJournal):
+        fail_next = False
+
+        def _write(self, records):
+            if self.fail_next:
+                self.fail_next = False
+                raise OSError("模拟写盘失败")
+            super()._write(records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = FailingJournal(tmp)
+        journal.append("order", "alice", amount=10)
+        journal.fail_next = True
+        try:
+            journal.append("order", "bob", amount=20)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("写盘失败时 append 应抛出异常")
+        journal.append("order", "carol", amount=30)
+        assert journal.history("bob") == ([], {})
+        journal.close()
+        reopened = EventJournal(tmp)
+        assert set(reopened.state.users) == {"alice", "carol"}
+        assert reopened.replayed == 2
+        reopened.close()
+    print("写盘失败的批次整批作废：通过")
+
+
+def check_two_writers():
+    # 两个实例（相当于两个进程）交替写同一目录：序号不重复，重启后两边的记录都能回放
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = EventJournal(tmp), EventJournal(tmp)
+        for _ in range(3):
+            first.append("order", "alice", amount=10)
+            second.append("order", "bob", amount=20)
+        second.refresh()
+        assert second.history("alice")[1] == {"order": 3}
+        first.close()
+        second.close()
+        reopened = EventJournal(tmp)
+        assert reopened.replayed == 6 and set(reopened.state.users) == {"alice", "bob"}
+        reopened.close()
+    print("多个写入方共用日志目录：通过")
+
+
+def recover(path, label):
+    start = time.perf_counter()
+    journal = EventJournal(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label}：{elapsed:.2f}s，回放 {journal.replayed:,} 条，恢复到 #{journal.seq:,}，{len(journal.state.users):,} 个用户")
+    journal.close()
+    return journal
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--tail", type=int, default=SNAPSHOT_EVERY // 2, help="最后一个快照之后的记录数")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--per-thread", type=int, default=500)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    check_failed_append()
+    check_two_writers()
+    for n_threads in args.threads:
+        concurrent_append(n_threads, args.per_thread, args.users, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal")
+        bulk_append(path, args.events, args.users, args.batch, rng)
+        # 再逐批追加半个快照间隔，模拟两次快照之间重启：恢复时需回放这段尾部
+        journal = EventJournal(path)
+        for offset in range(0, args.tail, args.batch):
+            journal.append_many(make_events(rng, min(args.batch, args.tail - offset), args.users))
+        journal.close()
+        with_snapshot = recover(path, f"快照 + 尾部恢复（每 {SNAPSHOT_EVERY:,} 条一个快照）")
+
+        # 同一份日志去掉快照，从头回放，对比恢复耗时与投影是否一致
+        for name in os.listdir(path):
+            if name.startswith("snapshot-"):
+                shutil.move(os.path.join(path, name), os.path.join(tmp, name))
+        full = recover(path, "无快照全量回放")
+        assert full.seq == with_snapshot.seq
+        assert full.state.totals.keys() == with_snapshot.state.totals.keys()
+        for kind in EVENT_TYPES:
+            if kind in full.state.totals:
+                assert full.state.totals[kind][0] == with_snapshot.state.totals[kind][0]
+        assert full.state.users == with_snapshot.state.users
+
+
+if __name__ == "__main__":
+    main()
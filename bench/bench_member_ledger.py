@@ -0,0 +1,44 @@
+# 会员权益台账基准：python bench/bench_member_ledger.py [会员数]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from membership import FREE_STAY, TIERS, MembershipLedger
+
+
+def main():
+    n_members = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    tiers = list(TIERS)
+    member_tiers = rng.integers(0, len(tiers), n_members)
+    ledger = MembershipLedger()
+
+    start = time.perf_counter()
+    for i in range(n_members):
+        ledger.join(f"user{i}", tiers[member_tiers[i]])
+    elapsed = time.perf_counter() - start
+    print(f"加入会员：{n_members}人，耗时{elapsed:.2f}s，{n_members / elapsed:,.0f} 人/秒")
+
+    redeemers = rng.integers(0, n_members, n_members)
+    start = time.perf_counter()
+    redeemed = sum(ledger.redeem(f"user{i}", FREE_STAY, nights=2) for i in redeemers.tolist())
+    elapsed = time.perf_counter() - start
+    print(f"核销免费入住：{len(redeemers)}次（成功{redeemed}），{len(redeemers) / elapsed:,.0f} 次/秒")
+
+    entries = ledger.entries()
+    start = time.perf_counter()
+    ledger.replay(entries)
+    print(f"台账回放：{len(entries['member']):,}条记录，耗时{time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    for i in redeemers[:100_000].tolist():
+        ledger.can_redeem(f"user{i}", FREE_STAY, nights=2)
+    print(f"能否核销查询：{(time.perf_counter() - start) / 100_000 * 1e6:.2f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# 各页面重跑耗时与内存分配基准（无需浏览器，基于 AppTest）
+#   python bench/bench_pages.py                      按默认数据规模运行并与基线比较，超出容差时退出码为1
+#   python bench/bench_pages.py --update-baseline    运行并写入基线
+#   python bench/bench_pages.py --sizes 1000 1000000 --repeats 5 --only 商城 购物车
+#   python bench/bench_pages.py --app /tmp/app_old.py --sizes 1000              测量其他版本的页面（如改动前的重跑次数）
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from carbon import CarbonLedger
+from logistics import RfidEventLog, STATIONS
+from membership import MembershipLedger, TIERS
+from platform_stats import PlatformStats
+from recommend import CoPurchaseIndex
+
+BASELINE_FILE = os.path.join(ROOT, "bench", "baselines", "pages.json")
+
+# 容差：相对基线的比例，加上绝对余量（抵消小数值的抖动）
+LATENCY_TOLERANCE = 0.3
+LATENCY_SLACK_MS = 10.0
+ALLOC_TOLERANCE = 0.3
+ALLOC_SLACK_KB = 512.0
+
+_real_sleep = time.sleep
+
+
+def _no_mock_sleep(seconds):
+    # 页面里 1~2 秒的模拟延迟直接跳过，AppTest 自身的短轮询照常等待
+    if seconds < 0.1:
+        _real_sleep(seconds)
+
+
+def populate(size, rng):
+    # 在当前目录的 data/ 下生成与 size 成比例的历史数据
+    n_orders = max(size // len(STATIONS), 1)
+    order_ids = rng.integers(0, n_orders, size, dtype=np.int64) + 250101000000000000
+    ts = rng.integers(1_735_660_800, 1_735_660_800 + 86400 * 30, size, dtype=np.int64)
+    RfidEventLog("data/rfid").ingest(order_ids, rng.integers(0, len(STATIONS), size, dtype=np.int8), ts)
+
+    ledger = CarbonLedger("data/carbon")
+    for dim, names in (("user", ["customer1", "admin"] + [f"user{i}" for i in range(max(size // 100, 1))]),
+                       ("farm", ["河北农场", "山东农场", "云南农场", "福建农场"]),
+                       ("category", ["粮油", "茶饮", "蔬菜", "水果"])):
+        for name in names:
+            ledger._code(dim, name)
+    ledger.append_columns(
+        rng.integers(660, 670, size, dtype=np.int32),
+        rng.integers(0, len(ledger._names["user"]), size, dtype=np.int32),
+        rng.integers(0, 4, size, dtype=np.int32),
+        rng.integers(0, 4, size, dtype=np.int32),
+        rng.random(size, dtype=np.float32),
+        rng.random(size, dtype=np.float32),
+    )
+
+    members = MembershipLedger("data/membership")
+    tiers = list(TIERS)
+    for i in range(max(size // 100, 1)):
+        members.join(f"user{i}", tiers[i % len(tiers)])
+
+    index = CoPurchaseIndex("data/recommend")
+    skus = ["有机大米", "茶叶", "土鸡蛋", "生态蜂蜜", "低碳苹果", "有机菠菜", "面粉", "食用油"]
+    with open("data/recommend/orders.jsonl", "w", encoding="utf-8") as f:
+        for i in range(max(size // 10, 1)):
+            basket = sorted(set(rng.choice(skus, rng.integers(2, 5)).tolist()))
+            if len(basket) > 1:
+                f.write(json.dumps(basket, ensure_ascii=False) + "\n")
+    index.rebuild()
+
+    stats = PlatformStats("data/platform_stats")
+    today = date.today()
+    for offset in range(365):
+        for _ in range(3):
+            stats.record_order(float(rng.integers(20, 500)), day=today - timedelta(days=offset))
+
+
+def widget(at, kind, label):
+    return next(w for w in getattr(at, kind) if w.label == label)
+
+
+def login(at, username="customer1", password="cust2025"):
+    at.sidebar.text_input[0].set_value(username)
+    at.sidebar.text_input[1].set_value(password)
+    return widget(at.sidebar, "button", "登录").click()
+
+
+def goto(page):
+    return lambda at: at.sidebar.radio[0].set_value(page)
+
+
+def submit(label):
+    # 点表单的提交按钮；页面上没有该按钮（控件不在表单里的版本）时什么都不做
+    return lambda at: next((w.click() for w in at.button if w.label == label), None)
+
+
+# 场景：(名称, 页面, 交互列表)；每个交互修改一个控件，随后触发一次重跑并计时，
+# 表单内的控件与浏览器中一样先暂存，点提交按钮时才随之重跑
+SCENARIOS = [
+    ("首页", "首页", []),
+    ("商城", "农产品自营商城", [
+        lambda at: widget(at, "selectbox", "商品分类").set_value("粮油"),
+        lambda at: widget(at, "slider", "价格范围").set_value((10, 50)),
+        lambda at: widget(at, "selectbox", "排序方式").set_value("价格从高到低"),
+        lambda at: widget(at, "text_input", "搜索商品").set_value("有机"),
+        submit("应用筛选"),
+        lambda at: at.button(key="add_有机大米").click(),
+    ]),
+    ("家庭直供", "农产家庭直供", [
+        lambda at: at.button(key="buy_生态西红柿").click(),
+        lambda at: widget(at, "text_input", "配送地址").set_value("上海市浦东新区"),
+        lambda at: widget(at, "text_input", "联系电话").set_value("13800000000"),
+        lambda at: widget(at, "button", "立即下单").click(),
+        lambda at: widget(at, "selectbox", "选择订单").set_value(widget(at, "selectbox", "选择订单").options[-1]),
+    ]),
+    ("营养定期送", "营养定期送服务", [
+        lambda at: widget(at, "multiselect", "健康目标").set_value(["减重"]),
+        lambda at: widget(at, "button", "生成个性化食谱").click(),
+    ]),
+    ("共享农庄", "共享农庄模块", [
+        lambda at: widget(at, "selectbox", "农场位置").set_value("云南农场"),
+        lambda at: widget(at, "selectbox", "选择监测农场").set_value("山东农场"),
+        lambda at: widget(at, "selectbox", "选择农场").set_value("云南农场"),
+    ]),
+    ("会员民宿", "会员民宿模块", [
+        lambda at: widget(at, "selectbox", "民宿地点").set_value("云南农庄"),
+        lambda at: widget(at, "number_input", "入住天数").set_value(3),
+        lambda at: widget(at, "number_input", "入住人数").set_value(1),
+        submit("查询空房"),
+    ]),
+    ("乡村亲子", "乡村亲子模块", [
+        lambda at: widget(at, "selectbox", "活动类型").set_value("自然探索"),
+        lambda at: widget(at, "button", "单次预订").click(),
+    ]),
+    ("购物车", "购物车", [
+        goto("农产品自营商城"),
+        lambda at: at.button(key="add_茶叶").click(),
+        lambda at: at.button(key="add_生态蜂蜜").click(),
+        goto("购物车"),
+    ]),
+]
+
+
+def batched(touched):
+    # 表单内除提交按钮以外的控件：修改只在浏览器端暂存，不触发重跑
+    if not getattr(touched, "form_id", ""):
+        return False
+    return not getattr(touched.proto, "is_form_submitter", False)
+
+
+def run_scenario(app_path, page, steps):
+    # 返回每次重跑的耗时（秒），列表长度即完成该场景的重跑次数
+    at = AppTest.from_file(app_path, default_timeout=120)
+    at.run()
+    login(at).run()
+    timings = []
+    for step in [goto(page)] + steps:
+        touched = step(at)
+        if touched is None or batched(touched):
+            continue
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].value}")
+    return timings
+
+
+def measure(app_path, page, steps, repeats):
+    # 先跑一遍预热缓存，再计时 repeats 遍取每步中位数，最后单独跑一遍统计内存分配峰值
+    run_scenario(app_path, page, steps)
+    runs = [run_scenario(app_path, page, steps) for _ in range(repeats)]
+    per_step = [statistics.median(samples) for samples in zip(*runs)]
+    tracemalloc.start()
+    run_scenario(app_path, page, steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "reruns": len(per_step),
+        "rerun_ms_median": statistics.median(per_step) * 1000,
+        "rerun_ms_max": max(per_step) * 1000,
+        "peak_alloc_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline):
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, tolerance, slack in (
+            ("reruns", 0, 0),
+            ("rerun_ms_median", LATENCY_TOLERANCE, LATENCY_SLACK_MS),
+            ("rerun_ms_max", LATENCY_TOLERANCE, LATENCY_SLACK_MS),
+            ("peak_alloc_kb", ALLOC_TOLERANCE, ALLOC_SLACK_KB),
+        ):
+            if metric not in base:
+                continue
+            limit = base[metric] * (1 + tolerance) + slack
+            if result[metric] > limit:
+                failures.append(f"{key} {metric}: {result[metric]:.1f} > {limit:.1f}（基线 {base[metric]:.1f}）")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="只运行指定场景")
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    app_path = os.path.abspath(args.app)
+    scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    results = {}
+    cwd = os.getcwd()
+    with mock.patch("time.sleep", _no_mock_sleep):
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                # 每个数据规模在独立的临时目录里运行，页面读写的 data/ 与仓库隔离
+                os.makedirs(os.path.join(tmp, "data"))
+                for name in ("users.json", "catalog.json", "farm_stock.json"):
+                    shutil.copy(os.path.join(ROOT, "data", name), os.path.join(tmp, "data", name))
+                os.symlink(os.path.join(ROOT, "images"), os.path.join(tmp, "images"))
+                os.chdir(tmp)
+                try:
+                    populate(size, np.random.default_rng(0))
+                    st.cache_data.clear()
+                    st.cache_resource.clear()
+                    for name, page, steps in scenarios:
+                        key = f"{name}@{size}"
+                        results[key] = measure(app_path, page, steps, args.repeats)
+                        r = results[key]
+                        print(f"{key:<20} 重跑 {r['reruns']:2d} 次  中位 {r['rerun_ms_median']:8.1f} ms  最慢 {r['rerun_ms_max']:8.1f} ms  分配峰值 {r['peak_alloc_kb']:10.0f} KB")
+                finally:
+                    os.chdir(cwd)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({key: {metric: round(value, 1) for metric, value in r.items()} for key, r in results.items()})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"已写入基线：{args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("未找到基线，使用 --update-baseline 生成")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        failures = compare(results, json.load(f))
+    if failures:
+        print("性能回退：")
+        for line in failures:
+            print("  " + line)
+        sys.exit(1)
+    print("全部场景在基线容差内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# 商品搜索基准：python bench/bench_product_search.py [商品数]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import ProductSearchIndex
+
+CROPS = ["大米", "小米", "茶叶", "红枣", "核桃", "蜂蜜", "苹果", "西红柿", "白菜", "土豆", "茄子", "胡萝卜", "辣椒", "花生", "菌菇"]
+ADJECTIVES = ["有机", "生态", "高山", "野生", "精选", "新鲜", "手工", "古法"]
+ORIGINS = ["河北农场", "山东农场", "云南农场", "河南农场", "福建农场", "江苏农场", "安徽农场"]
+CATEGORIES = ["粮油", "茶饮", "干果", "调味品", "蔬菜", "水果"]
+PHRASES = ["纯天然有机种植", "无农药残留", "口感醇厚", "营养丰富", "产地直发", "当季采摘", "传统工艺", "香甜可口", "颗粒饱满"]
+
+
+def random_catalog(rng, n):
+    catalog = {}
+    for i in range(n):
+        name = f"{ADJECTIVES[rng.integers(len(ADJECTIVES))]}{CROPS[rng.integers(len(CROPS))]}{i}"
+        catalog[name] = {
+            "description": "，".join(PHRASES[j] for j in rng.choice(len(PHRASES), 3, replace=False)),
+            "origin": ORIGINS[rng.integers(len(ORIGINS))],
+            "category": CATEGORIES[rng.integers(len(CATEGORIES))],
+        }
+    return catalog
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    catalog = random_catalog(rng, n)
+    index = ProductSearchIndex()
+
+    start = time.perf_counter()
+    index.sync(catalog)
+    print(f"全量建索引：{n:,}个商品，{len(index.vocab):,}个词，耗时{time.perf_counter() - start:.2f}s")
+
+    # 目录变化：改写1%的描述、下架1%、上新1%
+    names = list(catalog)
+    for i in rng.choice(n, n // 100, replace=False).tolist():
+        catalog[names[i]] = dict(catalog[names[i]], description="当季采摘，香甜可口")
+    for i in rng.choice(n, n // 100, replace=False).tolist():
+        catalog.pop(names[i], None)
+    catalog.update(random_catalog(np.random.default_rng(1), n // 100))
+    start = time.perf_counter()
+    changed = index.sync(catalog)
+    print(f"增量更新：{changed:,}个商品变更，耗时{time.perf_counter() - start:.3f}s，{len(index.segments)}个段")
+
+    for query in ["有机大米", "云南 茶叶", "野生蜂蜜 无农药", "核桃", "枣"]:
+        index.search(query)
+        rounds = 200
+        start = time.perf_counter()
+        for _ in range(rounds):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+        print(f"查询「{query}」：{elapsed:.3f} ms，首条 {results[0][0] if results else '-'}")
+
+
+if __name__ == "__main__":
+    main()
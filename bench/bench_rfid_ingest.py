@@ -0,0 +1,39 @@
+# RFID扫描事件批量写入基准：python bench/bench_rfid_ingest.py [事件总数] [批大小]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logistics import RfidEventLog, STATIONS
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    rng = np.random.default_rng(0)
+    n_orders = max(total // len(STATIONS), 1)
+
+    order_ids = rng.integers(0, n_orders, total, dtype=np.int64) + 250101000000000000
+    stations = rng.integers(0, len(STATIONS), total, dtype=np.int8)
+    ts = rng.integers(1_735_660_800, 1_735_660_800 + 86400, total, dtype=np.int64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, path in (("内存", None), ("落盘", tmp)):
+            log = RfidEventLog(path)
+            start = time.perf_counter()
+            for i in range(0, total, batch):
+                log.ingest(order_ids[i:i + batch], stations[i:i + batch], ts[i:i + batch])
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {total}条事件，批大小{batch}，耗时{elapsed:.2f}s，{total / elapsed:,.0f} 条/秒")
+
+        start = time.perf_counter()
+        RfidEventLog(tmp)
+        print(f"重启恢复索引：{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
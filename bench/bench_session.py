@@ -0,0 +1,83 @@
+# 会话状态外置基准：每次页面运行的读取 + 写回开销，以及多进程交替服务同一批用户时的一致性
+#   python bench/bench_session.py --sessions 200 --reruns 20 --workers 4
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from session import MemoryBackend, SessionStore, SqliteBackend, new_token
+
+
+def rerun(store, token, state, change):
+    store.restore(token, state)
+    if change:
+        state["cart"] = state.get("cart", []) + [{"name": "有机大米", "price": 68, "quantity": 1, "total": 68}]
+    store.persist(token, state)
+
+
+def measure(label, store, sessions, reruns, change_every):
+    tokens = [new_token() for _ in range(sessions)]
+    states = [{"cart": [], "orders": [], "user_logged_in": True, "username": f"user{i}"} for i in range(sessions)]
+    timings = []
+    for step in range(reruns):
+        for token, state in zip(tokens, states):
+            start = time.perf_counter()
+            rerun(store, token, state, change_every and step % change_every == 0)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:<26} p50 {timings[len(timings) // 2] * 1e6:7.1f} µs  p99 {timings[int(len(timings) * 0.99)] * 1e6:7.1f} µs")
+
+
+def worker(path, tokens, index, workers, rounds, barrier):
+    # 每个进程一个独立的 SessionStore（各自的读缓存）；每轮每个会话只由一个进程处理，下一轮换到另一个进程，
+    # 模拟浏览器重连到不同进程，各进程缓存里的旧版本必须被识别出来
+    store = SessionStore(SqliteBackend(path))
+    for round_no in range(rounds):
+        for i, token in enumerate(tokens):
+            if (i + round_no) % workers == index:
+                rerun(store, token, {}, True)
+        barrier.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for change_every, note in ((0, "无变化"), (5, "每5次运行改一次购物车")):
+            measure(f"memory（{note}）", SessionStore(MemoryBackend()), args.sessions, args.reruns, change_every)
+            measure(f"sqlite（{note}）", SessionStore(SqliteBackend(os.path.join(tmp, f"s{change_every}.db"))), args.sessions, args.reruns, change_every)
+
+        # 多进程轮流服务同一批会话：各进程之间只靠 SQLite 共享，最终每个会话的商品数应正好等于轮数
+        path = os.path.join(tmp, "shared.db")
+        tokens = [new_token() for _ in range(args.sessions)]
+        SessionStore(SqliteBackend(path))
+        rounds = 3 * args.workers
+        barrier = multiprocessing.Barrier(args.workers)
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=worker, args=(path, tokens, index, args.workers, rounds, barrier)) for index in range(args.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        store = SessionStore(SqliteBackend(path))
+        counts = set()
+        for token in tokens:
+            state = {}
+            store.restore(token, state)
+            counts.add(len(state["cart"]))
+        print(f"{args.workers} 个进程轮流服务 {args.sessions} 个会话 x {rounds} 轮：{args.sessions * rounds / elapsed:,.0f} 次运行/秒，"
+              f"每个会话商品数 {sorted(counts)}（期望 [{rounds}]）")
+
+
+if __name__ == "__main__":
+    main()
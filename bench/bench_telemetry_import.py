@@ -0,0 +1,82 @@
+# 传感器数据导入基准：生成 N 行的 CSV / 行协议文件（含少量重复与坏行），流式导入并统计吞吐与峰值内存
+#   python bench/bench_telemetry_import.py --rows 5000000 --format csv
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from telemetry import CHUNK_ROWS, SENSORS, TelemetryStore
+
+FARMS = ["河北农场", "山东农场", "云南农场", "河南农场"]
+
+
+def peak_rss_mb(reset=False):
+    # VmHWM 为进程 RSS 峰值；写 5 到 clear_refs 可把峰值重置为当前值
+    if reset:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def write_file(path, rows, fmt, rng, block=500_000):
+    # 分块写出，生成文件本身也不占用与文件等大的内存；每个传感器每分钟一条读数，约1%重复、0.5%坏行
+    start = 1_735_689_600
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "csv":
+            f.write("farm,sensor,timestamp,value\n")
+        written = 0
+        while written < rows:
+            n = min(block, rows - written)
+            i = np.arange(written, written + n)
+            i = np.where(rng.random(n) < 0.01, np.maximum(i - 1, 0), i)
+            farm = i % len(FARMS)
+            sensor = (i // len(FARMS)) % len(SENSORS)
+            ts = start + (i // (len(FARMS) * len(SENSORS))) * 60
+            value = np.round(rng.uniform(10, 60, n), 2).astype(str)
+            value[rng.random(n) < 0.005] = "NaN?"
+            if fmt == "csv":
+                lines = [f"{FARMS[a]},{SENSORS[b]},{c},{d}\n" for a, b, c, d in zip(farm.tolist(), sensor.tolist(), ts.tolist(), value.tolist())]
+            else:
+                lines = [f"env,farm={FARMS[a]} {SENSORS[b]}={d} {c}000000000\n" for a, b, c, d in zip(farm.tolist(), sensor.tolist(), ts.tolist(), value.tolist())]
+            f.writelines(lines)
+            written += n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--format", choices=["csv", "lp"], default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, f"telemetry.{args.format}")
+        write_file(source, args.rows, args.format, np.random.default_rng(0))
+        size_mb = os.path.getsize(source) / 2**20
+        rss_before = peak_rss_mb(reset=True)
+
+        store = TelemetryStore(os.path.join(tmp, "store"))
+        report = store.import_file(source, chunk_rows=args.chunk_rows)
+        peak = peak_rss_mb()
+
+        print(f"文件 {size_mb:,.0f} MB，{report['rows']:,} 行（{args.format}，每块 {args.chunk_rows:,} 行）")
+        print(f"耗时 {report['seconds']:.1f}s，{report['rows_per_second']:,.0f} 行/秒")
+        print(f"写入 {report['accepted']:,}，重复 {report['duplicates']:,}，拒绝 {sum(report['rejected'].values()):,} {report['rejected']}")
+        print(f"去重键段 {len(store.runs)} 个，小时汇总 {len(store._hour_keys):,} 行")
+        print(f"RSS：导入前 {rss_before:,.0f} MB，导入过程峰值 {peak:,.0f} MB")
+
+        again = store.import_file(source, chunk_rows=args.chunk_rows)
+        print(f"重复导入同一文件：写入 {again['accepted']:,}，重复 {again['duplicates']:,}，{again['rows_per_second']:,.0f} 行/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+# 合成数据生成器：按随机种子生成用户、商品、农场库存、订单（RFID 扫描、碳足迹、共购、平台日表）、
+# 会员、民宿与亲子活动预订、交易日志（入会、年票、营养订阅）、传感器读数，写成应用使用的数据格式；
+# 种子、规模与基准日期相同则结果完全相同
+#   python bench/generate_data.py --scale 1m --out /tmp/farm-1m        生成到 /tmp/farm-1m/data
+#   python bench/generate_data.py --scale 10m --out /tmp/farm-10m --telemetry-rows 0
+#   cd /tmp/farm-1m && streamlit run /path/to/app.py                  在生成的数据上运行应用
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from activities import ACTIVITY_TYPES, PASS_DAYS, PASS_PRICE, SLOT_CAPACITY, TIME_SLOTS
+from carbon import DELIVERY_FACTOR, CarbonLedger
+from catalog import FRESH, MALL, publish
+from geo import CITY_COORDS, FARM_COORDS, ROAD_FACTOR, haversine_km
+from homestays import HORIZON_DAYS, AvailabilityCalendar
+from journal import SNAPSHOT_EVERY, EventJournal
+from logistics import COLUMNS as RFID_COLUMNS, STATIONS
+from membership import COLUMNS as MEMBER_COLUMNS, FARM_ACTIVITY, FREE_STAY, MEMBERSHIP_DAYS, TIERS
+from platform_stats import ROLLUP_FIELDS
+from recommend import CoPurchaseIndex
+from telemetry import SENSORS, TelemetryStore
+
+# 规模档位：订单数，其余各表按订单数折算（可用参数单独覆盖）
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# 订单、传感器读数按块生成，每块内全部为向量运算
+CHUNK_ROWS = 1_000_000
+
+SEED_FILES = ("catalog.json", "farm_stock.json")
+
+ROLES = {"消费者": 0.9, "农户": 0.07, "商家": 0.03}
+
+# 品类 -> (基础价格, 碳足迹, 图片, 商品基名)
+MALL_CATEGORIES = {
+    "粮油": (25, 0.4, "images/resized/有机大米.png", ["大米", "小米", "面粉", "玉米面", "菜籽油", "花生油", "杂粮"]),
+    "饮品": (40, 0.2, "images/resized/茶叶.png", ["绿茶", "红茶", "花茶", "乌龙茶"]),
+    "水果": (15, 0.3, "images/resized/苹果.png", ["苹果", "梨", "橙子", "猕猴桃", "葡萄"]),
+    "调味品": (35, 0.2, "images/resized/生态蜂蜜.png", ["蜂蜜", "酱油", "米醋", "花椒"]),
+    "蔬菜": (8, 0.1, "images/resized/菠菜.png", ["菠菜", "油麦菜", "芹菜"]),
+    "禽蛋": (25, 0.4, "images/resized/鸡蛋.png", ["鸡蛋", "鸭蛋", "鹌鹑蛋"]),
+}
+# 生鲜均为蔬菜：商品基名 -> 图片
+FRESH_BASES = {
+    "西红柿": "images/resized/西红柿.png",
+    "白菜": "images/resized/白菜.png",
+    "土豆": "images/resized/土豆.png",
+    "茄子": "images/resized/茄子.png",
+    "胡萝卜": "images/resized/胡萝卜.png",
+    "辣椒": "images/resized/辣椒.png",
+}
+FRESH_PRICE, FRESH_CARBON = 6, 0.12
+ADJECTIVES = ["有机", "生态", "高山", "农家", "低碳", "精选", "散养", "原生态"]
+SPECS = ["500g", "1kg", "2.5kg", "5kg", "礼盒装", "家庭装"]
+
+# 营养订阅计划（与订阅页相同）：计划 -> (每期价格, 每期餐数, 配送周期天数)
+SUBSCRIPTION_PLANS = {"每周配送": (298, 21, 7), "每两周配送": (168, 10, 14), "每月配送": (98, 5, 30)}
+PAYMENTS = ["微信支付", "支付宝", "银行卡"]
+# 每期结束后退订的概率
+SUBSCRIPTION_CHURN = 0.15
+
+# 各传感器的 (日均值, 日变化幅度, 噪声)
+SENSOR_PROFILES = {
+    "temperature": (22.0, 7.5, 0.5),
+    "humidity": (65.0, 12.0, 2.0),
+    "light": (400.0, 450.0, 30.0),
+    "soil_moisture": (60.0, 2.0, 1.0),
+}
+
+
+def table_rng(seed, table):
+    # 每张表独立的随机流，调整一张表的规模不影响其他表
+    return np.random.default_rng([seed, table])
+
+
+def skewed(rng, n, size, power=3.0):
+    # 0..n-1 的偏斜抽样：编号越小越常被抽到（少数活跃用户、爆款商品）
+    return np.minimum((n * rng.random(size) ** power).astype(np.int64), n - 1)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def gen_users(data_dir, n, rng, today):
+    with open(os.path.join(ROOT, "data", "users.json"), "r", encoding="utf-8") as f:
+        users = json.load(f)["users"]
+    roles = np.array(list(ROLES))[rng.choice(len(ROLES), n, p=list(ROLES.values()))]
+    registered = pd.to_datetime(today) - pd.to_timedelta(rng.integers(0, 730, n), unit="D")
+    users += [
+        {"username": f"user{i:07d}", "password": f"pw{i:07d}", "role": role, "register_time": day}
+        for i, (role, day) in enumerate(zip(roles.tolist(), registered.strftime("%Y-%m-%d").tolist()))
+    ]
+    write_json(os.path.join(data_dir, "users.json"), {"users": users})
+    return [user["username"] for user in users], {user["username"]: user["register_time"] for user in users if user["role"] == "农户"}
+
+
+def gen_catalog(data_dir, n_mall, n_fresh, rng):
+    # 原有商品保留在前面（页面、产量预估与调度里按名称引用），其后追加合成商品
+    with open(os.path.join(ROOT, "data", "catalog.json"), "r", encoding="utf-8") as f:
+        seed = json.load(f)["products"]
+    farms = list(FARM_COORDS)
+    mall_bases = [(category, base) for category, (_, _, _, bases) in MALL_CATEGORIES.items() for base in bases]
+    columns = {name: [] for name in ("name", "channel", "category", "origin", "price", "carbon", "stock", "delivery_time", "image", "description", "trace_id")}
+    for record in seed:
+        for name in columns:
+            columns[name].append(record.get(name))
+
+    for channel, n, bases in ((MALL, n_mall, mall_bases), (FRESH, n_fresh, [("蔬菜", base) for base in FRESH_BASES])):
+        base = rng.integers(0, len(bases), n)
+        origin = np.array(farms)[rng.integers(0, len(farms), n)]
+        adjective = np.array(ADJECTIVES)[rng.integers(0, len(ADJECTIVES), n)]
+        spec = np.array(SPECS)[rng.integers(0, len(SPECS), n)]
+        category = np.array([bases[b][0] for b in base.tolist()])
+        base_name = np.array([bases[b][1] for b in base.tolist()])
+        if channel == MALL:
+            price0 = np.array([MALL_CATEGORIES[c][0] for c in category.tolist()], dtype=float)
+            carbon0 = np.array([MALL_CATEGORIES[c][1] for c in category.tolist()])
+            image = [MALL_CATEGORIES[c][2] for c in category.tolist()]
+        else:
+            price0, carbon0 = np.full(n, float(FRESH_PRICE)), np.full(n, FRESH_CARBON)
+            image = [FRESH_BASES[b] for b in base_name.tolist()]
+        names = pd.Series([f"{o[:2]}{a}{b}（{s}）" for o, a, b, s in zip(origin.tolist(), adjective.tolist(), base_name.tolist(), spec.tolist())])
+        # 组合重复时追加序号，保证商品名唯一
+        repeat = names.groupby(names).cumcount()
+        names = names.where(repeat == 0, names + "-" + (repeat + 1).astype(str))
+        start = len(columns["name"])
+        columns["name"] += names.tolist()
+        columns["channel"] += [channel] * n
+        columns["category"] += category.tolist()
+        columns["origin"] += origin.tolist()
+        columns["price"] += np.round(price0 * rng.lognormal(0, 0.35, n), 1).tolist()
+        columns["carbon"] += np.round(carbon0 * rng.lognormal(0, 0.3, n), 3).tolist()
+        columns["stock"] += rng.integers(0, 500, n).tolist()
+        columns["delivery_time"] += (rng.integers(3, 13, n) if channel == FRESH else np.zeros(n, dtype=int)).tolist()
+        columns["image"] += image
+        columns["description"] += [f"{o}直采，{a}{b}，规格{s}" for o, a, b, s in zip(origin.tolist(), adjective.tolist(), base_name.tolist(), spec.tolist())]
+        columns["trace_id"] += [f"SY{i:08d}" for i in range(start, start + n)]
+
+    publish(os.path.join(data_dir, "catalog"), columns)
+    return pd.DataFrame({name: columns[name] for name in ("name", "channel", "category", "origin", "price", "carbon")})
+
+
+def gen_stock(data_dir, catalog, rng):
+    # 每个农场随机备货约四成生鲜
+    fresh = catalog.loc[catalog["channel"] == FRESH, "name"].tolist()
+    stock = {}
+    for farm in FARM_COORDS:
+        carried = rng.random(len(fresh)) < 0.4
+        stock[farm] = dict(zip(np.array(fresh)[carried].tolist(), rng.integers(20, 400, carried.sum()).tolist()))
+    os.makedirs(os.path.join(data_dir, "dispatch"), exist_ok=True)
+    write_json(os.path.join(data_dir, "dispatch", "stock.json"), stock)
+    return sum(len(items) for items in stock.values())
+
+
+def order_ids(ts, rng):
+    # 与 new_order_id 相同的格式：年月日时分秒 + 微秒
+    local = pd.to_datetime(ts, unit="s")
+    stamp = ((((local.year % 100) * 100 + local.month) * 100 + local.day) * 100 + local.hour) * 10000 + local.minute * 100 + local.second
+    return np.asarray(stamp, dtype=np.int64) * 1_000_000 + rng.integers(0, 1_000_000, len(ts))
+
+
+def gen_orders(data_dir, n_orders, usernames, catalog, rng, now):
+    # 订单：每单 1~4 个商品；写 RFID 扫描列、碳足迹台账、共购订单日志与矩阵、平台日表
+    rfid_dir = os.path.join(data_dir, "rfid")
+    os.makedirs(rfid_dir, exist_ok=True)
+    carbon_dir = os.path.join(data_dir, "carbon")
+    os.makedirs(carbon_dir, exist_ok=True)
+    farms = list(FARM_COORDS)
+    categories = sorted(set(catalog["category"]))
+    for dim, names in (("user", usernames), ("farm", farms), ("category", categories)):
+        with open(os.path.join(carbon_dir, f"{dim}_names.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(names) + "\n")
+    ledger = CarbonLedger(carbon_dir)
+    index = CoPurchaseIndex(os.path.join(data_dir, "recommend"))
+    basket_log = open(os.path.join(data_dir, "recommend", "orders.jsonl"), "w", encoding="utf-8")
+
+    names = catalog["name"].to_numpy()
+    by_rank = np.argsort(names)
+    name_rank = np.empty(len(names), dtype=np.int64)
+    name_rank[by_rank] = np.arange(len(names))
+    price = catalog["price"].to_numpy(dtype=np.float64)
+    carbon = catalog["carbon"].to_numpy(dtype=np.float64)
+    farm_code = pd.Categorical(catalog["origin"], categories=farms).codes
+    category_code = pd.Categorical(catalog["category"], categories=categories).codes
+    # 配送城市 x 农场 公路里程
+    cities = np.array(list(CITY_COORDS.values()))
+    farm_coords = np.array([FARM_COORDS[farm] for farm in farms])
+    road = haversine_km(cities[:, None, 0], cities[:, None, 1], farm_coords[None, :, 0], farm_coords[None, :, 1]) * ROAD_FACTOR
+
+    days = 365
+    today = now.date()
+    revenue_by_day = np.zeros(days)
+    orders_by_day = np.zeros(days, dtype=np.int64)
+    events = lines_total = 0
+    for start in range(0, n_orders, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, n_orders - start)
+        age = rng.integers(0, days * 86400, n)
+        ts = int(now.timestamp()) - age
+        user = skewed(rng, len(usernames), n)
+        city = rng.integers(0, len(cities), n)
+        size = rng.choice([1, 2, 3, 4], n, p=[0.4, 0.3, 0.2, 0.1])
+
+        # 订单行：按订单展开
+        line_order = np.repeat(np.arange(n), size)
+        sku = skewed(rng, len(names), len(line_order), power=2.5)
+        quantity = rng.integers(1, 6, len(line_order))
+        month = np.asarray(pd.to_datetime(ts, unit="s").to_period("M").asi8, dtype=np.int32)
+        ledger.append_columns(
+            month[line_order], user[line_order], farm_code[sku], category_code[sku],
+            carbon[sku] * quantity, road[city[line_order], farm_code[sku]] * quantity * DELIVERY_FACTOR,
+        )
+        lines_total += len(line_order)
+        day = age // 86400
+        revenue_by_day += np.bincount(day[line_order], weights=price[sku] * quantity, minlength=days)
+        orders_by_day += np.bincount(day, minlength=days)
+
+        # 共购：去重后至少两个商品的订单，订单内按商品名排序（与 record_order 写入的格式一致）
+        pairs = np.unique(line_order * len(names) + name_rank[sku])
+        basket_order, ranked = np.divmod(pairs, len(names))
+        starts = np.flatnonzero(np.diff(basket_order, prepend=-1))
+        ends = np.append(starts[1:], len(pairs))
+        multi = ends - starts > 1
+        basket_names = names[by_rank[ranked]].tolist()
+        baskets = [basket_names[lo:hi] for lo, hi in zip(starts[multi].tolist(), ends[multi].tolist())]
+        basket_log.writelines(json.dumps(basket, ensure_ascii=False) + "\n" for basket in baskets)
+        index.add_orders(baskets)
+
+        # RFID：按下单时长推进到相应站点，每个站点间隔 2~8 小时
+        reached = np.minimum(age // (6 * 3600) + 1, len(STATIONS))
+        event_order = np.repeat(np.arange(n), reached)
+        station = np.arange(len(event_order)) - np.repeat(np.cumsum(reached) - reached, reached)
+        gaps = np.cumsum(rng.integers(2 * 3600, 8 * 3600, len(event_order)) * (station > 0))
+        offset = gaps - np.repeat(gaps[np.cumsum(reached) - reached], reached)
+        scan_ts = np.minimum(ts[event_order] + offset, int(now.timestamp()))
+        ids = order_ids(ts, rng)[event_order]
+        for name, values in (("order_id", ids), ("station", station), ("ts", scan_ts)):
+            with open(os.path.join(rfid_dir, f"{name}.bin"), "ab") as f:
+                values.astype(RFID_COLUMNS[name]).tofile(f)
+        events += len(event_order)
+    basket_log.close()
+
+    index.processed = os.path.getsize(index._file("orders.jsonl"))
+    index.similar = index.top_similar()
+    index._save()
+
+    stats_dir = os.path.join(data_dir, "platform_stats")
+    os.makedirs(stats_dir, exist_ok=True)
+    daily = {}
+    for offset in range(days):
+        row = [0] * len(ROLLUP_FIELDS)
+        row[ROLLUP_FIELDS.index("revenue")] = round(float(revenue_by_day[offset]), 2)
+        row[ROLLUP_FIELDS.index("orders")] = int(orders_by_day[offset])
+        daily[(today - timedelta(days=offset)).isoformat()] = row
+    write_json(os.path.join(stats_dir, "daily.json"), daily)
+    return lines_total, events
+
+
+def gen_platform_entities(data_dir, farmers, catalog):
+    # 农户按注册日期计入日表的新增数（首页"服务农户"环比）；基地与商品视为一年前已登记
+    stats_dir = os.path.join(data_dir, "platform_stats")
+    with open(os.path.join(stats_dir, "daily.json"), "r", encoding="utf-8") as f:
+        daily = json.load(f)
+    for day, count in pd.Series(list(farmers.values())).value_counts().items():
+        if day in daily:
+            daily[day][ROLLUP_FIELDS.index("farmers")] = int(count)
+    write_json(os.path.join(stats_dir, "daily.json"), daily)
+    entities = {"farmers": sorted(farmers), "farms": sorted(set(catalog["origin"])), "skus": sorted(catalog["name"])}
+    write_json(os.path.join(stats_dir, "entities.json"), entities)
+    return {name: len(values) for name, values in entities.items()}
+
+
+def gen_memberships(data_dir, usernames, n_members, rng, today):
+    # 会员台账（members.jsonl + 列文件）：入会时发放年度权益，之后随机核销一部分
+    path = os.path.join(data_dir, "membership")
+    os.makedirs(path, exist_ok=True)
+    members = np.array(usernames)[rng.choice(len(usernames), n_members, replace=False)]
+    tiers = list(TIERS)
+    tier = rng.integers(0, len(tiers), n_members)
+    joined = rng.integers(0, MEMBERSHIP_DAYS, n_members)
+    epoch_today = (today - date(1970, 1, 1)).days
+    join_day = epoch_today - joined
+    expires = pd.to_datetime(join_day + MEMBERSHIP_DAYS, unit="D").strftime("%Y-%m-%d")
+    with open(os.path.join(path, "members.jsonl"), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"member": m, "tier": tiers[t], "expires": e}, ensure_ascii=False) + "\n"
+                     for m, t, e in zip(members.tolist(), tier.tolist(), expires.tolist()))
+
+    rows = {name: [] for name in MEMBER_COLUMNS}
+    idx = np.arange(n_members)
+    for benefit, field in ((FREE_STAY, "free_stays"), (FARM_ACTIVITY, "farm_activities")):
+        grant = np.array([TIERS[t][field] for t in tiers])[tier]
+        has = grant > 0
+        used = (rng.random(n_members) * (grant + 1)).astype(np.int64) * has
+        redeemed = used > 0
+        rows["member"] += [idx[has], idx[redeemed]]
+        rows["benefit"] += [np.full(has.sum(), benefit), np.full(redeemed.sum(), benefit)]
+        rows["delta"] += [grant[has], -used[redeemed]]
+        rows["day"] += [join_day[has], np.minimum(join_day + rng.integers(1, MEMBERSHIP_DAYS, n_members), epoch_today)[redeemed]]
+    # 按日期排序，与逐笔记账的顺序一致
+    columns = {name: np.concatenate(parts) for name, parts in rows.items()}
+    order = np.argsort(columns["day"], kind="stable")
+    for name, dtype in MEMBER_COLUMNS.items():
+        columns[name][order].astype(dtype).tofile(os.path.join(path, f"{name}.bin"))
+    # 入会记录另写入交易日志
+    joins = pd.DataFrame({"member": members, "tier": np.array(tiers)[tier], "expires": expires, "day": join_day})
+    return len(order), joins
+
+
+def gen_homestays(data_dir, usernames, rng, today, occupancy=0.6):
+    # 每个房间从今天起按入住率排满未来一年：连续的 (空档, 入住) 区间
+    calendar = AvailabilityCalendar(start=today)
+    bookings = []
+    mean_nights = 2.5
+    for location, name, number, capacity in calendar.rooms:
+        gap = rng.geometric(occupancy / (occupancy + (1 - occupancy) * mean_nights), 400) - 1
+        nights = rng.integers(1, 5, 400)
+        start = np.cumsum(gap + np.concatenate([[0], nights[:-1]]))
+        keep = start + nights <= HORIZON_DAYS
+        for s, stay, guest, guests in zip(start[keep].tolist(), nights[keep].tolist(),
+                                         skewed(rng, len(usernames), keep.sum()).tolist(), rng.integers(1, capacity + 1, keep.sum()).tolist()):
+            bookings.append({
+                "location": location, "homestay": name, "room": number,
+                "check_in": (today + timedelta(days=s)).isoformat(), "nights": stay,
+                "guests": guests, "guest": usernames[guest],
+            })
+    write_json(os.path.join(data_dir, "bookings.json"), bookings)
+    return len(bookings)
+
+
+def gen_activities(data_dir, usernames, n_bookings, rng, today):
+    # 亲子活动预订日志：过去 30 天到未来 60 天，超出每场名额的预订丢弃；另有 2% 的用户持年票
+    activities = [activity for names in ACTIVITY_TYPES.values() for activity in names]
+    frame = pd.DataFrame({
+        "activity": rng.integers(0, len(activities), n_bookings),
+        "day": rng.integers(-30, 60, n_bookings),
+        "slot": rng.integers(0, len(TIME_SLOTS), n_bookings),
+        "participants": rng.integers(1, 5, n_bookings),
+        "holder": skewed(rng, len(usernames), n_bookings),
+    })
+    frame = frame[frame.groupby(["activity", "day", "slot"])["participants"].cumsum() <= SLOT_CAPACITY]
+    holders = np.array(usernames)[rng.choice(len(usernames), max(len(usernames) // 50, 1), replace=False)]
+    pass_expires = (today + timedelta(days=PASS_DAYS // 2)).isoformat()
+    with open(os.path.join(data_dir, "activities.jsonl"), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"op": "pass", "holder": holder, "expires": pass_expires}, ensure_ascii=False) + "\n" for holder in holders.tolist())
+        f.writelines(
+            json.dumps({"op": "book", "booking": {
+                "id": i, "activity": activities[a], "date": (today + timedelta(days=d)).isoformat(), "slot": TIME_SLOTS[s],
+                "participants": p, "holder": usernames[h], "pass": False,
+            }}, ensure_ascii=False) + "\n"
+            for i, (a, d, s, p, h) in enumerate(frame.itertuples(index=False, name=None), start=1)
+        )
+    return len(frame), holders.tolist()
+
+
+def gen_journal(data_dir, usernames, joins, pass_holders, n_subscribers, rng, today):
+    # 交易日志：入会、年票（与会员台账、活动日志中的持有人一致）与营养订阅（每期续订一次，直到退订或今天），
+    # 按时间排序编号；每 SNAPSHOT_EVERY 条一个分段，最后由 EventJournal 回放并写快照，与运行一段时间后的目录相同
+    path = os.path.join(data_dir, "journal")
+    os.makedirs(path, exist_ok=True)
+    epoch_today = (today - date(1970, 1, 1)).days
+    pass_bought = epoch_today - (PASS_DAYS - PASS_DAYS // 2)
+    pass_expires = (today + timedelta(days=PASS_DAYS // 2)).isoformat()
+
+    plans = list(SUBSCRIPTION_PLANS)
+    subscribers = rng.choice(len(usernames), n_subscribers, replace=False)
+    plan = rng.integers(0, len(plans), n_subscribers)
+    period = np.array([SUBSCRIPTION_PLANS[p][2] for p in plans])[plan]
+    started = rng.integers(0, 365, n_subscribers)
+    renewals = np.minimum(started // period + 1, rng.geometric(SUBSCRIPTION_CHURN, n_subscribers))
+    sub = np.repeat(np.arange(n_subscribers), renewals)
+    nth = np.arange(len(sub)) - np.repeat(np.cumsum(renewals) - renewals, renewals)
+    payment = rng.integers(0, len(PAYMENTS), n_subscribers)
+
+    kinds = ["membership"] * len(joins) + ["pass"] * len(pass_holders) + ["subscription"] * len(sub)
+    users = joins["member"].tolist() + pass_holders + np.array(usernames)[subscribers[sub]].tolist()
+    days = np.concatenate([joins["day"].to_numpy(), np.full(len(pass_holders), pass_bought), epoch_today - started[sub] + nth * period[sub]])
+    amounts = ([float(TIERS[tier]["fee"]) for tier in joins["tier"]] + [float(PASS_PRICE)] * len(pass_holders)
+               + [float(SUBSCRIPTION_PLANS[plans[p]][0]) for p in plan[sub].tolist()])
+    data = ([{"tier": tier, "expires": expires} for tier, expires in zip(joins["tier"], joins["expires"])]
+            + [{"expires": pass_expires}] * len(pass_holders)
+            + [{"plan": plans[p], "meals": SUBSCRIPTION_PLANS[plans[p]][1], "payment": PAYMENTS[m]}
+               for p, m in zip(plan[sub].tolist(), payment[sub].tolist())])
+    # 白天下单，今天的记录不晚于基准时刻（中午）
+    midnight = int(datetime.combine(today, datetime.min.time()).timestamp())
+    ts = np.minimum(midnight - (epoch_today - days) * 86400 + rng.integers(8 * 3600, 22 * 3600, len(days)), midnight + 12 * 3600)
+
+    order = np.argsort(ts, kind="stable").tolist()
+    ts = ts.tolist()
+    for first in range(0, len(order), SNAPSHOT_EVERY):
+        # 分段文件名与 EventJournal 相同：segment-<首条序号>.jsonl
+        with open(os.path.join(path, f"segment-{first + 1:012d}.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps({"seq": seq, "ts": ts[i], "type": kinds[i], "user": users[i], "amount": amounts[i], "data": data[i]},
+                           ensure_ascii=False, separators=(",", ":")) + "\n"
+                for seq, i in enumerate(order[first:first + SNAPSHOT_EVERY], start=first + 1)
+            )
+    journal = EventJournal(path, fsync=False)
+    journal.snapshot()
+    journal.close()
+    return journal.replayed
+
+
+def gen_telemetry(data_dir, n_rows, rng, now):
+    # 所有农场、所有传感器每分钟一条读数，截至当前时刻；日变化按当地时间计算
+    store = TelemetryStore(os.path.join(data_dir, "telemetry"))
+    streams = len(FARM_COORDS) * len(SENSORS)
+    minutes = max(n_rows // streams, 1)
+    first = int(now.timestamp()) // 60 * 60 - (minutes - 1) * 60
+    latitude = np.array([lat for lat, _ in FARM_COORDS.values()])
+    profiles = np.array([SENSOR_PROFILES[name] for name in SENSORS])
+    utc_offset = now.astimezone().utcoffset().total_seconds()
+    accepted = 0
+    step = max(CHUNK_ROWS // streams, 1)
+    for start in range(0, minutes, step):
+        count = min(step, minutes - start)
+        ts = first + (start + np.arange(count)) * 60
+        hour = ((ts + utc_offset) % 86400) / 3600
+        shape = np.sin(np.pi * (hour - 6) / 12)[:, None, None]                     # (分钟, 1, 1)
+        level = profiles[:, 0] + np.where(np.array(SENSORS) == "temperature", 0.4 * (30 - latitude[:, None]), 0.0)
+        sign = np.where(np.array(SENSORS) == "humidity", -1.0, 1.0)
+        values = level + sign * profiles[:, 1] * shape + rng.normal(0, 1, (count,) + level.shape) * profiles[:, 2]
+        values[..., SENSORS.index("light")] = np.maximum(values[..., SENSORS.index("light")], 0)
+        farms, sensors = np.meshgrid(np.arange(len(FARM_COORDS)), np.arange(len(SENSORS)), indexing="ij")
+        written, _ = store.append(
+            np.broadcast_to(farms, values.shape).ravel().astype(np.int16),
+            np.broadcast_to(sensors, values.shape).ravel().astype(np.int8),
+            np.repeat(ts, streams).astype(np.int64),
+            values.ravel().astype(np.float32),
+        )
+        accepted += written
+    return accepted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="输出目录，数据写入其下的 data/")
+    parser.add_argument("--scale", choices=list(SCALES), default="100k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="基准日期（决定订单、预订与读数的时间范围）")
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--skus", type=int, help="商城商品数（生鲜为其五分之一）")
+    parser.add_argument("--members", type=int)
+    parser.add_argument("--activity-bookings", type=int)
+    parser.add_argument("--subscriptions", type=int, help="营养订阅用户数")
+    parser.add_argument("--telemetry-rows", type=int)
+    parser.add_argument("--force", action="store_true", help="覆盖已有的 data/ 目录")
+    args = parser.parse_args()
+
+    n_orders = args.orders if args.orders is not None else SCALES[args.scale]
+    n_users = args.users if args.users is not None else max(n_orders // 10, 100)
+    n_skus = args.skus if args.skus is not None else max(n_orders // 1000, 50)
+    n_members = min(args.members if args.members is not None else n_users // 5, n_users)
+    n_activity = args.activity_bookings if args.activity_bookings is not None else max(n_orders // 20, 100)
+    n_subscribers = min(args.subscriptions if args.subscriptions is not None else n_users // 20, n_users)
+    n_telemetry = args.telemetry_rows if args.telemetry_rows is not None else n_orders
+
+    data_dir = os.path.join(args.out, "data")
+    if os.path.exists(data_dir):
+        if not args.force:
+            sys.exit(f"{data_dir} 已存在，使用 --force 覆盖")
+        shutil.rmtree(data_dir)
+    os.makedirs(data_dir)
+    for name in SEED_FILES:
+        shutil.copy(os.path.join(ROOT, "data", name), data_dir)
+    # 图片与 Streamlit 配置（静态资源服务）从当前目录读取，链接到输出目录
+    for name in ("images", ".streamlit"):
+        link = os.path.join(args.out, name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(ROOT, name), link)
+
+    now = datetime.combine(args.today, datetime.min.time()) + timedelta(hours=12)
+    started = time.perf_counter()
+
+    def step(label, fn, *fn_args, rows=lambda result: result):
+        begin = time.perf_counter()
+        result = fn(*fn_args)
+        print(f"{label}\t{time.perf_counter() - begin:7.1f}s  {rows(result)}")
+        return result
+
+    usernames, farmers = step("用户", gen_users, data_dir, n_users, table_rng(args.seed, 0), args.today, rows=lambda result: len(result[0]))
+    catalog = step("商品", gen_catalog, data_dir, n_skus, max(n_skus // 5, 6), table_rng(args.seed, 1), rows=len)
+    step("农场库存", gen_stock, data_dir, catalog, table_rng(args.seed, 2))
+    step("订单行/扫描", gen_orders, data_dir, n_orders, usernames, catalog, table_rng(args.seed, 3), now)
+    step("平台实体", gen_platform_entities, data_dir, farmers, catalog)
+    _, joins = step("会员", gen_memberships, data_dir, usernames, n_members, table_rng(args.seed, 4), args.today, rows=lambda result: result[0])
+    step("民宿预订", gen_homestays, data_dir, usernames, table_rng(args.seed, 5), args.today)
+    _, pass_holders = step("活动预订", gen_activities, data_dir, usernames, n_activity, table_rng(args.seed, 6), args.today,
+                           rows=lambda result: f"{result[0]}（年票 {len(result[1])}）")
+    if n_telemetry:
+        step("传感器读数", gen_telemetry, data_dir, n_telemetry, table_rng(args.seed, 7), now)
+    step("交易日志", gen_journal, data_dir, usernames, joins, pass_holders, n_subscribers, table_rng(args.seed, 8), args.today)
+
+    size = sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(data_dir) for name in names)
+    print(f"完成：{time.perf_counter() - started:.1f}s，{size / 2**20:,.0f} MB → {data_dir}")
+
+
+if __name__ == "__main__":
+    main()
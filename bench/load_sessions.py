@@ -0,0 +1,266 @@
+# 多会话并发压测：在同一进程里启动 Streamlit Runtime，模拟 N 个浏览器会话混合执行典型操作，
+# 统计吞吐、重跑延迟分位数、进程 RSS，以及每个会话的 session_state 与媒体文件占用
+#   python bench/load_sessions.py --sessions 20 --rounds 5 --size 10000
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit import config
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.runtime import Runtime, RuntimeConfig
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.memory_uploaded_file_manager import MemoryUploadedFileManager
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+
+from bench_pages import _no_mock_sleep, populate
+
+PAGES = ["首页", "农产品自营商城", "农产家庭直供", "营养定期送服务", "共享农庄模块", "会员民宿模块", "乡村亲子模块", "购物车"]
+
+
+def rss_bytes():
+    # 当前进程常驻内存
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def deep_size(obj, seen=None):
+    # 递归估算对象占用的字节数，numpy/pandas 按实际缓冲区计算
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + sys.getsizeof(obj)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=True))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+class LoadClient:
+    # 模拟浏览器：收集每次重跑下发的控件（类型、标签、key -> 控件 id），脚本跑完时置位事件
+    def __init__(self):
+        self.widgets = {}
+        self.finished = asyncio.Event()
+        self.exceptions = 0
+
+    def write_forward_msg(self, msg):
+        kind = msg.WhichOneof("type")
+        if kind == "script_finished":
+            self.finished.set()
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_type = element.WhichOneof("type")
+            if element_type == "exception":
+                self.exceptions += 1
+            proto = getattr(element, element_type)
+            if hasattr(proto, "id") and proto.id:
+                self.widgets[(element_type, getattr(proto, "label", ""))] = proto
+                self.widgets[(element_type, proto.id.rsplit("-", 1)[-1])] = proto
+
+    def find(self, element_type, label_or_key):
+        return self.widgets[(element_type, label_or_key)]
+
+
+class Session:
+    def __init__(self, runtime, rng):
+        self.runtime = runtime
+        self.rng = rng
+        self.client = LoadClient()
+        self.id = runtime.connect_session(client=self.client, user_info={"email": None})
+        self.latencies = []
+
+    async def rerun(self, **widgets):
+        # widgets: {控件 id: (字段名, 值)}，未提交的控件保持上一次的值
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        for widget_id, (field, value) in widgets.items():
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if field.endswith("_array_value"):
+                getattr(state, field).data.extend(value)
+            else:
+                setattr(state, field, value)
+        self.client.finished.clear()
+        start = time.perf_counter()
+        self.runtime.handle_backmsg(self.id, msg)
+        await self.client.finished.wait()
+        self.latencies.append(time.perf_counter() - start)
+
+    async def goto(self, page):
+        radio = self.client.find("radio", "")
+        await self.rerun(**{radio.id: ("int_value", PAGES.index(page))})
+
+    async def click(self, label_or_key):
+        await self.rerun(**{self.client.find("button", label_or_key).id: ("trigger_value", True)})
+
+    async def type(self, label, text):
+        await self.rerun(**{self.client.find("text_input", label).id: ("string_value", text)})
+
+    async def choose(self, label, option):
+        selectbox = self.client.find("selectbox", label)
+        await self.rerun(**{selectbox.id: ("int_value", list(selectbox.options).index(option))})
+
+    async def login(self, username, password):
+        await self.rerun(**{
+            self.client.find("text_input", "用户名").id: ("string_value", username),
+            self.client.find("text_input", "密码").id: ("string_value", password),
+        })
+        await self.click("登录")
+
+
+# 混合脚本：每个会话每轮随机选一个
+async def browse(session):
+    await session.goto("农产品自营商城")
+    await session.choose("商品分类", "粮油")
+    await session.type("搜索商品", "有机")
+    await session.goto("首页")
+
+
+async def shop(session):
+    await session.goto("农产品自营商城")
+    await session.click("add_有机大米")
+    await session.click("add_茶叶")
+    await session.goto("购物车")
+
+
+async def family_order(session):
+    await session.goto("农产家庭直供")
+    await session.click("buy_生态西红柿")
+    await session.type("配送地址", "上海市浦东新区")
+    await session.type("联系电话", "13800000000")
+    await session.click("立即下单")
+
+
+async def farm(session):
+    await session.goto("共享农庄模块")
+    await session.choose("选择监测农场", session.rng.choice(["河北农场", "山东农场", "云南农场"]))
+    await session.choose("选择农场", session.rng.choice(["河北农场", "山东农场", "云南农场"]))
+
+
+async def stay(session):
+    await session.goto("会员民宿模块")
+    await session.choose("民宿地点", session.rng.choice(["河北农庄", "山东农庄", "云南农庄"]))
+    await session.goto("乡村亲子模块")
+
+
+SCRIPTS = [browse, shop, family_order, farm, stay]
+
+
+async def run_session(runtime, index, rounds, logins):
+    session = Session(runtime, random.Random(index))
+    await session.rerun()
+    if index % 2 == 0:
+        await session.login(*logins[index % len(logins)])
+    for _ in range(rounds):
+        await session.rng.choice(SCRIPTS)(session)
+    return session
+
+
+def session_breakdown(runtime, sessions):
+    # 每个会话 session_state 按键的字节数，以及该会话引用的媒体文件字节数
+    media_mgr = runtime.media_file_mgr
+    storage = media_mgr._storage
+    state_rows, media_bytes = [], []
+    for session in sessions:
+        info = runtime._session_mgr.get_session_info(session.id)
+        state = info.session.session_state
+        for key in state.filtered_state:
+            state_rows.append((key, deep_size(state[key])))
+        file_ids = media_mgr._files_by_session_and_coord.get(session.id, {}).values()
+        media_bytes.append(sum(storage._files_by_id[file_id].content_size for file_id in file_ids if file_id in storage._files_by_id))
+    state_df = pd.DataFrame(state_rows, columns=["键", "字节"])
+    per_key = state_df.groupby("键")["字节"].agg(["mean", "max"]).sort_values("mean", ascending=False)
+    unique_media = sum(f.content_size for f in storage._files_by_id.values())
+    return per_key, state_df["字节"].sum() / len(sessions), np.array(media_bytes), unique_media
+
+
+async def main_async(args):
+    config.set_option("server.fileWatcherType", "none")
+    # 关闭消息缓存，压测客户端总能收到完整的控件信息
+    config.set_option("global.minCachedMessageSize", 1 << 60)
+    runtime = Runtime(RuntimeConfig(
+        script_path=os.path.join(ROOT, "app.py"),
+        command_line=None,
+        media_file_storage=MemoryMediaFileStorage("/media"),
+        uploaded_file_manager=MemoryUploadedFileManager("/_stcore/upload_file"),
+        cache_storage_manager=MemoryCacheStorageManager(),
+    ))
+    await runtime.start()
+    logins = [("customer1", "cust2025"), ("admin", "admin123"), ("farmer1", "farm2025")]
+
+    rss_start = rss_bytes()
+    # 先跑一个会话预热缓存，避免首轮加载计入压测
+    await run_session(runtime, -1, 1, logins)
+    rss_warm = rss_bytes()
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(run_session(runtime, i, args.rounds, logins) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    rss_end = rss_bytes()
+
+    latencies = np.array([t for s in sessions for t in s.latencies]) * 1000
+    print(f"会话数 {args.sessions}，每会话 {args.rounds} 轮，共 {len(latencies)} 次重跑，耗时 {elapsed:.1f}s")
+    print(f"吞吐：{len(latencies) / elapsed:.1f} 次重跑/秒")
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"重跑延迟：p50 {p50:.0f} ms，p95 {p95:.0f} ms，p99 {p99:.0f} ms，最大 {latencies.max():.0f} ms")
+    print(f"进程 RSS：启动 {rss_start / 2**20:.0f} MB，预热后 {rss_warm / 2**20:.0f} MB，压测后 {rss_end / 2**20:.0f} MB，"
+          f"每会话约 {(rss_end - rss_warm) / args.sessions / 2**10:.0f} KB")
+    exceptions = sum(s.client.exceptions for s in sessions)
+    if exceptions:
+        print(f"页面异常：{exceptions} 次")
+
+    per_key, state_avg, media_bytes, unique_media = session_breakdown(runtime, sessions)
+    print(f"session_state：每会话平均 {state_avg / 1024:.1f} KB")
+    print((per_key / 1024).round(2).rename(columns={"mean": "平均KB", "max": "最大KB"}).head(args.top).to_string())
+    print(f"媒体文件：每会话引用平均 {media_bytes.mean() / 1024:.0f} KB，最大 {media_bytes.max() / 1024:.0f} KB，"
+          f"去重后共 {unique_media / 2**20:.1f} MB")
+
+    runtime.stop()
+    await runtime.stopped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--size", type=int, default=10_000, help="预置历史数据规模")
+    parser.add_argument("--top", type=int, default=10, help="显示占用最多的 session_state 键数")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, mock.patch("time.sleep", _no_mock_sleep):
+        os.makedirs(os.path.join(tmp, "data"))
+        for name in ("users.json", "catalog.json", "farm_stock.json"):
+            shutil.copy(os.path.join(ROOT, "data", name), os.path.join(tmp, "data", name))
+        os.symlink(os.path.join(ROOT, "images"), os.path.join(tmp, "images"))
+        os.chdir(tmp)
+        try:
+            populate(args.size, np.random.default_rng(0))
+            asyncio.run(main_async(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from geo import road_km
+
+# 冷链配送排放因子：每件（斤）商品每公里的碳排放(kg CO2e)
+DELIVERY_FACTOR = 0.0002
+
+COLUMNS = {
+    "month": np.int32,      # 自1970-01起的月份序号
+    "user": np.int32,
+    "farm": np.int32,
+    "category": np.int32,
+    "product": np.float32,  # 商品碳足迹(kg)
+    "delivery": np.float32, # 配送碳足迹(kg)
+}
+
+DIMENSIONS = ("user", "farm", "category")
+
+
+def line_carbon(carbon, quantity, origin, address=""):
+    # 单条订单行：商品碳足迹 x 数量 + 按里程计算的配送碳足迹
+    product = carbon * quantity
+    delivery = road_km(origin, address) * quantity * DELIVERY_FACTOR
+    return product, delivery
+
+
+def cart_carbon(lines, address=""):
+    # lines: [(碳足迹, 数量, 产地), ...]，返回 (商品合计, 配送合计)
+    product = delivery = 0.0
+    for carbon, quantity, origin in lines:
+        p, d = line_carbon(carbon, quantity, origin, address)
+        product += p
+        delivery += d
+    return product, delivery
+
+
+class CarbonLedger:
+    # 碳足迹账本：每条订单行一行列式记录，用户/农场/品类编码为整数，
+    # 月度汇总按 (月份, 维度) 组合键一次 bincount 完成
+
+    def __init__(self, path=None, capacity=1 << 16):
+        self.path = path
+        self._lock = threading.Lock()
+        self._size = 0
+        self._cols = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._codes = {dim: {} for dim in DIMENSIONS}
+        self._names = {dim: [] for dim in DIMENSIONS}
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return self._size
+
+    def _load(self):
+        for dim in DIMENSIONS:
+            names_file = os.path.join(self.path, f"{dim}_names.txt")
+            if os.path.exists(names_file):
+                # 只重建内存编码，不能经 _code 写回（否则每次启动都把名称表整个再追加一遍）
+                with open(names_file, "r", encoding="utf-8") as f:
+                    for name in f.read().splitlines():
+                        if name not in self._codes[dim]:
+                            self._codes[dim][name] = len(self._names[dim])
+                            self._names[dim].append(name)
+        arrays = {}
+        for name, dtype in COLUMNS.items():
+            file_path = os.path.join(self.path, f"{name}.bin")
+            arrays[name] = np.fromfile(file_path, dtype=dtype) if os.path.exists(file_path) else np.empty(0, dtype=dtype)
+        n = min(len(a) for a in arrays.values())
+        self._append({name: a[:n] for name, a in arrays.items()}, persist=False)
+
+    def _code(self, dim, name):
+        code = self._codes[dim].get(name)
+        if code is None:
+            code = self._codes[dim][name] = len(self._names[dim])
+            self._names[dim].append(name)
+            if self.path:
+                with open(os.path.join(self.path, f"{dim}_names.txt"), "a", encoding="utf-8") as f:
+                    f.write(name + "\n")
+        return code
+
+    def _append(self, arrays, persist=True):
+        n = len(arrays["month"])
+        need = self._size + n
+        if need > len(self._cols["month"]):
+            capacity = len(self._cols["month"])
+            while capacity < need:
+                capacity *= 2
+            for name, col in self._cols.items():
+                grown = np.empty(capacity, dtype=col.dtype)
+                grown[:self._size] = col[:self._size]
+                self._cols[name] = grown
+        for name, dtype in COLUMNS.items():
+            values = np.asarray(arrays[name], dtype=dtype)
+            self._cols[name][self._size:need] = values
+            if persist and self.path:
+                with open(os.path.join(self.path, f"{name}.bin"), "ab") as f:
+                    values.tofile(f)
+        self._size = need
+
+    def record_order(self, user, lines, address="", day=None):
+        # lines: [(农场, 品类, 碳足迹, 数量), ...]；返回本单 (商品, 配送) 碳足迹
+        day = day or date.today()
+        month = (day.year - 1970) * 12 + day.month - 1
+        with self._lock:
+            rows = {name: [] for name in COLUMNS}
+            for farm, category, carbon, quantity in lines:
+                product, delivery = line_carbon(carbon, quantity, farm, address)
+                rows["month"].append(month)
+                rows["user"].append(self._code("user", user))
+                rows["farm"].append(self._code("farm", farm))
+                rows["category"].append(self._code("category", category))
+                rows["product"].append(product)
+                rows["delivery"].append(delivery)
+            self._append(rows)
+        return sum(rows["product"]), sum(rows["delivery"])
+
+    def append_columns(self, month, user, farm, category, product, delivery):
+        # 批量写入已编码的订单行（导入历史订单、压测用）
+        with self._lock:
+            self._append({
+                "month": month, "user": user, "farm": farm,
+                "category": category, "product": product, "delivery": delivery,
+            })
+
+    def monthly(self, by, code=None):
+        # 按 (月份, 维度) 向量化汇总，返回 DataFrame：月份、维度值、商品/配送/合计碳足迹(kg)
+        n = self._size
+        month = self._cols["month"][:n]
+        dim = self._cols[by][:n]
+        product = self._cols["product"][:n]
+        delivery = self._cols["delivery"][:n]
+        if code is not None:
+            mask = dim == code
+            month, dim, product, delivery = month[mask], dim[mask], product[mask], delivery[mask]
+        if len(month) == 0:
+            return pd.DataFrame(columns=["月份", by, "商品碳足迹", "配送碳足迹", "合计"])
+
+        n_dim = max(len(self._names[by]), 1)
+        first_month = int(month.min())
+        key = (month.astype(np.int64) - first_month) * n_dim + dim
+        size = (int(month.max()) - first_month + 1) * n_dim
+        if size <= max(len(key), 1 << 22):
+            # 组合键空间不大时直接按键 bincount，免去排序
+            counts = np.bincount(key, minlength=size)
+            keys = np.flatnonzero(counts)
+            product_sum = np.bincount(key, weights=product, minlength=size)[keys]
+            delivery_sum = np.bincount(key, weights=delivery, minlength=size)[keys]
+        else:
+            keys, inverse = np.unique(key, return_inverse=True)
+            product_sum = np.bincount(inverse, weights=product)
+            delivery_sum = np.bincount(inverse, weights=delivery)
+        month_labels = np.array([
+            f"{m // 12 + 1970}-{m % 12 + 1:02d}" for m in range(first_month, int(month.max()) + 1)
+        ], dtype=object)
+        names = np.array(self._names[by], dtype=object)[keys % n_dim]
+        return pd.DataFrame({
+            "月份": month_labels[keys // n_dim],
+            by: names,
+            "商品碳足迹": product_sum,
+            "配送碳足迹": delivery_sum,
+            "合计": product_sum + delivery_sum,
+        })
+
+    def user_summary(self, user):
+        code = self._codes["user"].get(user)
+        if code is None:
+            return self.monthly("user", code=-1)
+        return self.monthly("user", code=code)
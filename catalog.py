@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+# 商品目录：按列存放在 data/catalog/v{版本}/ 下，加载时以内存映射方式打开，不拷贝成 Python 对象
+# 数值列为 .npy；名称、描述等长文本为 偏移量 + UTF-8 字节；产地、分类等低基数列为字典编码
+# 发布新版本时先写完整的版本目录，再原子替换 CURRENT 文件，读取方按 CURRENT 的修改时间热加载
+
+MALL = "mall"      # 农产品自营商城
+FRESH = "fresh"    # 农产家庭直供
+CHANNELS = [MALL, FRESH]
+
+NUMERIC_COLUMNS = {
+    "price": np.float64,
+    "stock": np.int32,
+    "carbon": np.float64,
+    "delivery_time": np.int16,
+}
+TEXT_COLUMNS = ["name", "description", "image", "trace_id"]
+DICT_COLUMNS = ["channel", "origin", "category"]
+
+# 保留的历史版本数（正在被读取的旧快照仍可访问）
+KEEP_VERSIONS = 2
+
+# 参与内容哈希的列：这些列不变的商品在版本之间视为未变更（搜索索引按此增量同步）
+CONTENT_COLUMNS = ["name", "description", "origin", "category"]
+
+
+def name_hash(names):
+    # 商品名的 64 位哈希，用于无需 Python 字典的按名查找
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little") for name in names),
+        dtype=np.uint64, count=len(names),
+    )
+
+
+class TextColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class CatalogSnapshot:
+    # 某一版本目录的只读视图，列均为内存映射数组
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.size = meta["size"]
+        self.dictionaries = meta["dictionaries"]
+        self.columns = {name: self._load(f"{name}.npy") for name in NUMERIC_COLUMNS}
+        for name in DICT_COLUMNS:
+            self.columns[name] = self._load(f"{name}.codes.npy")
+        self.text = {}
+        for name in TEXT_COLUMNS:
+            data_file = os.path.join(path, f"{name}.bytes")
+            data = np.memmap(data_file, dtype=np.uint8, mode="r") if os.path.getsize(data_file) else np.zeros(0, dtype=np.uint8)
+            self.text[name] = TextColumn(self._load(f"{name}.offsets.npy"), data)
+        self.hashes = self._load("name_hash.npy")
+        self.hash_rows = self._load("name_hash_rows.npy")
+        # 早于内容哈希发布的版本没有该列，diff 时按全部变更处理
+        content_file = os.path.join(path, "content_hash.npy")
+        self.content_hashes = np.load(content_file, mmap_mode="r") if os.path.exists(content_file) else None
+        self._channel_rows = {}
+        self._row_hashes = None
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+    def __len__(self):
+        return self.size
+
+    def codes_of(self, column, values):
+        dictionary = self.dictionaries[column]
+        return [dictionary.index(value) for value in values if value in dictionary]
+
+    def rows(self, channel):
+        # 某个渠道的行号（按快照缓存）
+        rows = self._channel_rows.get(channel)
+        if rows is None:
+            codes = self.codes_of("channel", [channel])
+            rows = np.flatnonzero(self.columns["channel"] == codes[0]) if codes else np.zeros(0, dtype=np.int64)
+            self._channel_rows[channel] = rows
+        return rows
+
+    def row_hashes(self):
+        # 按行号排列的商品名哈希
+        if self._row_hashes is None:
+            row_hashes = np.empty(self.size, dtype=np.uint64)
+            row_hashes[self.hash_rows] = self.hashes
+            self._row_hashes = row_hashes
+        return self._row_hashes
+
+    def values(self, column, rows):
+        # 字典编码列返回取值名称，数值列返回数组
+        if column in DICT_COLUMNS:
+            dictionary = self.dictionaries[column]
+            return [dictionary[code] for code in self.columns[column][rows].tolist()]
+        return self.columns[column][rows]
+
+    def find(self, name):
+        # 按名查找行号，不存在时返回 -1
+        h = name_hash([name])[0]
+        lo = np.searchsorted(self.hashes, h, side="left")
+        hi = np.searchsorted(self.hashes, h, side="right")
+        for row in self.hash_rows[lo:hi].tolist():
+            if self.text["name"][row] == name:
+                return row
+        return -1
+
+    def record(self, row):
+        # 单行转成页面使用的商品字典
+        price = float(self.columns["price"][row])
+        record = {
+            "name": self.text["name"][row],
+            "price": int(price) if price.is_integer() else price,
+            "stock": int(self.columns["stock"][row]),
+            "carbon": float(self.columns["carbon"][row]),
+            "delivery_time": int(self.columns["delivery_time"][row]),
+        }
+        for name in TEXT_COLUMNS[1:]:
+            record[name] = self.text[name][row]
+        for name in DICT_COLUMNS:
+            record[name] = self.dictionaries[name][int(self.columns[name][row])]
+        return record
+
+    def records(self, rows):
+        # {商品名: 商品字典}，只对给定的行物化
+        return {record["name"]: record for record in map(self.record, np.asarray(rows).tolist())}
+
+    def get(self, name):
+        row = self.find(name)
+        return self.record(row) if row >= 0 else None
+
+    def price_map(self, names):
+        prices = {}
+        for name in names:
+            row = self.find(name)
+            if row >= 0:
+                prices[name] = self.record(row)["price"]
+        return prices
+
+
+def diff(old, new, channel=None):
+    # 两个快照之间的变更：返回 (new 中新增或内容变化的行号, old 中已不存在的商品行号)，全部为数组运算
+    new_rows = np.arange(len(new)) if channel is None else new.rows(channel)
+    if old is None:
+        return new_rows, np.zeros(0, dtype=np.int64)
+    old_rows = np.arange(len(old)) if channel is None else old.rows(channel)
+    removed = old_rows[~np.isin(old.row_hashes()[old_rows], new.row_hashes()[new_rows])]
+    if old.content_hashes is None or new.content_hashes is None:
+        return new_rows, removed
+    changed = new_rows[~np.isin(new.content_hashes[new_rows], old.content_hashes[old_rows])]
+    return changed, removed
+
+
+def _read_current(path):
+    current = os.path.join(path, "CURRENT")
+    if not os.path.exists(current):
+        return None
+    with open(current, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def publish(path, records):
+    # records: 商品字典列表，或 {列名: 列表/数组} 形式的列；写入新版本并切换 CURRENT，返回版本号
+    if isinstance(records, list):
+        columns = {name: [record.get(name) for record in records] for name in list(NUMERIC_COLUMNS) + TEXT_COLUMNS + DICT_COLUMNS}
+    else:
+        columns = dict(records)
+    size = len(columns["name"])
+    os.makedirs(path, exist_ok=True)
+    current = _read_current(path)
+    version = f"v{int(current[1:]) + 1 if current else 1}"
+    version_dir = os.path.join(path, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    for name, dtype in NUMERIC_COLUMNS.items():
+        values = columns.get(name)
+        array = np.zeros(size, dtype=dtype) if values is None else np.array([0 if v is None else v for v in values] if isinstance(values, list) else values, dtype=dtype)
+        np.save(os.path.join(version_dir, f"{name}.npy"), array)
+
+    dictionaries = {}
+    for name in DICT_COLUMNS:
+        values = columns.get(name) or [""] * size
+        dictionary = {value: code for code, value in enumerate(CHANNELS)} if name == "channel" else {}
+        codes = np.fromiter((dictionary.setdefault(value or "", len(dictionary)) for value in values), dtype=np.int16, count=size)
+        np.save(os.path.join(version_dir, f"{name}.codes.npy"), codes)
+        dictionaries[name] = list(dictionary)
+
+    for name in TEXT_COLUMNS:
+        encoded = [(value or "").encode("utf-8") for value in (columns.get(name) or [""] * size)]
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(os.path.join(version_dir, f"{name}.offsets.npy"), offsets)
+        with open(os.path.join(version_dir, f"{name}.bytes"), "wb") as f:
+            f.write(b"".join(encoded))
+
+    hashes = name_hash(columns["name"])
+    order = np.argsort(hashes, kind="stable")
+    np.save(os.path.join(version_dir, "name_hash.npy"), hashes[order])
+    np.save(os.path.join(version_dir, "name_hash_rows.npy"), order.astype(np.int64))
+    content = zip(*((columns.get(name) or [""] * size) for name in CONTENT_COLUMNS))
+    np.save(os.path.join(version_dir, "content_hash.npy"), name_hash(["\x1f".join(value or "" for value in values) for values in content]))
+    with open(os.path.join(version_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "size": size, "dictionaries": dictionaries}, f, ensure_ascii=False)
+
+    with open(os.path.join(path, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(path, "CURRENT.tmp"), os.path.join(path, "CURRENT"))
+
+    # 清理更早的版本；Linux 下已映射的文件删除后仍可读
+    versions = sorted((d for d in os.listdir(path) if d.startswith("v") and d[1:].isdigit()), key=lambda d: int(d[1:]))
+    for old in versions[:-KEEP_VERSIONS]:
+        for file_name in os.listdir(os.path.join(path, old)):
+            os.remove(os.path.join(path, old, file_name))
+        os.rmdir(os.path.join(path, old))
+    return version
+
+
+def load_seed(seed):
+    with open(seed, "r", encoding="utf-8") as f:
+        return json.load(f)["products"]
+
+
+class CatalogStore:
+    # 当前目录快照的持有者：current() 发现 CURRENT 变化时加载新快照并整体替换，
+    # 正在渲染的页面继续使用自己拿到的旧快照
+    def __init__(self, path, seed=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None
+        if seed and _read_current(path) is None:
+            publish(path, load_seed(seed))
+
+    def current(self):
+        try:
+            stat = os.stat(os.path.join(self.path, "CURRENT"))
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp or self._snapshot is None:
+            with self._lock:
+                version = _read_current(self.path)
+                if self._snapshot is None or self._snapshot.version != version:
+                    self._snapshot = CatalogSnapshot(os.path.join(self.path, version), version)
+                self._stamp = stamp
+        return self._snapshot
+
+
+if __name__ == "__main__":
+    # 发布新目录：python catalog.py [商品 JSON] [目录路径]
+    seed = sys.argv[1] if len(sys.argv) > 1 else "data/catalog.json"
+    path = sys.argv[2] if len(sys.argv) > 2 else "data/catalog"
+    print(f"已发布 {publish(path, load_seed(seed))}")
@@ -0,0 +1,222 @@
+import heapq
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from filelock import FileLock, file_stamp
+from geo import FARM_COORDS, ROAD_FACTOR, haversine_km, locate
+
+# 家庭直供履约调度：农场坐标建 KD 树，按配送地址由近及远取候选农场，
+# 在有库存且在途时间不超过商品保鲜时长的农场中选预计送达最早的一个
+
+EARTH_RADIUS_KM = 6371.0
+
+# 冷链车平均时速(km/h)
+SPEED_KMH = 60.0
+
+# 采摘、分拣、装车耗时（小时）
+PREP_HOURS = 1.5
+
+# 农场每天的采摘作业时段，时段外下单顺延到次日开工
+WORK_HOURS = (6, 20)
+
+# 各生鲜的最长在途时间（小时），超过则不从该农场发货
+SHELF_HOURS = {
+    "生态西红柿": 36,
+    "有机白菜": 24,
+    "新鲜土豆": 96,
+    "紫皮茄子": 30,
+    "山区胡萝卜": 72,
+    "新鲜辣椒": 36,
+}
+DEFAULT_SHELF_HOURS = 24
+
+
+def to_xyz(lat, lon):
+    # 经纬度转地心直角坐标(km)，直线距离随球面距离单调增加
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (
+        EARTH_RADIUS_KM * math.cos(lat) * math.cos(lon),
+        EARTH_RADIUS_KM * math.cos(lat) * math.sin(lon),
+        EARTH_RADIUS_KM * math.sin(lat),
+    )
+
+
+class KDTree:
+    # 静态 KD 树：按坐标跨度最大的维度取中位数切分，叶子最多 leaf_size 个点
+    def __init__(self, points, leaf_size=2):
+        self.points = [tuple(point) for point in points]
+        self.leaf_size = leaf_size
+        self.nodes = []
+        self.root = self._build(list(range(len(self.points)))) if self.points else None
+
+    def _build(self, ids):
+        node = len(self.nodes)
+        if len(ids) <= self.leaf_size:
+            self.nodes.append((ids, -1, 0.0, None, None))
+            return node
+        self.nodes.append(None)
+        spans = [max(self.points[i][d] for i in ids) - min(self.points[i][d] for i in ids) for d in range(3)]
+        dim = spans.index(max(spans))
+        ids = sorted(ids, key=lambda i: self.points[i][dim])
+        mid = len(ids) // 2
+        split = self.points[ids[mid]][dim]
+        self.nodes[node] = (None, dim, split, self._build(ids[:mid]), self._build(ids[mid:]))
+        return node
+
+    def query(self, point, k):
+        # 返回距离最近的 k 个点 [(距离, 点号), ...]，按距离升序
+        if self.root is None:
+            return []
+        heap = []  # 以负距离平方维护当前 k 个最近点
+
+        def visit(node):
+            ids, dim, split, left, right = self.nodes[node]
+            if ids is not None:
+                for i in ids:
+                    p = self.points[i]
+                    d2 = (p[0] - point[0]) ** 2 + (p[1] - point[1]) ** 2 + (p[2] - point[2]) ** 2
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, i))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, i))
+                return
+            diff = point[dim] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return sorted((math.sqrt(-d2), i) for d2, i in heap)
+
+
+def next_work_start(now):
+    # 作业时段内立即开工，否则顺延到下一个开工时刻
+    start, end = WORK_HOURS
+    if start <= now.hour < end:
+        return now
+    day = now.date() if now.hour < start else now.date() + timedelta(days=1)
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=start)
+
+
+class FulfilmentDispatcher:
+    # 农场 x 商品 库存矩阵常驻内存，下单时在锁内选农场并扣减，落盘到 path（JSON，格式同种子文件）
+    def __init__(self, path=None, seed=None, farm_coords=None):
+        self.path = path
+        # 多个进程共用库存文件：扣减在文件锁内先读入其他进程扣减后的库存再选农场、写回
+        self._lock = FileLock(path + ".lock" if path else None)
+        self._stamp = None
+        self.farm_coords = farm_coords or FARM_COORDS
+        self.farms = list(self.farm_coords)
+        self._farm_ids = {farm: i for i, farm in enumerate(self.farms)}
+        self.skus = []
+        self._sku_ids = {}
+        self.stock = np.zeros((len(self.farms), 0), dtype=np.int64)
+        self.tree = KDTree([to_xyz(*self.farm_coords[farm]) for farm in self.farms])
+        source = path if path and os.path.exists(path) else seed
+        if source and os.path.exists(source):
+            self._load(source)
+
+    def _load(self, source):
+        if source == self.path:
+            self._stamp = file_stamp(source)
+        with open(source, "r", encoding="utf-8") as f:
+            for farm, items in json.load(f).items():
+                for sku, quantity in items.items():
+                    self._set(farm, sku, quantity)
+
+    def _reload_if_changed(self):
+        # 调用方持锁：库存文件被其他进程改过时整体重读（文件里只记有货的格子，先清零）
+        if not self.path or file_stamp(self.path) in (self._stamp, None):
+            return
+        self.stock[:] = 0
+        self._load(self.path)
+
+    def refresh(self):
+        with self._lock:
+            self._reload_if_changed()
+
+    def _sku_id(self, sku):
+        sku_id = self._sku_ids.get(sku)
+        if sku_id is None:
+            sku_id = self._sku_ids[sku] = len(self.skus)
+            self.skus.append(sku)
+            self.stock = np.concatenate([self.stock, np.zeros((len(self.farms), 1), dtype=np.int64)], axis=1)
+        return sku_id
+
+    def _set(self, farm, sku, quantity):
+        if farm in self._farm_ids:
+            sku_id = self._sku_id(sku)
+            self.stock[self._farm_ids[farm], sku_id] = quantity
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            farm: {sku: int(self.stock[i, j]) for j, sku in enumerate(self.skus) if self.stock[i, j]}
+            for i, farm in enumerate(self.farms)
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stamp = file_stamp(self.path)
+
+    def available(self, sku):
+        # {农场: 库存}，只含有货的农场
+        sku_id = self._sku_ids.get(sku)
+        if sku_id is None:
+            return {}
+        return {self.farms[i]: int(self.stock[i, sku_id]) for i in np.flatnonzero(self.stock[:, sku_id])}
+
+    def plan(self, sku, address, quantity=1, now=None):
+        # 选出预计送达最早的农场，无可履约农场时返回 None（不扣库存）
+        city, (lat, lon) = locate(address)
+        sku_id = self._sku_ids.get(sku)
+        if sku_id is None:
+            return None
+        column = self.stock[:, sku_id]
+        shelf = SHELF_HOURS.get(sku, DEFAULT_SHELF_HOURS)
+        now = now or datetime.now()
+        wait = (next_work_start(now) - now).total_seconds() / 3600
+        point = to_xyz(lat, lon)
+
+        k = min(4, len(self.farms))
+        while True:
+            neighbours = self.tree.query(point, k)
+            best = None
+            for _, farm_id in neighbours:
+                if column[farm_id] < quantity:
+                    continue
+                farm_lat, farm_lon = self.farm_coords[self.farms[farm_id]]
+                km = float(haversine_km(farm_lat, farm_lon, lat, lon)) * ROAD_FACTOR
+                transit = km / SPEED_KMH
+                if transit > shelf:
+                    continue
+                eta = wait + PREP_HOURS + transit
+                if best is None or eta < best["eta_hours"]:
+                    best = {"farm": self.farms[farm_id], "city": city, "road_km": km, "eta_hours": eta}
+            # 直线距离不超过公路里程，更远农场的在途时间至少为 直线距离 x 绕行系数 / 时速
+            bound = neighbours[-1][0] * ROAD_FACTOR / SPEED_KMH if neighbours else math.inf
+            if k >= len(self.farms) or bound > shelf or (best is not None and best["eta_hours"] <= wait + PREP_HOURS + bound):
+                break
+            k = min(k * 2, len(self.farms))
+        if best is not None:
+            best["promised_at"] = now + timedelta(hours=best["eta_hours"])
+        return best
+
+    def reserve(self, sku, address, quantity=1, now=None):
+        # 选农场并原子扣减库存，返回调度结果；无可履约农场时返回 None
+        with self._lock:
+            self._reload_if_changed()
+            decision = self.plan(sku, address, quantity, now)
+            if decision is None:
+                return None
+            self.stock[self._farm_ids[decision["farm"]], self._sku_ids[sku]] -= quantity
+            self._save()
+            return decision
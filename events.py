@@ -0,0 +1,124 @@
+import heapq
+from datetime import date, timedelta
+from functools import lru_cache
+
+# 活动日历：活动以重复规则定义，按日期窗口惰性展开
+# 规则字段：title 标题、audience 面向人群（亲子/会员）、farm 农场、
+# activity 对应的亲子活动（可为 None）、capacity 活动当天每个时段的名额（可为 None）
+
+
+class Weekly:
+    # 每周固定星期几（0=周一）
+    def __init__(self, weekday, title, audience, farm, activity=None, capacity=None, start=None, until=None):
+        self.weekday = weekday
+        self.title = title
+        self.audience = audience
+        self.farm = farm
+        self.activity = activity
+        self.capacity = capacity
+        self.start = start or date.min
+        self.until = until or date.max
+
+    def expand(self, start, end):
+        day = max(start, self.start)
+        day += timedelta(days=(self.weekday - day.weekday()) % 7)
+        while day < end and day <= self.until:
+            yield day, self
+            day += timedelta(days=7)
+
+
+class Yearly:
+    # 每年固定月日（节日、季节性活动）
+    def __init__(self, month, day, title, audience, farm, activity=None, capacity=None):
+        self.month = month
+        self.day = day
+        self.title = title
+        self.audience = audience
+        self.farm = farm
+        self.activity = activity
+        self.capacity = capacity
+
+    def expand(self, start, end):
+        for year in range(start.year, end.year + 1):
+            day = date(year, self.month, self.day)
+            if start <= day < end:
+                yield day, self
+
+
+class Once:
+    # 单次活动（如当年的春节）
+    def __init__(self, day, title, audience, farm, activity=None, capacity=None):
+        self.day = day
+        self.title = title
+        self.audience = audience
+        self.farm = farm
+        self.activity = activity
+        self.capacity = capacity
+
+    def expand(self, start, end):
+        if start <= self.day < end:
+            yield self.day, self
+
+
+EVENT_RULES = [
+    Yearly(4, 15, "春季插秧体验", "亲子", "河北农场", "插秧体验", 40),
+    Yearly(4, 22, "地球日特别活动", "亲子", "河北农场", "生态系统探索", 30),
+    Yearly(5, 1, "劳动节农耕体验", "亲子", "河北农场", "蔬菜采摘", 40),
+    Yearly(5, 15, "昆虫观察与标本制作", "亲子", "河北农场", "昆虫观察", 30),
+    Yearly(6, 1, "儿童节特别活动", "亲子", "河北农场", "喂养小动物", 40),
+    Yearly(9, 23, "丰收节亲子采摘", "亲子", "山东农场", "蔬菜采摘", 40),
+    Yearly(10, 1, "国庆田园手作周", "亲子", "云南农场", "草编工艺", 30),
+    Weekly(6, "周日蔬菜采摘日", "亲子", "河北农场", "蔬菜采摘", 30),
+    Yearly(4, 15, "春季采摘节", "会员", "河北农场"),
+    Yearly(5, 1, "五一农耕体验", "会员", "山东农场"),
+    Yearly(6, 1, "夏日露营之夜", "会员", "云南农场"),
+    Yearly(9, 23, "中国农民丰收节", "会员", "河北农场"),
+    Yearly(12, 31, "跨年篝火晚会", "会员", "云南农场"),
+    Weekly(5, "河北农场开放日", "会员", "河北农场"),
+    Weekly(5, "山东农场开放日", "会员", "山东农场"),
+    Weekly(5, "云南农场开放日", "会员", "云南农场"),
+    Once(date(2027, 2, 6), "春节田园年货节", "会员", "山东农场"),
+]
+
+
+def expand_all(rules, start, end):
+    # 多条规则的展开结果按日期归并，仍是惰性生成器
+    return heapq.merge(*(rule.expand(start, end) for rule in rules), key=lambda occurrence: occurrence[0])
+
+
+class EventCalendar:
+    # 以自然月为缓存块：查询任意日期窗口时只展开并缓存涉及的月份，
+    # 渲染未来90天只需3~4个月块，不会每次展开全年
+
+    def __init__(self, rules=None):
+        self.rules = list(rules or EVENT_RULES)
+        self._month = lru_cache(maxsize=64)(self._expand_month)
+
+    def _expand_month(self, year, month):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        return tuple(expand_all(self.rules, start, end))
+
+    def between(self, start, end):
+        # 生成 [start, end) 内的 (日期, 规则)
+        year, month = start.year, start.month
+        while date(year, month, 1) < end:
+            for day, rule in self._month(year, month):
+                if start <= day < end:
+                    yield day, rule
+            year, month = year + month // 12, month % 12 + 1
+
+    def upcoming(self, days=90, audience=None, today=None):
+        today = today or date.today()
+        return [
+            (day, rule) for day, rule in self.between(today, today + timedelta(days=days))
+            if audience is None or rule.audience == audience
+        ]
+
+    def slot_capacity(self, activity, day, slot=None):
+        # 活动日当天该活动的时段名额，无对应活动返回 None（由预订引擎使用默认名额）
+        capacities = [
+            rule.capacity for _, rule in self.between(day, day + timedelta(days=1))
+            if rule.activity == activity and rule.capacity
+        ]
+        return max(capacities) if capacities else None
@@ -0,0 +1,67 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只做进程内互斥
+    fcntl = None
+
+# 跨进程文件锁：多个 Streamlit 进程共用 data/ 下同一个状态文件时，"读取最新内容 - 检查 - 写回"在锁内完成
+# 进程内先取线程锁，再对锁文件加 flock 排他锁；进程退出时系统自动释放 flock
+
+
+class FileLock:
+    def __init__(self, path=None):
+        # path 为锁文件路径；为 None 时（不落盘的实例）只做进程内互斥
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self.path and fcntl is not None:
+            try:
+                if self._fd is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+
+# try_lock 取得的锁文件描述符，保持打开直到进程退出
+_held = []
+
+
+def try_lock(path):
+    # 非阻塞地对锁文件加排他锁并一直持有到进程退出（退出时系统自动释放）；已被其他进程持有时返回 False
+    if fcntl is None:
+        return True
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _held.append(fd)
+    return True
+
+
+def file_stamp(path):
+    # 文件的 (inode, 修改时间, 大小)，不存在时为 None；与上次读写时记下的值不同说明被其他进程改过
+    # 整体写回都经 os.replace 换成新文件，同一时钟刻度内大小相同的两次写回也能由 inode 区分
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
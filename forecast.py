@@ -0,0 +1,145 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 传感器短期预测：每条数据流（传感器）同时维护季节朴素模型与加性 Holt-Winters（日周期、阻尼趋势），
+# 所有流的状态放在同一组数组里向量化更新；新数据到达时只吸收新增小时，历史被改写才整体重拟合；
+# 预测时按各流样本内一步误差选用较好的模型并给出预测区间
+
+PERIOD = 24                     # 日周期（小时）
+HORIZONS = (24, 48, 72)         # 可选预测时长（小时）
+HISTORY_HOURS = 3 * PERIOD      # 拟合使用的历史长度
+FORECAST_COLUMNS = ["温度(°C)", "土壤湿度(%)"]
+
+# Holt-Winters 平滑系数网格：拟合时每条流各取一步误差最小的一组，增量更新沿用
+ALPHAS = (0.1, 0.3, 0.5)
+GAMMAS = (0.05, 0.2, 0.4)
+BETA = 0.02
+PHI = 0.9                       # 趋势阻尼，避免 72 小时外推发散
+
+# 预测区间对应的正态分位数（90%）
+INTERVAL_Z = 1.645
+
+HOLT_WINTERS = "Holt-Winters"
+SEASONAL_NAIVE = "季节朴素"
+
+
+def _hw_step(y, level, trend, season, alpha, gamma):
+    # 误差修正形式的一步更新，y 为 NaN 时视作与预测值相同（状态只按趋势推进）
+    predicted = level + PHI * trend + season
+    error = np.where(np.isnan(y), 0.0, y - predicted)
+    return level + PHI * trend + alpha * error, PHI * trend + alpha * BETA * error, season + gamma * error, error
+
+
+class SeasonalForecaster:
+    def __init__(self, n_streams, period=PERIOD):
+        self.n_streams = n_streams
+        self.period = period
+        self._lock = threading.Lock()
+        self.times = None       # 已吸收的最近若干小时时间戳及读数，用于判断新数据能否增量吸收
+        self.values = None
+        self.refits = 0
+        self.updates = 0
+
+    def fit(self, matrix):
+        # matrix: (小时, 流数)，至少两个周期；在系数网格上同时跑所有组合，每条流保留误差最小的一组
+        matrix = np.asarray(matrix, dtype=np.float64)
+        m = self.period
+        if len(matrix) < 2 * m:
+            raise ValueError(f"至少需要 {2 * m} 小时数据")
+        grid_alpha, grid_gamma = (np.array(g, dtype=np.float64).reshape(-1, 1) for g in np.meshgrid(ALPHAS, GAMMAS))
+        first, second = np.nanmean(matrix[:m], axis=0), np.nanmean(matrix[m:2 * m], axis=0)
+        level = np.broadcast_to(first, (len(grid_alpha), self.n_streams)).copy()
+        trend = np.broadcast_to((second - first) / m, level.shape).copy()
+        season = np.broadcast_to(np.nan_to_num(matrix[:m] - first)[:, None, :], (m,) + level.shape).copy()
+        sse = np.zeros(level.shape)
+        for t in range(m, len(matrix)):
+            level, trend, season[t % m], error = _hw_step(matrix[t], level, trend, season[t % m], grid_alpha, grid_gamma)
+            sse += error ** 2
+
+        best = np.argmin(sse, axis=0)
+        streams = np.arange(self.n_streams)
+        self.alpha, self.gamma = grid_alpha[best, 0], grid_gamma[best, 0]
+        self.level, self.trend = level[best, streams], trend[best, streams]
+        self.season = season[:, best, streams]
+        self.sse_hw = sse[best, streams]
+        naive_error = matrix[m:] - matrix[:-m]
+        self.sse_naive = np.nansum(naive_error ** 2, axis=0)
+        self.count = np.sum(~np.isnan(naive_error), axis=0)
+        self.recent = matrix[-m:].copy()
+        self.t = len(matrix)
+        self.refits += 1
+
+    def update(self, values):
+        # 吸收一个新小时的读数（每条流一个值），O(流数)
+        y = np.asarray(values, dtype=np.float64)
+        slot = self.t % self.period
+        self.level, self.trend, self.season[slot], error = _hw_step(y, self.level, self.trend, self.season[slot], self.alpha, self.gamma)
+        present = ~np.isnan(y)
+        self.sse_hw += error ** 2
+        self.sse_naive += np.where(present, y - self.recent[slot], 0.0) ** 2
+        self.count += present
+        self.recent[slot] = np.where(present, y, self.recent[slot])
+        self.t += 1
+        self.updates += 1
+
+    def observe(self, times, matrix):
+        # 传入最近的历史窗口：已吸收部分未变则只增量吸收新增小时，否则（首次、断档、历史被改写）整体重拟合
+        times = pd.DatetimeIndex(times)
+        matrix = np.asarray(matrix, dtype=np.float64)
+        with self._lock:
+            if self.times is not None and len(self.times) and times[0] <= self.times[-1] + pd.Timedelta(hours=1):
+                seen = times <= self.times[-1]
+                position = self.times.get_indexer(times[seen])
+                new = np.flatnonzero(~seen)
+                contiguous = not len(new) or times[new[0]] == self.times[-1] + pd.Timedelta(hours=1)
+                if (position >= 0).all() and contiguous and np.allclose(self.values[position], matrix[seen], equal_nan=True):
+                    for row in new:
+                        self.update(matrix[row])
+                    self._remember(times, matrix)
+                    return len(new)
+            self.fit(matrix)
+            self._remember(times, matrix)
+            return len(matrix)
+
+    def _remember(self, times, matrix):
+        if self.times is not None and len(times) and times[0] > self.times[0]:
+            keep = self.times < times[0]
+            times = self.times[keep].append(times)
+            matrix = np.vstack([self.values[keep], matrix])
+        self.times, self.values = times[-HISTORY_HOURS:], matrix[-HISTORY_HOURS:]
+
+    def forecast(self, horizon):
+        # 返回 (均值, 下限, 上限, 模型名)，前三者形状为 (horizon, 流数)
+        m = self.period
+        with self._lock:
+            steps = np.arange(1, horizon + 1)
+            slots = (self.t + steps - 1) % m
+            damping = np.cumsum(PHI ** steps)
+            hw_mean = self.level + damping[:, None] * self.trend + self.season[slots]
+            # h 步误差方差 σ²(1 + Σc_j²)，c_j = α(1 + β·Σφ^i) + γ·[j 为周期整数倍]
+            c = self.alpha * (1 + BETA * damping[:-1, None]) + self.gamma * (steps[:-1, None] % m == 0)
+            hw_var = self.sse_hw / np.maximum(self.count, 1) * (1 + np.concatenate([np.zeros((1, self.n_streams)), np.cumsum(c ** 2, axis=0)]))
+            naive_mean = self.recent[slots]
+            naive_var = self.sse_naive / np.maximum(self.count, 1) * ((steps - 1) // m + 1)[:, None]
+            use_hw = self.sse_hw <= self.sse_naive
+            mean = np.where(use_hw, hw_mean, naive_mean)
+            spread = INTERVAL_Z * np.sqrt(np.where(use_hw, hw_var, naive_var))
+            return mean, mean - spread, mean + spread, [HOLT_WINTERS if hw else SEASONAL_NAIVE for hw in use_hw]
+
+
+def forecast_frame(forecaster, history, columns, horizon):
+    # history: DataFrame(时间 + 指标列)，吸收后返回未来 horizon 小时的预测表（时间, 指标, 预测, 下限, 上限, 模型）
+    times = pd.DatetimeIndex(history["时间"]).floor("h")
+    forecaster.observe(times, history[columns].to_numpy(dtype=np.float64))
+    mean, lower, upper, models = forecaster.forecast(horizon)
+    future = times[-1] + pd.to_timedelta(np.arange(1, horizon + 1), unit="h")
+    return pd.DataFrame({
+        "时间": np.tile(future, len(columns)),
+        "指标": np.repeat(columns, horizon),
+        "预测": mean.T.ravel(),
+        "下限": lower.T.ravel(),
+        "上限": upper.T.ravel(),
+        "模型": np.repeat(models, horizon),
+    })
@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+
+# 农场与城市坐标（纬度, 经度），农场取所在省会近似位置
+FARM_COORDS = {
+    "河北农场": (38.04, 114.51),
+    "山东农场": (36.65, 117.12),
+    "云南农场": (25.04, 102.71),
+    "河南农场": (34.75, 113.62),
+    "福建农场": (26.07, 119.30),
+    "江苏农场": (32.06, 118.80),
+    "安徽农场": (31.82, 117.23),
+    "甘肃农场": (36.06, 103.83),
+    "陕西农场": (34.34, 108.94),
+    "四川农场": (30.57, 104.07),
+}
+
+CITY_COORDS = {
+    "北京": (39.90, 116.40),
+    "天津": (39.13, 117.20),
+    "上海": (31.23, 121.47),
+    "重庆": (29.56, 106.55),
+    "广州": (23.13, 113.26),
+    "深圳": (22.54, 114.06),
+    "杭州": (30.27, 120.15),
+    "南京": (32.06, 118.80),
+    "苏州": (31.30, 120.59),
+    "武汉": (30.59, 114.31),
+    "长沙": (28.23, 112.94),
+    "成都": (30.57, 104.07),
+    "西安": (34.34, 108.94),
+    "郑州": (34.75, 113.62),
+    "济南": (36.65, 117.12),
+    "青岛": (36.07, 120.38),
+    "石家庄": (38.04, 114.51),
+    "昆明": (25.04, 102.71),
+    "福州": (26.07, 119.30),
+    "厦门": (24.48, 118.09),
+    "合肥": (31.82, 117.23),
+    "兰州": (36.06, 103.83),
+    "哈尔滨": (45.80, 126.53),
+    "长春": (43.82, 125.32),
+    "沈阳": (41.80, 123.43),
+    "大连": (38.91, 121.61),
+    "呼和浩特": (40.84, 111.75),
+    "太原": (37.87, 112.55),
+    "银川": (38.49, 106.23),
+    "西宁": (36.62, 101.78),
+    "乌鲁木齐": (43.83, 87.62),
+    "拉萨": (29.65, 91.13),
+    "贵阳": (26.65, 106.63),
+    "南宁": (22.82, 108.37),
+    "海口": (20.04, 110.20),
+    "南昌": (28.68, 115.86),
+    "宁波": (29.87, 121.55),
+    "温州": (28.00, 120.70),
+    "无锡": (31.49, 120.31),
+    "徐州": (34.21, 117.28),
+    "东莞": (23.02, 113.75),
+    "佛山": (23.02, 113.12),
+    "珠海": (22.27, 113.58),
+    "烟台": (37.46, 121.45),
+    "洛阳": (34.62, 112.45),
+    "唐山": (39.63, 118.18),
+    "保定": (38.87, 115.46),
+}
+
+# 地址只写到省份时按省会定位
+PROVINCE_CAPITALS = {
+    "河北": "石家庄", "山西": "太原", "辽宁": "沈阳", "吉林": "长春", "黑龙江": "哈尔滨",
+    "江苏": "南京", "浙江": "杭州", "安徽": "合肥", "福建": "福州", "江西": "南昌",
+    "山东": "济南", "河南": "郑州", "湖北": "武汉", "湖南": "长沙", "广东": "广州",
+    "海南": "海口", "四川": "成都", "贵州": "贵阳", "云南": "昆明", "陕西": "西安",
+    "甘肃": "兰州", "青海": "西宁", "内蒙古": "呼和浩特", "广西": "南宁", "西藏": "拉萨",
+    "宁夏": "银川", "新疆": "乌鲁木齐",
+}
+
+# 长名优先，避免短名抢先命中
+_CITY_PATTERN = re.compile("|".join(sorted(map(re.escape, CITY_COORDS), key=len, reverse=True)))
+_PROVINCE_PATTERN = re.compile("|".join(sorted(map(re.escape, PROVINCE_CAPITALS), key=len, reverse=True)))
+
+# 未填写或无法识别的地址按平台北京仓计算
+DEFAULT_CITY = "北京"
+
+# 公路里程相对球面距离的绕行系数
+ROAD_FACTOR = 1.3
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    # 支持标量或数组广播
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+
+def locate(address):
+    # 按地址中出现的城市名（其次省份名）解析坐标，返回 (城市, (纬度, 经度))
+    if address:
+        match = _CITY_PATTERN.search(address)
+        if match:
+            return match.group(), CITY_COORDS[match.group()]
+        match = _PROVINCE_PATTERN.search(address)
+        if match:
+            city = PROVINCE_CAPITALS[match.group()]
+            return city, CITY_COORDS[city]
+    return DEFAULT_CITY, CITY_COORDS[DEFAULT_CITY]
+
+
+def road_km(origin, address):
+    # 农场到配送地址的估算公路里程
+    lat1, lon1 = FARM_COORDS.get(origin, CITY_COORDS[DEFAULT_CITY])
+    _, (lat2, lon2) = locate(address)
+    return float(haversine_km(lat1, lon1, lat2, lon2)) * ROAD_FACTOR
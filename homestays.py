@@ -0,0 +1,229 @@
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from filelock import FileLock, file_stamp
+from membership import TIERS
+
+# 会员民宿房源：农庄 -> [(民宿名, 图片, 各房间可住人数)]
+HOMESTAYS = {
+    "河北农庄": [
+        ("麦田小筑", "images/麦田小筑.png", [2, 2, 4]),
+        ("稻香阁", "images/稻香阁.png", [2, 2, 2, 4]),
+        ("果园别墅", "images/果园别墅.png", [4, 4]),
+    ],
+    "山东农庄": [
+        ("海风木屋", "https://img.zcool.cn/community/01f7e75e2d6926a801216518a2d7e1.jpg@1280w_1l_2o_100sh.jpg", [2, 2, 4]),
+        ("渔村小院", "https://img.zcool.cn/community/01c2ce5d0e9f8aa801219c7748b2b9.jpg@1280w_1l_2o_100sh.jpg", [2, 4, 4]),
+        ("山顶观景房", "https://img.zcool.cn/community/01d0f05af3c3c9a801219741f6c3a0.jpg@1280w_1l_2o_100sh.jpg", [2, 2]),
+    ],
+    "云南农庄": [
+        ("云端茶舍", "https://img.zcool.cn/community/031e2d75d8d65d0000012e7ed4b1c4.jpg", [2, 2, 4]),
+        ("竹林别院", "https://img.zcool.cn/community/01f9c55d31a173a8012187f4c1f5ba.jpg@1280w_1l_2o_100sh.jpg", [2, 4]),
+        ("花海木屋", "https://img.zcool.cn/community/01a4a85af3c3c9a801219741cd7b8b.jpg@1280w_1l_2o_100sh.jpg", [2, 2, 4, 4]),
+    ],
+}
+
+HORIZON_DAYS = 365
+
+# 各农庄民宿基础房价（¥/晚）
+BASE_PRICES = {"河北农庄": 300, "山东农庄": 400, "云南农庄": 500}
+
+# 会员等级折扣：直接取会员权益表中的民宿折扣，价格表的各列与会员结算价始终一致
+TIER_DISCOUNTS = {"非会员": 1.0, **{tier: benefits["homestay"] for tier, benefits in TIERS.items()}}
+
+# 默认房价规则：月份季节系数、星期系数（周五、周六晚上浮）、节假日系数
+DEFAULT_RATE_RULES = {
+    "season": {1: 0.8, 2: 0.8, 3: 1.0, 4: 1.15, 5: 1.15, 6: 1.0, 7: 1.3, 8: 1.3, 9: 1.15, 10: 1.15, 11: 1.0, 12: 0.8},
+    "weekday": [1.0, 1.0, 1.0, 1.0, 1.2, 1.2, 1.0],
+    "holiday": 1.5,
+    # 固定日期节假日（月, 日）：元旦、劳动节、国庆
+    "holidays": [(1, 1), (5, 1), (5, 2), (5, 3), (5, 4), (5, 5),
+                 (10, 1), (10, 2), (10, 3), (10, 4), (10, 5), (10, 6), (10, 7)],
+}
+
+
+class AvailabilityCalendar:
+    # 所有民宿所有房间共用一张 房间 x 日期 的占用位图，区间查询与预订均为向量运算
+
+    def __init__(self, path=None, homestays=None, start=None, horizon=HORIZON_DAYS):
+        self.path = path
+        # 多个进程共用 bookings.json：预订在文件锁内先读入其他进程的新预订再检查、写回
+        self._lock = FileLock(path + ".lock" if path else None)
+        self._stamp = None
+        self.start = start or date.today()
+        self.horizon = horizon
+
+        # 房间表：每行一个房间，记录所属农庄、民宿、房号、可住人数
+        self.rooms = []
+        for location, properties in (homestays or HOMESTAYS).items():
+            for name, _, capacities in properties:
+                for number, capacity in enumerate(capacities, start=1):
+                    self.rooms.append((location, name, number, capacity))
+        self.capacity = np.array([room[3] for room in self.rooms], dtype=np.int8)
+        self._room_index = {(room[1], room[2]): i for i, room in enumerate(self.rooms)}
+        self._property_rooms = {}
+        for i, room in enumerate(self.rooms):
+            self._property_rooms.setdefault(room[1], []).append(i)
+        self._property_rooms = {name: np.array(idx) for name, idx in self._property_rooms.items()}
+        self._property_of = np.array([room[1] for room in self.rooms])
+
+        self.occupied = np.zeros((len(self.rooms), horizon), dtype=bool)
+        self.bookings = []
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        self._stamp = file_stamp(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        for booking in saved:
+            check_in = date.fromisoformat(booking["check_in"])
+            if check_in + timedelta(days=booking["nights"]) <= self.start:
+                continue
+            lo = max((check_in - self.start).days, 0)
+            hi = (check_in - self.start).days + booking["nights"]
+            self._ensure_horizon(hi)
+            self.occupied[self._room_index[(booking["homestay"], booking["room"])], lo:hi] = True
+            self.bookings.append(booking)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.bookings, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stamp = file_stamp(self.path)
+
+    def _reload_if_changed(self):
+        # 调用方持锁：文件被其他进程改过时按文件内容重建占用位图
+        if not self.path or file_stamp(self.path) == self._stamp:
+            return
+        self.occupied = np.zeros((len(self.rooms), self.horizon), dtype=bool)
+        self.bookings = []
+        self._stamp = None
+        if os.path.exists(self.path):
+            self._load()
+
+    def refresh(self):
+        with self._lock:
+            self._reload_if_changed()
+
+    def _window(self, check_in, nights):
+        lo = (check_in - self.start).days
+        if lo < 0:
+            raise ValueError("入住日期不能早于今天")
+        return lo, lo + nights
+
+    def _ensure_horizon(self, hi):
+        # 超出当前日历范围时按需扩展（日历外的日期必然空闲，查询时切片自动截断）
+        if hi > self.occupied.shape[1]:
+            extra = np.zeros((len(self.rooms), hi - self.occupied.shape[1]), dtype=bool)
+            self.occupied = np.hstack([self.occupied, extra])
+
+    def free_rooms(self, check_in, nights, guests=1, homestay=None):
+        # 返回该时段空闲且可住下 guests 人的房间下标数组
+        lo, hi = self._window(check_in, nights)
+        if homestay is None:
+            candidates = np.flatnonzero(self.capacity >= guests)
+        else:
+            candidates = self._property_rooms[homestay]
+            candidates = candidates[self.capacity[candidates] >= guests]
+        return candidates[~self.occupied[candidates, lo:hi].any(axis=1)]
+
+    def search(self, check_in, nights, guests=1):
+        # 所有农庄的可订房间数：{民宿名: 空房数}
+        free = self.free_rooms(check_in, nights, guests)
+        names, counts = np.unique(self._property_of[free], return_counts=True)
+        return dict(zip(names.tolist(), counts.tolist()))
+
+    def book(self, homestay, check_in, nights, guests, guest_name=""):
+        # 原子预订：加锁后重新检查并占用房间，无空房返回 None
+        with self._lock:
+            self._reload_if_changed()
+            free = self.free_rooms(check_in, nights, guests, homestay)
+            if len(free) == 0:
+                return None
+            # 优先分配人数最贴合的房间
+            room = int(free[np.argmin(self.capacity[free])])
+            lo, hi = self._window(check_in, nights)
+            self._ensure_horizon(hi)
+            self.occupied[room, lo:hi] = True
+            location, name, number, _ = self.rooms[room]
+            booking = {
+                "location": location,
+                "homestay": name,
+                "room": number,
+                "check_in": check_in.isoformat(),
+                "nights": int(nights),
+                "guests": int(guests),
+                "guest": guest_name,
+            }
+            self.bookings.append(booking)
+            self._save()
+            return booking
+
+
+class HomestayPricing:
+    # 预先计算每家民宿未来一段时间的每晚房价表，并保存按日期的前缀和，
+    # 任意天数的住宿总价只需两次查表相减；房价规则变更时才重建房价表和报价缓存
+
+    def __init__(self, homestays=None, base_prices=None, rules=None, start=None, horizon=HORIZON_DAYS):
+        # 未指定起始日期时为滚动窗口：跨天后自动以当天为起点重建房价表
+        self.rolling = start is None
+        self.start = start or date.today()
+        self.horizon = horizon
+        self.properties = [name for properties in (homestays or HOMESTAYS).values() for name, _, _ in properties]
+        self._row = {name: i for i, name in enumerate(self.properties)}
+        base_prices = base_prices or BASE_PRICES
+        self.base = np.array([
+            base_prices[location] for location, properties in (homestays or HOMESTAYS).items() for _ in properties
+        ], dtype=float)
+        self.tiers = list(TIER_DISCOUNTS)
+        self.discounts = np.array(list(TIER_DISCOUNTS.values()))
+        self.set_rules(rules or DEFAULT_RATE_RULES)
+
+    def set_rules(self, rules):
+        self.rules = rules
+        self._build()
+
+    def _build(self):
+        days = np.arange(self.horizon)
+        dates = np.datetime64(self.start) + days
+        months = dates.astype("datetime64[M]").astype(int) % 12 + 1
+        month_days = (dates - dates.astype("datetime64[M]")).astype(int) + 1
+        weekdays = (dates.astype("datetime64[D]").astype(int) + 3) % 7  # 1970-01-01 为周四
+
+        season = np.array([self.rules["season"][m] for m in range(1, 13)])[months - 1]
+        weekday = np.array(self.rules["weekday"])[weekdays]
+        holiday_keys = {m * 100 + d for m, d in self.rules["holidays"]}
+        is_holiday = np.isin(months * 100 + month_days, list(holiday_keys))
+        multiplier = season * weekday * np.where(is_holiday, self.rules["holiday"], 1.0)
+
+        # 每晚房价表 (民宿数, 天数)，取整到元
+        self.nightly = np.round(self.base[:, None] * multiplier[None, :])
+        self.prefix = np.zeros((len(self.properties), self.horizon + 1))
+        np.cumsum(self.nightly, axis=1, out=self.prefix[:, 1:])
+        self._quotes = {}
+
+    def quote(self, homestay, check_in, nights):
+        # 返回 {会员等级: 总价}，同时给出各等级价格
+        if self.rolling and date.today() != self.start:
+            self.start = date.today()
+            self._build()
+        key = (homestay, check_in, nights)
+        cached = self._quotes.get(key)
+        if cached is not None:
+            return cached
+        lo = (check_in - self.start).days
+        hi = lo + nights
+        if lo < 0 or hi > self.horizon:
+            raise ValueError("入住日期超出可报价范围")
+        row = self._row[homestay]
+        total = self.prefix[row, hi] - self.prefix[row, lo]
+        quote = dict(zip(self.tiers, (total * self.discounts).tolist()))
+        self._quotes[key] = quote
+        return quote
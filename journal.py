@@ -0,0 +1,345 @@
+import json
+import os
+import threading
+import time
+
+from filelock import FileLock
+
+# 交易日志：下单、认种、民宿与活动预订、入会、营养订阅、年票等操作统一追加到分段的 JSON 行日志
+# 并发写入按组提交：同一时刻到达的记录由第一个拿到写盘锁的线程一次写入、一次 fsync，其余线程等到自己的
+# 记录落盘即返回；落盘后的记录才更新内存投影（每个用户的交易汇总与最近记录、当前有效的会员/订阅/年票）
+# 每追加 SNAPSHOT_EVERY 条写一次投影快照并切换到新分段，重启时读最新快照、只回放其后的分段；
+# 被快照覆盖的旧分段保留作历史记录，compact() 删除
+# 多个进程可共用同一目录：写盘在目录下 LOCK 文件的排他锁内进行，先读入其他进程追加的记录，
+# 再接着它们的序号为本批编号，因此序号全局唯一、递增，任何进程重启都能回放全部记录
+
+# 事件类型 -> 显示名称
+EVENT_TYPES = {
+    "order": "下单",
+    "plot": "认种",
+    "homestay": "民宿预订",
+    "activity": "活动预订",
+    "activity_cancel": "取消活动",
+    "membership": "加入会员",
+    "subscription": "营养订阅",
+    "pass": "购买年票",
+}
+
+# 按用户只保留最新一条的事件类型（当前有效的会员、订阅、年票）
+ACTIVE_TYPES = ("membership", "subscription", "pass")
+
+SNAPSHOT_EVERY = 100_000
+SEGMENT_BYTES = 64 << 20
+RECENT_PER_USER = 10
+
+# 日志行与快照的编码器：紧凑分隔符，记录里没有循环引用
+_ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+class JournalState:
+    # 日志的内存投影；只依赖记录本身，按顺序 apply 即可从任意快照继续
+    def __init__(self):
+        self.totals = {}    # 类型 -> [次数, 金额]
+        self.users = {}     # 用户 -> {"counts": {类型: 次数}, "amount": 金额, "recent": [[序号, 时间, 类型, 金额], ...]}
+        self.active = {kind: {} for kind in ACTIVE_TYPES}  # 类型 -> {用户: 最新记录}
+
+    def apply(self, record):
+        kind, user, amount = record["type"], record["user"], record["amount"]
+        total = self.totals.setdefault(kind, [0, 0.0])
+        total[0] += 1
+        total[1] += amount
+        entry = self.users.get(user)
+        if entry is None:
+            entry = self.users[user] = {"counts": {}, "amount": 0.0, "recent": []}
+        entry["counts"][kind] = entry["counts"].get(kind, 0) + 1
+        entry["amount"] += amount
+        entry["recent"].append([record["seq"], record["ts"], kind, amount])
+        if len(entry["recent"]) > RECENT_PER_USER:
+            del entry["recent"][0]
+        if kind in self.active:
+            self.active[kind][user] = record
+
+    def to_dict(self):
+        return {"totals": self.totals, "users": self.users, "active": self.active}
+
+    @classmethod
+    def from_dict(cls, saved):
+        state = cls()
+        state.totals = saved["totals"]
+        state.users = saved["users"]
+        state.active = saved["active"]
+        return state
+
+
+class EventJournal:
+    def __init__(self, path=None, snapshot_every=SNAPSHOT_EVERY, segment_bytes=SEGMENT_BYTES, fsync=True):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()        # 序号、待写缓冲与投影
+        self._flushed = threading.Condition(self._lock)  # 每批落盘后通知等待的线程
+        self._flushing = False               # 是否有线程正在写盘（其余线程等它带走自己的记录）
+        self._flush_lock = threading.Lock()  # 文件操作（写盘、快照、切换分段）互斥
+        self._file_lock = FileLock(os.path.join(path, "LOCK") if path else None)  # 跨进程互斥
+        self.state = JournalState()
+        self.seq = 0                # 已读入或写入的最大序号（写盘时才分配序号）
+        self.durable_seq = 0        # 已落盘的最大序号
+        self.snapshot_seq = 0       # 最新快照覆盖到的序号
+        self._pending = []
+        self._file = None
+        self._tail = (None, 0)      # 已读到的 (分段路径, 字节位置)，之后的内容由其他进程写入
+        self.commits = 0            # fsync 批次数
+        self.replayed = 0           # 启动时回放的记录数
+        if path:
+            os.makedirs(path, exist_ok=True)
+            with self._file_lock:
+                self._load()
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.path, f"segment-{first_seq:012d}.jsonl")
+
+    def _snapshot_path(self, seq):
+        return os.path.join(self.path, f"snapshot-{seq:012d}.json")
+
+    def _list(self, prefix, suffix):
+        # [(序号, 文件路径)]，按序号升序
+        found = []
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and name.endswith(suffix) and name[len(prefix):-len(suffix)].isdigit():
+                found.append((int(name[len(prefix):-len(suffix)]), os.path.join(self.path, name)))
+        return sorted(found)
+
+    def _load(self):
+        # 持文件锁调用：最新的可读快照 + 其后各分段；分段末尾没写完的行截掉
+        self.state = JournalState()
+        self.seq = self.snapshot_seq = 0
+        for seq, snapshot in reversed(self._list("snapshot-", ".json")):
+            try:
+                with open(snapshot, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self.state = JournalState.from_dict(saved["state"])
+            self.seq = self.snapshot_seq = seq
+            break
+        segments = self._list("segment-", ".jsonl")
+        start = 0
+        while start + 1 < len(segments) and segments[start + 1][0] <= self.seq + 1:
+            start += 1
+        for _, segment in segments[start:]:
+            good = 0
+            with open(segment, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if record["seq"] <= self.seq:
+                        continue
+                    self.state.apply(record)
+                    self.seq = record["seq"]
+                    self.replayed += 1
+            if good < os.path.getsize(segment):
+                with open(segment, "r+b") as f:
+                    f.truncate(good)
+        self.durable_seq = self.seq
+        last = segments[-1][1] if segments else self._segment_path(self.seq + 1)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(last, "ab")
+        self._tail = (last, self._file.seek(0, os.SEEK_END))
+
+    def _catch_up(self):
+        # 持文件锁调用：读入其他进程在本进程上次读写之后追加的记录，并切到最新分段继续追加
+        segments = [segment for _, segment in self._list("segment-", ".jsonl")]
+        tail_path, offset = self._tail
+        if tail_path not in segments:
+            # 读到一半的分段已被其他进程 compact 删除，从最新快照重新恢复
+            self._load()
+            return
+        for segment in segments[segments.index(tail_path):]:
+            if segment != tail_path:
+                offset = 0
+            if os.path.getsize(segment) > offset:
+                with open(segment, "rb") as f:
+                    f.seek(offset)
+                    for line in f:
+                        record = json.loads(line)
+                        offset += len(line)
+                        if record["seq"] <= self.seq:
+                            continue
+                        with self._lock:
+                            self.state.apply(record)
+                            self.seq = self.durable_seq = record["seq"]
+            self._tail = (segment, offset)
+        if segments[-1] != tail_path:
+            # 其他进程切换过分段（可能同时写了快照）
+            snapshots = self._list("snapshot-", ".json")
+            self.snapshot_seq = max(self.snapshot_seq, snapshots[-1][0] if snapshots else 0)
+            self._file.close()
+            self._file = open(segments[-1], "ab")
+
+    def refresh(self):
+        # 读入其他进程追加的记录，使 history()/active() 反映所有进程的交易
+        if not self.path:
+            return
+        with self._flush_lock, self._file_lock:
+            self._catch_up()
+
+    def append(self, kind, user, data=None, amount=0.0):
+        # 追加一条记录，落盘后返回其序号
+        return self.append_many([(kind, user, data, amount)])
+
+    def append_many(self, events):
+        # events: [(类型, 用户, 数据, 金额), ...]，同一批一次提交；返回最后一条的序号
+        # 所在批次写盘失败时抛出异常，这些记录不会落盘（调用方可以安全重试）
+        if not events:
+            return self.durable_seq
+        now = int(time.time())
+        with self._lock:
+            records = [{"seq": 0, "ts": now, "type": kind, "user": user or "", "amount": round(float(amount), 2), "data": data or {}}
+                       for kind, user, data, amount in events]
+            request = {"records": records, "done": False, "error": None}
+            self._pending.append(request)
+        self._commit(request)
+        return records[-1]["seq"]
+
+    def _commit(self, request):
+        # 组提交：没有线程在写盘时由当前线程带走所有待写请求一次写入并 fsync，
+        # 否则等正在写的一批完成；自己的请求已随别人的批次提交（或失败）就直接返回（或抛出同一异常）
+        with self._flushed:
+            while self._flushing and not request["done"] and request["error"] is None:
+                self._flushed.wait()
+            if request["error"] is not None:
+                raise request["error"]
+            if request["done"]:
+                return
+            self._flushing = True
+            batch, self._pending = self._pending, []
+        error = None
+        try:
+            records = [record for pending in batch for record in pending["records"]]
+            with self._flush_lock, self._file_lock:
+                if self.path:
+                    self._catch_up()
+                for seq, record in enumerate(records, start=self.seq + 1):
+                    record["seq"] = seq
+                if self.path:
+                    start = self._file.seek(0, os.SEEK_END)
+                    try:
+                        self._write(records)
+                    except BaseException:
+                        # 写盘或 fsync 失败：截掉本批可能写了一半的内容，整批作废
+                        self._discard_from(start)
+                        raise
+                    self._tail = (self._file.name, self._file.tell())
+                with self._lock:
+                    for record in records:
+                        self.state.apply(record)
+                    self.seq = self.durable_seq = records[-1]["seq"]
+                    self.commits += 1
+                if self.path:
+                    try:
+                        if self.durable_seq - self.snapshot_seq >= self.snapshot_every:
+                            self._snapshot()
+                        elif self._file.tell() >= self.segment_bytes:
+                            self._rotate()
+                    except OSError:
+                        # 本批已落盘；快照或切换分段失败只影响恢复速度，下次提交时再试
+                        pass
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            with self._flushed:
+                for pending in batch:
+                    pending["done"] = error is None
+                    pending["error"] = error
+                self._flushing = False
+                self._flushed.notify_all()
+
+    def _write(self, batch):
+        self._file.write("".join(_ENCODER.encode(record) + "\n" for record in batch).encode("utf-8"))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _discard_from(self, offset):
+        # 丢弃当前段 offset 之后的内容并重新打开，避免留下半行导致恢复时截断其后的记录
+        name = self._file.name
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(name, offset)
+        except OSError:
+            pass
+        self._file = open(name, "ab")
+
+    def _rotate(self):
+        # 新分段打开成功后才关闭旧分段，失败时继续写旧分段
+        segment = open(self._segment_path(self.durable_seq + 1), "ab")
+        self._file.close()
+        self._file = segment
+        self._tail = (segment.name, segment.seek(0, os.SEEK_END))
+
+    def _snapshot(self):
+        # 在写盘锁内调用：投影此时恰好对应 durable_seq
+        seq = self.durable_seq
+        with self._lock:
+            payload = _ENCODER.encode({"seq": seq, "state": self.state.to_dict()})
+        tmp_path = self._snapshot_path(seq) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path(seq))
+        for old, old_path in self._list("snapshot-", ".json"):
+            if old < seq:
+                os.remove(old_path)
+        self.snapshot_seq = seq
+        self._rotate()
+
+    def snapshot(self):
+        if not self.path:
+            return
+        with self._flush_lock, self._file_lock:
+            self._catch_up()
+            if self.durable_seq > self.snapshot_seq:
+                self._snapshot()
+
+    def compact(self):
+        # 删除已被最新快照完全覆盖的分段，返回删除的文件数
+        with self._flush_lock, self._file_lock:
+            self._catch_up()
+            segments = self._list("segment-", ".jsonl")
+            removed = 0
+            for (first, segment), (next_first, _) in zip(segments, segments[1:]):
+                if next_first <= self.snapshot_seq + 1:
+                    os.remove(segment)
+                    removed += 1
+            return removed
+
+    def history(self, user):
+        # 用户最近的记录 [序号, 时间, 类型, 金额]（新的在前）与各类型次数
+        with self._lock:
+            entry = self.state.users.get(user)
+            if entry is None:
+                return [], {}
+            return list(reversed(entry["recent"])), dict(entry["counts"])
+
+    def active(self, kind, user):
+        with self._lock:
+            return self.state.active[kind].get(user)
+
+    def close(self):
+        with self._flush_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
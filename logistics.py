@@ -0,0 +1,192 @@
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# RFID物流站点（按配送流程顺序），站点编号即数组下标
+STATIONS = [
+    "订单已确认，正在准备",
+    "农场采摘完成",
+    "RFID分拣完成，正在配送中",
+    "已到达配送站点，即将送达",
+    "已送达",
+]
+
+# 列式日志的列定义：列名 -> 数据类型
+COLUMNS = {
+    "order_id": np.int64,
+    "station": np.int8,
+    "ts": np.int64,  # 扫描时间（Unix秒）
+}
+
+_NOT_SEEN = np.iinfo(np.int64).max
+
+
+def new_order_id():
+    # 订单号即RFID标签号：年月日时分秒+微秒，保证在int64范围内
+    return int(datetime.now().strftime("%y%m%d%H%M%S%f"))
+
+
+class RfidEventLog:
+    # RFID扫描事件的列式追加日志，同时维护"每个订单最新事件"索引
+    # 每个站点的首次扫描时间也一并记录，订单追踪直接读取索引，无需回扫日志
+
+    def __init__(self, path=None, capacity=1 << 16):
+        self.path = path
+        self._lock = threading.Lock()
+        self._size = 0
+        self._cols = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        # 订单号 -> 索引槽位
+        self._slots = {}
+        self._latest_station = np.full(1024, -1, dtype=np.int8)
+        self._latest_ts = np.full(1024, -1, dtype=np.int64)
+        self._station_ts = np.full((1024, len(STATIONS)), _NOT_SEEN, dtype=np.int64)
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._replay()
+
+    def __len__(self):
+        return self._size
+
+    def _column_file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _replay(self):
+        # 从磁盘列文件恢复日志与索引
+        arrays = {}
+        for name, dtype in COLUMNS.items():
+            file_path = self._column_file(name)
+            arrays[name] = np.fromfile(file_path, dtype=dtype) if os.path.exists(file_path) else np.empty(0, dtype=dtype)
+        n = min(len(a) for a in arrays.values())
+        if n:
+            self._apply(arrays["order_id"][:n], arrays["station"][:n], arrays["ts"][:n])
+
+    def _grow_log(self, need):
+        capacity = len(self._cols["ts"])
+        if need <= capacity:
+            return
+        while capacity < need:
+            capacity *= 2
+        for name, col in self._cols.items():
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._cols[name] = grown
+
+    def _grow_index(self, need):
+        capacity = len(self._latest_ts)
+        if need <= capacity:
+            return
+        while capacity < need:
+            capacity *= 2
+        extra = capacity - len(self._latest_ts)
+        self._latest_station = np.concatenate([self._latest_station, np.full(extra, -1, dtype=np.int8)])
+        self._latest_ts = np.concatenate([self._latest_ts, np.full(extra, -1, dtype=np.int64)])
+        self._station_ts = np.vstack([self._station_ts, np.full((extra, len(STATIONS)), _NOT_SEEN, dtype=np.int64)])
+
+    def _slot_of(self, order_ids):
+        # 只对本批次去重后的订单号查字典，其余均为向量运算
+        unique_ids, inverse = np.unique(order_ids, return_inverse=True)
+        slots = self._slots
+        unique_slots = np.empty(len(unique_ids), dtype=np.int64)
+        for i, oid in enumerate(unique_ids.tolist()):
+            slot = slots.get(oid)
+            if slot is None:
+                slot = slots[oid] = len(slots)
+            unique_slots[i] = slot
+        self._grow_index(len(slots))
+        return unique_slots[inverse]
+
+    def _apply(self, order_ids, stations, ts):
+        n = len(ts)
+        start = self._size
+        self._grow_log(start + n)
+        self._cols["order_id"][start:start + n] = order_ids
+        self._cols["station"][start:start + n] = stations
+        self._cols["ts"][start:start + n] = ts
+        self._size = start + n
+
+        slots = self._slot_of(order_ids)
+
+        # 每个站点记录最早的扫描时间
+        np.minimum.at(self._station_ts, (slots, stations.astype(np.int64)), ts)
+
+        # 批内按(槽位, 时间, 站点)排序，取每个槽位的最后一条即为本批最新事件
+        order = np.lexsort((stations, ts, slots))
+        sorted_slots = slots[order]
+        last = np.empty(n, dtype=bool)
+        last[:-1] = sorted_slots[1:] != sorted_slots[:-1]
+        last[-1] = True
+        idx = order[last]
+        batch_slots = slots[idx]
+        newer = (ts[idx] > self._latest_ts[batch_slots]) | (
+            (ts[idx] == self._latest_ts[batch_slots]) & (stations[idx] > self._latest_station[batch_slots])
+        )
+        batch_slots = batch_slots[newer]
+        self._latest_ts[batch_slots] = ts[idx][newer]
+        self._latest_station[batch_slots] = stations[idx][newer]
+
+    def ingest(self, order_ids, stations, timestamps):
+        # 批量写入扫描事件，返回写入条数
+        order_ids = np.asarray(order_ids, dtype=np.int64)
+        # 先按 int64 读入做范围校验，再压缩为 int8（直接转 int8 时 260 之类的值会回绕成合法站点）
+        stations = np.asarray(stations, dtype=np.int64)
+        ts = np.asarray(timestamps)
+        if np.issubdtype(ts.dtype, np.datetime64):
+            ts = ts.astype("datetime64[s]").astype(np.int64)
+        else:
+            ts = ts.astype(np.int64)
+
+        if not (len(order_ids) == len(stations) == len(ts)):
+            raise ValueError("order_id、station、timestamp 长度不一致")
+        if len(ts) == 0:
+            return 0
+        if stations.min() < 0 or stations.max() >= len(STATIONS):
+            raise ValueError("存在未知的RFID站点编号")
+        stations = stations.astype(np.int8)
+
+        with self._lock:
+            if self.path:
+                for name, values in (("order_id", order_ids), ("station", stations), ("ts", ts)):
+                    with open(self._column_file(name), "ab") as f:
+                        values.tofile(f)
+            self._apply(order_ids, stations, ts)
+        return len(ts)
+
+    def ingest_frame(self, df):
+        # 接收包含 order_id / station / timestamp 列的DataFrame（例如上传的扫描批次CSV）
+        stations = df["station"]
+        if stations.dtype == object:
+            stations = stations.map(lambda s: STATIONS.index(s) if s in STATIONS else int(s))
+        timestamps = df["timestamp"]
+        if timestamps.dtype == object:
+            timestamps = timestamps.astype("datetime64[s]")
+        return self.ingest(df["order_id"].to_numpy(), stations.to_numpy(), timestamps.to_numpy())
+
+    def latest(self, order_id):
+        # 返回订单最新事件 (站点编号, 时间戳)，未扫描过返回 None
+        slot = self._slots.get(int(order_id))
+        if slot is None or self._latest_station[slot] < 0:
+            return None
+        return int(self._latest_station[slot]), int(self._latest_ts[slot])
+
+    def timeline(self, order_id):
+        # 返回订单已经过的站点列表 [(站点名, datetime), ...]，按流程顺序排列
+        slot = self._slots.get(int(order_id))
+        if slot is None:
+            return []
+        seen = self._station_ts[slot]
+        return [
+            (STATIONS[i], datetime.fromtimestamp(int(t)))
+            for i, t in enumerate(seen.tolist())
+            if t != _NOT_SEEN
+        ]
+
+    def status(self, order_id):
+        # 返回 (进度, 状态文本)，供订单追踪页展示
+        latest = self.latest(order_id)
+        if latest is None:
+            return 0.0, "等待RFID扫描"
+        station = latest[0]
+        return (station + 1) / len(STATIONS), STATIONS[station]
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+# 会员等级：年费、折扣（民宿/农产品）、每年免费入住次数与每次天数上限、免费农事体验次数
+TIERS = {
+    "普通会员": {"fee": 298, "homestay": 0.7, "product": 0.9, "free_stays": 2, "max_nights": 2, "farm_activities": 0},
+    "银卡会员": {"fee": 598, "homestay": 0.6, "product": 0.8, "free_stays": 4, "max_nights": 2, "farm_activities": 4},
+    "金卡会员": {"fee": 998, "homestay": 0.5, "product": 0.7, "free_stays": 6, "max_nights": 3, "farm_activities": 0},
+}
+
+# 可计次的权益，编号即余额表的列号
+BENEFITS = ["free_stay", "farm_activity"]
+FREE_STAY, FARM_ACTIVITY = range(len(BENEFITS))
+
+# 金卡会员免费参加的活动类型（"免费参加所有农事体验"）
+FREE_ACTIVITY_TYPES = {"农耕体验"}
+
+MEMBERSHIP_DAYS = 365
+
+COLUMNS = {
+    "member": np.int32,
+    "benefit": np.int8,
+    "delta": np.int16,  # 发放为正，核销为负
+    "day": np.int32,    # 记账日期（距1970-01-01天数）
+}
+
+
+class MembershipLedger:
+    # 会员权益台账：发放与核销只追加记录，同时维护每个会员的余额缓存，
+    # "能否核销"只查缓存，O(1)；重启时按列批量回放台账重建余额
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._members = {}
+        self._names = []
+        self._tiers = []
+        self._expires = []
+        self._size = 0
+        self._cols = {name: np.empty(1024, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._balances = np.zeros((0, len(BENEFITS)), dtype=np.int32)
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._replay()
+
+    def _column_file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _members_file(self):
+        return os.path.join(self.path, "members.jsonl")
+
+    def _replay(self):
+        if os.path.exists(self._members_file()):
+            with open(self._members_file(), "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._set_tier(record["member"], record["tier"], date.fromisoformat(record["expires"]))
+        arrays = {
+            name: np.fromfile(self._column_file(name), dtype=dtype) if os.path.exists(self._column_file(name))
+            else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        self.replay(arrays)
+
+    def replay(self, arrays):
+        # 向量化回放：按 (会员, 权益) 对 delta 求和即为余额
+        n = min(len(a) for a in arrays.values())
+        flat = arrays["member"][:n].astype(np.int64) * len(BENEFITS) + arrays["benefit"][:n]
+        balances = np.bincount(flat, weights=arrays["delta"][:n], minlength=len(self._names) * len(BENEFITS))
+        self._balances = balances.astype(np.int32).reshape(-1, len(BENEFITS))
+        self._cols = {name: np.array(arrays[name][:n], dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = n
+
+    def entries(self):
+        # 台账全部记录（列式），可直接交给 replay 回放
+        return {name: col[:self._size] for name, col in self._cols.items()}
+
+    def _set_tier(self, member, tier, expires):
+        idx = self._members.get(member)
+        if idx is None:
+            idx = self._members[member] = len(self._names)
+            self._names.append(member)
+            self._tiers.append(tier)
+            self._expires.append(expires)
+        else:
+            self._tiers[idx] = tier
+            self._expires[idx] = expires
+        return idx
+
+    def _append(self, idx, benefit, delta, day):
+        if len(self._balances) <= idx:
+            grown = np.zeros((max(idx + 1, len(self._balances) * 2), len(BENEFITS)), dtype=np.int32)
+            grown[:len(self._balances)] = self._balances
+            self._balances = grown
+        self._balances[idx, benefit] += delta
+        if self._size == len(self._cols["member"]):
+            for name, col in self._cols.items():
+                grown = np.empty(max(len(col) * 2, 1024), dtype=col.dtype)
+                grown[:self._size] = col
+                self._cols[name] = grown
+        row = {"member": idx, "benefit": benefit, "delta": delta, "day": (day - date(1970, 1, 1)).days}
+        for name, col in self._cols.items():
+            col[self._size] = row[name]
+            if self.path:
+                with open(self._column_file(name), "ab") as f:
+                    col[self._size:self._size + 1].tofile(f)
+        self._size += 1
+
+    def join(self, member, tier, today=None):
+        # 加入会员：记录等级与有效期，并发放该等级的年度权益；
+        # 会员有效期内不能重复加入，返回 None
+        today = today or date.today()
+        expires = today + timedelta(days=MEMBERSHIP_DAYS)
+        with self._lock:
+            if self.tier(member, today) is not None:
+                return None
+            idx = self._set_tier(member, tier, expires)
+            if self.path:
+                with open(self._members_file(), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"member": member, "tier": tier, "expires": expires.isoformat()}, ensure_ascii=False) + "\n")
+            # 上一会员年度未用完的权益作废，记一笔冲销使余额归零
+            for benefit in range(len(BENEFITS)):
+                remaining = int(self._balances[idx, benefit]) if idx < len(self._balances) else 0
+                if remaining:
+                    self._append(idx, benefit, -remaining, today)
+            self._append(idx, FREE_STAY, TIERS[tier]["free_stays"], today)
+            if TIERS[tier]["farm_activities"]:
+                self._append(idx, FARM_ACTIVITY, TIERS[tier]["farm_activities"], today)
+        return expires
+
+    def tier(self, member, today=None):
+        # 当前有效会员等级，非会员或已过期返回 None
+        idx = self._members.get(member)
+        if idx is None or self._expires[idx] < (today or date.today()):
+            return None
+        return self._tiers[idx]
+
+    def balance(self, member, benefit):
+        # 权益只在当前会员年度内有效，会员过期后余额为 0
+        idx = self._members.get(member)
+        if idx is None or idx >= len(self._balances) or self.tier(member) is None:
+            return 0
+        return int(self._balances[idx, benefit])
+
+    def can_redeem(self, member, benefit, nights=None):
+        tier = self.tier(member)
+        if tier is None or self.balance(member, benefit) <= 0:
+            return False
+        if benefit == FREE_STAY and nights is not None:
+            return nights <= TIERS[tier]["max_nights"]
+        return True
+
+    def redeem(self, member, benefit, nights=None):
+        # 核销一次权益，余额不足时返回 False
+        with self._lock:
+            if not self.can_redeem(member, benefit, nights):
+                return False
+            self._append(self._members[member], benefit, -1, date.today())
+            return True
+
+
+def resolve_discount(ledger, member, channel, category=None):
+    # 统一的会员折扣入口：购物车(product)、民宿(homestay)、亲子活动(activity)的价格都经此计算
+    tier = ledger.tier(member) if member else None
+    if tier is None:
+        return 1.0
+    if channel == "activity":
+        return 0.0 if tier == "金卡会员" and category in FREE_ACTIVITY_TYPES else 1.0
+    return TIERS[tier][channel]
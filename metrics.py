@@ -0,0 +1,247 @@
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from filelock import try_lock
+
+# 页面与区块耗时统计：计时结果进直方图（导出 Prometheus 文本格式）和最近样本环形缓冲（算 p50/p95/p99）
+# 环境变量：
+#   METRICS_PROFILE_RATE  按该比例抽样对页面运行 cProfile，结果写入 data/metrics/profiles
+#   METRICS_PORT          设置后在本机 该端口 + 工作进程编号 上提供 /metrics
+#   METRICS_TEXTFILE      Prometheus 文本文件路径，默认 data/metrics/metrics.prom；每个工作进程写 metrics-<编号>.prom
+# 多个 Streamlit 进程同机运行时各取一个工作进程编号（持有 data/metrics/worker-<编号>.lock），
+# 端口、文本文件和 worker 标签都按编号区分，互不覆盖
+
+# 直方图桶上界（秒）
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 每个区块保留的最近样本数
+RESERVOIR = 2048
+
+# 文本文件最短写入间隔（秒）
+FLUSH_INTERVAL = 5.0
+
+PROFILE_DIR = "data/metrics/profiles"
+
+WORKER_DIR = "data/metrics"
+
+# 同机最多区分的工作进程数
+MAX_WORKERS = 64
+
+
+class SectionStats:
+    def __init__(self):
+        self.buckets = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.count = 0
+        self.recent = np.zeros(RESERVOIR)
+
+    def observe(self, seconds):
+        self.buckets[np.searchsorted(BUCKETS, seconds)] += 1
+        self.recent[self.count % RESERVOIR] = seconds
+        self.total += seconds
+        self.count += 1
+
+    def percentiles(self, qs=(50, 95, 99)):
+        return np.percentile(self.recent[:min(self.count, RESERVOIR)], qs)
+
+
+class MetricsRegistry:
+    def __init__(self, textfile=None):
+        self.textfile = textfile
+        # 工作进程编号，设置后导出的每条序列带 worker 标签、文本文件按编号分开
+        self.worker = None
+        self._lock = threading.Lock()
+        self.sections = {}
+        self._last_flush = 0.0
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self.sections.get(name)
+            if stats is None:
+                stats = self.sections[name] = SectionStats()
+            stats.observe(seconds)
+
+    def export(self):
+        # Prometheus 文本格式：累计桶计数、总耗时与次数
+        lines = [
+            "# HELP app_section_seconds Wall time spent in each page and section.",
+            "# TYPE app_section_seconds histogram",
+        ]
+        worker = "" if self.worker is None else f',worker="{self.worker}"'
+        with self._lock:
+            for name, stats in sorted(self.sections.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                labels = f'section="{label}"{worker}'
+                cumulative = np.cumsum(stats.buckets)
+                for bound, count in zip(BUCKETS, cumulative):
+                    lines.append(f'app_section_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'app_section_seconds_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'app_section_seconds_sum{{{labels}}} {stats.total:.6f}')
+                lines.append(f'app_section_seconds_count{{{labels}}} {stats.count}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self, force=False):
+        # 写 Prometheus 文本文件（node_exporter textfile 采集），按间隔节流
+        now = time.monotonic()
+        if not self.textfile or (not force and now - self._last_flush < FLUSH_INTERVAL):
+            return
+        self._last_flush = now
+        path = self.textfile
+        if self.worker is not None:
+            base, ext = os.path.splitext(path)
+            path = f"{base}-{self.worker}{ext}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.export())
+        os.replace(path + ".tmp", path)
+
+    def summary(self):
+        # 管理员面板：每个区块的次数与分位耗时（毫秒）
+        with self._lock:
+            rows = [
+                (name, stats.count, *(stats.percentiles() * 1000), stats.total / stats.count * 1000)
+                for name, stats in sorted(self.sections.items())
+            ]
+        return pd.DataFrame(rows, columns=["区块", "次数", "p50(ms)", "p95(ms)", "p99(ms)", "平均(ms)"])
+
+
+REGISTRY = MetricsRegistry(os.environ.get("METRICS_TEXTFILE", "data/metrics/metrics.prom"))
+
+PROFILE_RATE = float(os.environ.get("METRICS_PROFILE_RATE", "0") or 0)
+
+_local = threading.local()
+
+
+class Span:
+    # 手动起止的计时区间，用于无法套上 with 的整页代码；sample_profile 时按比例抽样 cProfile
+    def __init__(self, name, registry=REGISTRY, sample_profile=False):
+        self.name = name
+        self.registry = registry
+        self.profiler = None
+        if sample_profile and PROFILE_RATE > 0 and random.random() < PROFILE_RATE:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+
+    def stop(self):
+        elapsed = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            safe_name = "".join(c if c.isalnum() else "_" for c in self.name)
+            self.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{safe_name}-{int(time.time() * 1000)}.prof"))
+            self.profiler = None
+        self.registry.observe(self.name, elapsed)
+        return elapsed
+
+    def abandon(self):
+        # 脚本中途 st.rerun()/st.stop() 时区间没有走到 stop，丢弃计时并关掉抽样的分析器
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
+
+
+def start(name, sample_profile=False):
+    # 同一线程上一次运行遗留未结束的区间先丢弃
+    spans = getattr(_local, "spans", None)
+    if spans is None:
+        spans = _local.spans = {}
+    stale = spans.pop(name, None)
+    if stale is not None:
+        stale.abandon()
+    span = spans[name] = Span(name, sample_profile=sample_profile)
+    return span
+
+
+def stop(span):
+    getattr(_local, "spans", {}).pop(span.name, None)
+    return span.stop()
+
+
+@contextmanager
+def section(name, registry=REGISTRY):
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - began)
+
+
+def timed(name=None):
+    # 装饰器：按函数名（或给定名称）计时
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.export().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_serve_tried = False
+_worker = None
+_server_lock = threading.Lock()
+
+
+def worker_index():
+    # 本进程的工作进程编号：第一个能加上锁的 worker-<编号>.lock；进程退出后编号由系统释放，重启的进程接着用
+    global _worker
+    with _server_lock:
+        if _worker is None:
+            _worker = next(
+                (i for i in range(MAX_WORKERS) if try_lock(os.path.join(WORKER_DIR, f"worker-{i}.lock"))),
+                MAX_WORKERS,
+            )
+    return _worker
+
+
+def serve(port=None):
+    # 给 REGISTRY 标上工作进程编号，并在本机 端口 + 编号 上提供 /metrics；进程内只尝试一次，未配置端口时不启动
+    # 端口被占用等错误只记到 stderr，不影响页面
+    global _server, _serve_tried
+    REGISTRY.worker = worker = worker_index()
+    port = port or os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if not _serve_tried:
+            _serve_tried = True
+            if worker >= MAX_WORKERS:
+                print(f"metrics：同机工作进程超过 {MAX_WORKERS} 个，本进程不提供 /metrics", file=sys.stderr)
+                return None
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", int(port) + worker), _MetricsHandler)
+            except OSError as exc:
+                print(f"metrics：无法监听端口 {int(port) + worker}（{exc}），本进程不提供 /metrics", file=sys.stderr)
+            else:
+                threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
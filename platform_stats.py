@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+# 首页平台数据：服务农户、合作基地、产品品类、年交易额
+# 总量随每次下单/上新增量更新，环比变化取自按天汇总的日表，渲染时不扫描订单
+
+# 日表字段顺序
+ROLLUP_FIELDS = ["revenue", "orders", "farmers", "farms", "skus"]
+REVENUE, ORDERS, FARMERS, FARMS, SKUS = range(len(ROLLUP_FIELDS))
+
+DELTA_DAYS = 30
+YEAR_DAYS = 365
+
+
+class PlatformStats:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.farmers = set()
+        self.farms = set()
+        self.skus = set()
+        self.daily = {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+            entities = self._read("entities.json")
+            if entities:
+                self.farmers = set(entities["farmers"])
+                self.farms = set(entities["farms"])
+                self.skus = set(entities["skus"])
+            self.daily = self._read("daily.json") or {}
+
+    def _read(self, name):
+        file_path = os.path.join(self.path, name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, name, data):
+        # 日表与实体集合分开落盘，下单时只重写日表
+        if not self.path:
+            return
+        file_path = os.path.join(self.path, name)
+        with open(file_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(file_path + ".tmp", file_path)
+
+    def _bump(self, day, field, amount):
+        row = self.daily.setdefault(day.isoformat(), [0] * len(ROLLUP_FIELDS))
+        row[field] += amount
+
+    def register(self, farmers=(), farms=(), skus=(), day=None):
+        # 登记农户、基地、商品，首次出现的计入当天新增
+        day = day or date.today()
+        with self._lock:
+            changed = False
+            for names, known, field in ((farmers, self.farmers, FARMERS), (farms, self.farms, FARMS), (skus, self.skus, SKUS)):
+                new = set(names) - known
+                if new:
+                    known.update(new)
+                    self._bump(day, field, len(new))
+                    changed = True
+            if changed:
+                self._write("entities.json", {
+                    "farmers": sorted(self.farmers),
+                    "farms": sorted(self.farms),
+                    "skus": sorted(self.skus),
+                })
+                self._write("daily.json", self.daily)
+
+    def record_order(self, amount, day=None):
+        # 订单提交时调用：累加当天交易额与订单数
+        day = day or date.today()
+        with self._lock:
+            self._bump(day, REVENUE, amount)
+            self._bump(day, ORDERS, 1)
+            self._write("daily.json", self.daily)
+
+    def _window_sum(self, field, start, end):
+        # 日表按天求和，窗口长度固定，与订单总量无关
+        total = 0
+        day = start
+        while day < end:
+            row = self.daily.get(day.isoformat())
+            if row:
+                total += row[field]
+            day += timedelta(days=1)
+        return total
+
+    def snapshot(self, today=None):
+        # 返回 {指标: (当前值, 环比变化百分比或 None)}
+        today = today or date.today()
+        end = today + timedelta(days=1)
+        recent_start = end - timedelta(days=DELTA_DAYS)
+        previous_start = recent_start - timedelta(days=DELTA_DAYS)
+
+        def growth(total, field):
+            # 近30天新增相对30天前存量的增幅
+            added = self._window_sum(field, recent_start, end)
+            base = total - added
+            return added / base * 100 if base > 0 else None
+
+        recent_revenue = self._window_sum(REVENUE, recent_start, end)
+        previous_revenue = self._window_sum(REVENUE, previous_start, recent_start)
+        return {
+            "服务农户": (len(self.farmers), growth(len(self.farmers), FARMERS)),
+            "合作基地": (len(self.farms), growth(len(self.farms), FARMS)),
+            "产品品类": (len(self.skus), growth(len(self.skus), SKUS)),
+            "年交易额": (
+                self._window_sum(REVENUE, end - timedelta(days=YEAR_DAYS), end),
+                (recent_revenue - previous_revenue) / previous_revenue * 100 if previous_revenue else None,
+            ),
+        }
@@ -0,0 +1,194 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from filelock import FileLock, file_stamp
+
+# 共享农庄地块库存：每个农场划分为 rows x cols 的网格，每格5平米
+# 空闲格子用位图（Python大整数，行优先）表示，10/20平米地块按伙伴式对齐：
+# 10平米占同一行相邻两格（起始列为偶数），20平米占2x2方块（起始行列均为偶数），
+# 因此对齐后的可分配起点互不重叠，起点位图的置位数即可认种块数
+FARM_LAYOUTS = {
+    "河北农场": (8, 12),
+    "山东农场": (6, 10),
+    "云南农场": (6, 8),
+}
+
+# 地块面积 -> (占用行数, 占用列数)
+PLOT_SHAPES = {
+    "5平米": (1, 1),
+    "10平米": (1, 2),
+    "20平米": (2, 2),
+}
+
+SEASON_DAYS = 90
+
+
+class FarmGrid:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.free = (1 << (rows * cols)) - 1
+        # 各尺寸的对齐起点掩码（与空闲状态无关，只算一次）
+        self._aligned = {}
+        for size, (h, w) in PLOT_SHAPES.items():
+            mask = 0
+            for r in range(0, rows - h + 1, h):
+                for c in range(0, cols - w + 1, w):
+                    mask |= 1 << (r * cols + c)
+            self._aligned[size] = mask
+        self._placements = {}
+        self._refresh()
+
+    def shape_mask(self, size, start):
+        h, w = PLOT_SHAPES[size]
+        row_bits = ((1 << w) - 1) << start
+        mask = 0
+        for i in range(h):
+            mask |= row_bits << (i * self.cols)
+        return mask
+
+    def _refresh(self):
+        # 每次分配/释放后重算起点位图，查询时直接读取
+        free = self.free
+        for size, (h, w) in PLOT_SHAPES.items():
+            ok = free
+            for i in range(h):
+                for j in range(w):
+                    ok &= free >> (i * self.cols + j)
+            self._placements[size] = ok & self._aligned[size]
+
+    def available(self, size):
+        return self._placements[size].bit_count()
+
+    def take(self, size):
+        bits = self._placements[size]
+        if not bits:
+            return None
+        start = (bits & -bits).bit_length() - 1
+        self.free &= ~self.shape_mask(size, start)
+        self._refresh()
+        return start
+
+    def give_back(self, size, start):
+        self.free |= self.shape_mask(size, start)
+        self._refresh()
+
+    def label(self, start):
+        # 地块编号：行用字母，列用数字，例如 B3
+        row, col = divmod(start, self.cols)
+        return f"{chr(ord('A') + row)}{col + 1}"
+
+
+class PlotInventory:
+    def __init__(self, path=None, layouts=None):
+        self.path = path
+        # 多个进程共用 plots.json：分配与释放在文件锁内先读入其他进程的改动再修改、写回
+        self._lock = FileLock(path + ".lock" if path else None)
+        self._stamp = None
+        self.layouts = layouts or FARM_LAYOUTS
+        self._reset()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _reset(self):
+        self.grids = {farm: FarmGrid(rows, cols) for farm, (rows, cols) in self.layouts.items()}
+        self.allocations = {}
+        self._next_id = 1
+        self._earliest_end = None
+
+    def _load(self):
+        self._stamp = file_stamp(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        for record in saved["allocations"]:
+            grid = self.grids[record["farm"]]
+            grid.free &= ~grid.shape_mask(record["size"], record["start"])
+            self.allocations[record["id"]] = record
+        for grid in self.grids.values():
+            grid._refresh()
+        self._next_id = saved.get("next_id", len(self.allocations) + 1)
+        self._update_earliest_end()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"next_id": self._next_id, "allocations": list(self.allocations.values())}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stamp = file_stamp(self.path)
+
+    def _reload_if_changed(self):
+        # 调用方持锁：文件被其他进程改过时按文件内容重建各农场位图
+        if not self.path or file_stamp(self.path) == self._stamp:
+            return
+        self._reset()
+        self._stamp = None
+        if os.path.exists(self.path):
+            self._load()
+
+    def refresh(self):
+        with self._lock:
+            self._reload_if_changed()
+
+    def _update_earliest_end(self):
+        ends = [record["season_end"] for record in self.allocations.values()]
+        self._earliest_end = min(ends) if ends else None
+
+    def availability(self):
+        # 所有农场各尺寸可认种块数：{农场: {尺寸: 块数}}
+        return {
+            farm: {size: grid.available(size) for size in PLOT_SHAPES}
+            for farm, grid in self.grids.items()
+        }
+
+    def allocate(self, farm, size, crop, owner="", season_days=SEASON_DAYS):
+        # 原子分配一块连续地块，无空位时返回 None
+        with self._lock:
+            self._reload_if_changed()
+            grid = self.grids[farm]
+            start = grid.take(size)
+            if start is None:
+                return None
+            record = {
+                "id": self._next_id,
+                "farm": farm,
+                "size": size,
+                "start": start,
+                "plot_no": grid.label(start),
+                "crop": crop,
+                "owner": owner,
+                "season_end": (date.today() + timedelta(days=season_days)).isoformat(),
+            }
+            self._next_id += 1
+            self.allocations[record["id"]] = record
+            self._update_earliest_end()
+            self._save()
+            return record
+
+    def release(self, allocation_id):
+        with self._lock:
+            self._reload_if_changed()
+            record = self.allocations.pop(allocation_id, None)
+            if record is None:
+                return False
+            self.grids[record["farm"]].give_back(record["size"], record["start"])
+            self._update_earliest_end()
+            self._save()
+            return True
+
+    def release_expired(self, today=None):
+        # 季末释放到期地块；未到最早到期日时直接返回，不遍历
+        today = (today or datetime.now().date()).isoformat()
+        if self._earliest_end is None or today < self._earliest_end:
+            return 0
+        with self._lock:
+            self._reload_if_changed()
+            expired = [record for record in self.allocations.values() if record["season_end"] <= today]
+            for record in expired:
+                del self.allocations[record["id"]]
+                self.grids[record["farm"]].give_back(record["size"], record["start"])
+            self._update_earliest_end()
+            self._save()
+            return len(expired)
@@ -0,0 +1,210 @@
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+# 经常一起购买：订单追加写入日志，离线任务按增量构建商品-商品共现矩阵（CSR），
+# 计算每个商品的 top-k 相似商品并落盘为紧凑索引，页面渲染时只做字典查询
+
+TOP_K = 3
+
+# 在线下单累计到该数量时顺带增量重建一次，其余时间由离线任务重建
+REBUILD_EVERY = 10
+
+
+def order_pairs(items, offsets):
+    # 展开每个订单内所有有序商品对 (i, j)，i != j
+    # items: 所有订单的商品编码首尾相接；offsets: 每个订单的起始位置（长度为订单数+1）
+    lengths = np.diff(offsets)
+    order_of = np.repeat(np.arange(len(lengths)), lengths)
+    repeat = lengths[order_of]
+    rows = np.repeat(items, repeat)
+    local = np.arange(len(rows)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+    cols = items[np.repeat(offsets[:-1][order_of], repeat) + local]
+    mask = rows != cols
+    return rows[mask], cols[mask]
+
+
+class CoPurchaseIndex:
+    def __init__(self, path=None, top_k=TOP_K):
+        self.path = path
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self.names = []
+        self._codes = {}
+        # 共现矩阵 CSR 三元组与商品出现次数
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.empty(0, dtype=np.int32)
+        self.data = np.empty(0, dtype=np.int64)
+        self.freq = np.empty(0, dtype=np.int64)
+        # 已并入矩阵的订单日志字节位置
+        self.processed = 0
+        self.pending = 0
+        # 不落盘时待并入的订单暂存在内存
+        self._buffer = []
+        self.similar = {}
+        self._similar_mtime = None
+        self._matrix_mtime = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        self._load_matrix()
+        self.refresh()
+
+    def _load_matrix(self):
+        # 读取上次构建落盘的共现矩阵与已处理位置（按文件修改时间判断是否需要重读）
+        if not os.path.exists(self._file("matrix.npz")):
+            return
+        mtime = os.path.getmtime(self._file("matrix.npz"))
+        if mtime != self._matrix_mtime:
+            with np.load(self._file("matrix.npz")) as matrix:
+                self.indptr = matrix["indptr"]
+                self.indices = matrix["indices"]
+                self.data = matrix["data"]
+                self.freq = matrix["freq"]
+                self.processed = int(matrix["processed"])
+            with open(self._file("items.json"), "r", encoding="utf-8") as f:
+                self.names = json.load(f)
+            self._codes = {name: code for code, name in enumerate(self.names)}
+            self._matrix_mtime = mtime
+
+    def refresh(self):
+        # 离线任务重建后重新加载 top-k 索引（按文件修改时间判断）
+        if not self.path or not os.path.exists(self._file("similar.json")):
+            return
+        mtime = os.path.getmtime(self._file("similar.json"))
+        if mtime != self._similar_mtime:
+            with open(self._file("similar.json"), "r", encoding="utf-8") as f:
+                self.similar = json.load(f)
+            self._similar_mtime = mtime
+
+    def record_order(self, skus):
+        # 订单提交时调用：同一订单内的商品去重后追加到日志
+        skus = sorted(set(skus))
+        if len(skus) < 2:
+            return
+        with self._lock:
+            if self.path:
+                with open(self._file("orders.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(skus, ensure_ascii=False) + "\n")
+            else:
+                self._buffer.append(skus)
+            self.pending += 1
+        if self.pending >= REBUILD_EVERY:
+            self.rebuild()
+
+    def _new_orders(self):
+        orders = []
+        processed = self.processed
+        file_path = self._file("orders.jsonl")
+        if not os.path.exists(file_path):
+            return orders, processed
+        with open(file_path, "rb") as f:
+            f.seek(processed)
+            for line in f:
+                # 末尾未写完的行留到下次
+                if not line.endswith(b"\n"):
+                    break
+                orders.append(json.loads(line))
+                processed += len(line)
+        return orders, processed
+
+    def _code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def add_orders(self, orders):
+        # 把新订单并入共现矩阵：新商品对与已有 CSR 转成坐标形式合并，再重新压缩
+        if not orders:
+            return
+        items = np.fromiter((self._code(sku) for order in orders for sku in order), dtype=np.int64)
+        offsets = np.zeros(len(orders) + 1, dtype=np.int64)
+        np.cumsum([len(order) for order in orders], out=offsets[1:])
+        n = len(self.names)
+
+        rows, cols = order_pairs(items, offsets)
+        old_rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        keys = np.concatenate([old_rows * n + self.indices, rows * n + cols])
+        weights = np.concatenate([self.data, np.ones(len(rows), dtype=np.int64)])
+        keys, inverse = np.unique(keys, return_inverse=True)
+        self.data = np.bincount(inverse, weights=weights).astype(np.int64)
+        self.indices = (keys % n).astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=self.indptr[1:])
+
+        freq = np.zeros(n, dtype=np.int64)
+        freq[:len(self.freq)] = self.freq
+        self.freq = freq + np.bincount(items, minlength=n)
+
+    def top_similar(self):
+        # 余弦相似度：共现次数 / sqrt(freq_i * freq_j)，每行取前 top_k 个
+        n = len(self.names)
+        rows = np.repeat(np.arange(n), np.diff(self.indptr))
+        scores = self.data / np.sqrt(self.freq[rows] * self.freq[self.indices])
+        order = np.lexsort((-self.data, -scores, rows))
+        rank = np.arange(len(order)) - self.indptr[rows[order]]
+        keep = order[rank < self.top_k]
+        similar = {}
+        for row, col in zip(rows[keep].tolist(), self.indices[keep].tolist()):
+            similar.setdefault(self.names[row], []).append(self.names[col])
+        return similar
+
+    def rebuild(self):
+        # 只读取上次构建之后的订单，增量合并后重算 top-k；
+        # 另一进程（离线任务或其他 app 进程）已重建过时先读取它的结果，从它的位置继续
+        with self._lock:
+            if self.path:
+                self._load_matrix()
+                orders, processed = self._new_orders()
+            else:
+                orders, processed = self._buffer, self.processed
+                self._buffer = []
+            self.add_orders(orders)
+            self.processed = processed
+            self.pending = 0
+            self.similar = self.top_similar()
+            if self.path:
+                self._save()
+        return len(orders)
+
+    def _save(self):
+        with open(self._file("items.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f, ensure_ascii=False)
+        np.savez(
+            self._file("matrix.tmp.npz"), indptr=self.indptr, indices=self.indices,
+            data=self.data, freq=self.freq, processed=self.processed,
+        )
+        os.replace(self._file("matrix.tmp.npz"), self._file("matrix.npz"))
+        self._matrix_mtime = os.path.getmtime(self._file("matrix.npz"))
+        with open(self._file("similar.tmp"), "w", encoding="utf-8") as f:
+            json.dump(self.similar, f, ensure_ascii=False)
+        os.replace(self._file("similar.tmp"), self._file("similar.json"))
+        self._similar_mtime = os.path.getmtime(self._file("similar.json"))
+
+    def suggest(self, sku, exclude=()):
+        return [name for name in self.similar.get(sku, ()) if name not in exclude]
+
+    def suggest_for_cart(self, skus, limit=TOP_K):
+        # 合并购物车内各商品的推荐，去掉已在购物车中的商品
+        suggestions = []
+        for sku in skus:
+            for name in self.suggest(sku, exclude=skus):
+                if name not in suggestions:
+                    suggestions.append(name)
+        return suggestions[:limit]
+
+
+if __name__ == "__main__":
+    # 离线重建：python recommend.py [索引目录]
+    index = CoPurchaseIndex(sys.argv[1] if len(sys.argv) > 1 else "data/recommend")
+    print(f"新增订单：{index.rebuild()}，商品数：{len(index.names)}，共现对：{len(index.data)}")
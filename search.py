@@ -0,0 +1,268 @@
+import re
+import threading
+
+import numpy as np
+
+# 商品搜索：名称、描述、产地、分类按汉字二元组（并附单字）建倒排索引，BM25 排序
+# 倒排表按段存放为 CSR 数组（词 -> 文档号、词频），商品目录变化时只为新增/变更的商品建新段，
+# 删除与变更的旧文档打墓碑，段数过多或墓碑过多时合并压缩
+# 查询按 MaxScore 剪枝：稀有词的倒排表完整合并，常见词只对候选文档二分查找补分，
+# 当常见词得分上界之和不足以让候选集之外的文档进入前 k 名时停止展开
+
+K1 = 1.2
+B = 0.75
+
+# 名称在文档中重复的次数，提高名称命中的权重
+NAME_BOOST = 2
+
+MAX_SEGMENTS = 8
+MAX_DEAD_RATIO = 0.3
+
+_RUNS = re.compile(r"[0-9a-z]+|[一-鿿]+")
+
+
+def tokenize(text):
+    # 英文和数字整体成词；汉字取单字与相邻二元组，单字用于一个字的查询
+    terms = []
+    for run in _RUNS.findall(text.lower()):
+        if run.isascii():
+            terms.append(run)
+        else:
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def query_terms(text):
+    # 查询只用二元组匹配，单个汉字退化为单字
+    terms = []
+    for run in _RUNS.findall(text.lower()):
+        if run.isascii() or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def product_text(name, info):
+    return " ".join([name] * NAME_BOOST + [info.get("description", ""), info.get("origin", ""), info.get("category", "")])
+
+
+class Segment:
+    # 一批文档的倒排表：indptr 按词号索引，docs/tfs 为对应的文档号（升序）与词频
+    # max_tf/min_len 为每个词倒排表内的最大词频和最短文档长度，用于估算得分上界
+    def __init__(self, indptr, docs, tfs, lengths):
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        counts = np.diff(indptr)
+        self.max_tf = np.zeros(len(counts), dtype=np.float32)
+        self.min_len = np.zeros(len(counts), dtype=np.float32)
+        nonempty = counts > 0
+        if nonempty.any():
+            starts = indptr[:-1][nonempty]
+            self.max_tf[nonempty] = np.maximum.reduceat(tfs, starts)
+            self.min_len[nonempty] = np.minimum.reduceat(lengths[docs], starts)
+
+    def postings(self, term_id):
+        if term_id + 1 >= len(self.indptr):
+            return self.docs[:0], self.tfs[:0]
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.docs[start:end], self.tfs[start:end]
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vocab = {}
+        self.keys = []
+        self._ids = {}
+        self._texts = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.segments = []
+        self._n_alive = 0
+        self._total_length = 0.0
+
+    def __len__(self):
+        return self._n_alive
+
+    def _term_id(self, term):
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def _build_segment(self, doc_ids, term_lists):
+        # 把 (词号, 文档号) 组合成一个键，np.unique 一次得到去重后的词频，再按词号压缩成 CSR
+        term_ids = np.fromiter((self._term_id(t) for terms in term_lists for t in terms), dtype=np.int64)
+        docs = np.repeat(np.asarray(doc_ids, dtype=np.int64), [len(terms) for terms in term_lists])
+        keys, tfs = np.unique(term_ids * len(self.alive) + docs, return_counts=True)
+        term_of = keys // len(self.alive)
+        indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_of, minlength=len(self.vocab)), out=indptr[1:])
+        return Segment(indptr, (keys % len(self.alive)).astype(np.int32), tfs.astype(np.float32), self.lengths)
+
+    def _grow(self, n):
+        alive = np.zeros(len(self.alive) + n, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        lengths = np.zeros(len(self.lengths) + n, dtype=np.float32)
+        lengths[:len(self.lengths)] = self.lengths
+        self.alive, self.lengths = alive, lengths
+
+    def _remove(self, key):
+        doc_id = self._ids.pop(key)
+        del self._texts[key]
+        self.alive[doc_id] = False
+        self._n_alive -= 1
+        self._total_length -= float(self.lengths[doc_id])
+
+    def sync(self, catalog):
+        # catalog: {商品名: 商品信息}；只为新增或文本变化的商品建索引，返回变更的商品数
+        texts = {name: product_text(name, info) for name, info in catalog.items()}
+        with self._lock:
+            return self._apply(texts, [key for key in self._texts if key not in texts])
+
+    def update(self, changed, removed=()):
+        # 只提交变更部分：changed 为 {商品名: 商品信息}（新增或可能变化的商品），removed 为下架的商品名
+        texts = {name: product_text(name, info) for name, info in changed.items()}
+        with self._lock:
+            return self._apply(texts, [key for key in removed if key in self._texts and key not in texts])
+
+    def _apply(self, texts, removed):
+        # 调用方持锁；texts 中文本未变的商品跳过
+        changed = [key for key, text in texts.items() if self._texts.get(key) != text]
+        if not removed and not changed:
+            return 0
+        for key in removed:
+            self._remove(key)
+        for key in changed:
+            if key in self._ids:
+                self._remove(key)
+
+        start = len(self.alive)
+        self._grow(len(changed))
+        term_lists = [tokenize(texts[key]) for key in changed]
+        for offset, (key, terms) in enumerate(zip(changed, term_lists)):
+            doc_id = start + offset
+            self._ids[key] = doc_id
+            self._texts[key] = texts[key]
+            self.keys.append(key)
+            self.alive[doc_id] = True
+            self.lengths[doc_id] = len(terms)
+            self._total_length += len(terms)
+        self._n_alive += len(changed)
+        if changed:
+            # 段按文档号递增追加，同一个词在各段的倒排表首尾相接仍然有序
+            self.segments = self.segments + [self._build_segment(range(start, start + len(changed)), term_lists)]
+
+        dead = len(self.alive) - self._n_alive
+        if len(self.segments) > MAX_SEGMENTS or dead > MAX_DEAD_RATIO * len(self.alive):
+            self._compact()
+        return len(removed) + len(changed)
+
+    def _compact(self):
+        # 丢弃墓碑文档，重新编号后所有存活文档合成一个段
+        keys = [key for key in self._ids]
+        old_ids = np.array([self._ids[key] for key in keys], dtype=np.int64)
+        remap = np.full(len(self.alive), -1, dtype=np.int64)
+        remap[old_ids] = np.arange(len(keys))
+        indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        term_parts, doc_parts, tf_parts = [], [], []
+        for segment in self.segments:
+            counts = np.diff(segment.indptr)
+            term_of = np.repeat(np.arange(len(counts)), counts)
+            docs = remap[segment.docs]
+            keep = docs >= 0
+            term_parts.append(term_of[keep])
+            doc_parts.append(docs[keep])
+            tf_parts.append(segment.tfs[keep])
+        term_of = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int64)
+        docs = np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.int64)
+        tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.float32)
+        order = np.lexsort((docs, term_of))
+        np.cumsum(np.bincount(term_of, minlength=len(self.vocab)), out=indptr[1:])
+
+        self.lengths = self.lengths[old_ids]
+        self.alive = np.ones(len(keys), dtype=bool)
+        self.keys = keys
+        self._ids = {key: i for i, key in enumerate(keys)}
+        self.segments = [Segment(indptr, docs[order].astype(np.int32), tfs[order], self.lengths)]
+
+    def _term_postings(self, term_id):
+        # 合并各段中该词的倒排表，返回 (文档号, 词频, 最大词频, 最短文档长度)
+        parts = [segment.postings(term_id) for segment in self.segments]
+        parts = [(segment, docs, tfs) for segment, (docs, tfs) in zip(self.segments, parts) if len(docs)]
+        if not parts:
+            return None
+        if len(parts) == 1:
+            docs, tfs = parts[0][1], parts[0][2]
+        else:
+            docs = np.concatenate([docs for _, docs, _ in parts])
+            tfs = np.concatenate([tfs for _, _, tfs in parts])
+        max_tf = max(float(segment.max_tf[term_id]) for segment, _, _ in parts)
+        min_len = min(float(segment.min_len[term_id]) for segment, _, _ in parts)
+        return docs, tfs, max_tf, min_len
+
+    def search(self, query, limit=20):
+        # 返回按 BM25 得分降序的 [(商品名, 得分), ...]
+        if not self._n_alive:
+            return []
+        avgdl = self._total_length / self._n_alive
+        alive, lengths = self.alive, self.lengths
+
+        terms = []
+        for term_id in {self.vocab[t] for t in query_terms(query) if t in self.vocab}:
+            postings = self._term_postings(term_id)
+            if postings is None:
+                continue
+            docs, tfs, max_tf, min_len = postings
+            idf = float(np.log(1 + (self._n_alive - len(docs) + 0.5) / (len(docs) + 0.5)))
+            upper = idf * max_tf * (K1 + 1) / (max_tf + K1 * (1 - B + B * min_len / avgdl))
+            terms.append((len(docs), idf, upper, docs, tfs))
+        if not terms:
+            return []
+        # 从最稀有的词开始展开
+        terms.sort(key=lambda term: term[0])
+
+        def bm25(idf, tfs, docs):
+            return idf * tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * lengths[docs] / avgdl))
+
+        candidates = np.zeros(0, dtype=np.int32)
+        scores = np.zeros(0, dtype=np.float32)
+        expanded = 0
+        while expanded < len(terms):
+            _, idf, _, docs, tfs = terms[expanded]
+            keep = alive[docs]
+            docs, term_scores = docs[keep], bm25(idf, tfs[keep], docs[keep])
+            if len(candidates) and len(docs):
+                # 候选集无需有序：在该词的倒排表中二分查找，命中的累加，未命中的保留
+                pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+                hit = docs[pos] == candidates
+                term_scores[pos[hit]] += scores[hit]
+                candidates = np.concatenate([docs, candidates[~hit]])
+                scores = np.concatenate([term_scores, scores[~hit]])
+            elif len(docs):
+                candidates, scores = docs, term_scores
+            expanded += 1
+            # 候选集之外的文档最多得到剩余词的上界之和
+            remaining = sum(term[2] for term in terms[expanded:])
+            if len(candidates) >= limit and remaining <= np.partition(scores, -limit)[-limit]:
+                break
+
+        for i in range(expanded, len(terms)):
+            # 部分得分加上剩余上界仍进不了前 k 名的候选直接淘汰，剩余常见词只给留下的候选补分
+            remaining = sum(term[2] for term in terms[i:])
+            if len(candidates) > limit:
+                keep = scores + remaining >= np.partition(scores, -limit)[-limit]
+                candidates, scores = candidates[keep], scores[keep]
+            _, idf, _, docs, tfs = terms[i]
+            pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[pos] == candidates
+            scores[hit] += bm25(idf, tfs[pos[hit]], candidates[hit])
+
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(self.keys[doc_id], float(score)) for doc_id, score in zip(candidates[order].tolist(), scores[order].tolist())]
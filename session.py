@@ -0,0 +1,214 @@
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+# 会话状态外置：登录、购物车、订单等按会话令牌存到共享后端，多个 Streamlit 进程可以接续服务同一用户
+# 浏览器端令牌放在地址栏参数 sid 中（令牌即凭证）；每次运行开始按版本号校验本进程缓存，
+# 版本变化才从后端读取，运行结束时把本次变化的键在一个事务里写回，没有变化不写
+# 环境变量：
+#   SESSION_BACKEND  sqlite（默认，多进程共享）或 memory（单进程替身）
+#   SESSION_DB       SQLite 文件路径，默认 data/session/sessions.db
+
+# 需要外置的会话键（表单控件绑定的键由 Streamlit 自己管理，不在此列）
+PERSISTED_KEYS = (
+    "cart",
+    "orders",
+    "user_logged_in",
+    "username",
+    "user_role",
+    "selected_item",
+    "selected_quantity",
+    "selected_total",
+)
+
+TOKEN_PARAM = "sid"
+DEFAULT_DB = "data/session/sessions.db"
+
+# 超过该天数未访问的会话在启动时清理
+SESSION_TTL_DAYS = 30
+
+# 会话状态里记录 (令牌, 版本, {键: JSON}) 的键，用于判断本次运行改动了哪些键
+_SNAPSHOT_KEY = "_session_snapshot"
+
+_TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{22,64}$")
+
+
+def new_token():
+    return secrets.token_urlsafe(24)
+
+
+def valid_token(token):
+    return isinstance(token, str) and bool(_TOKEN_PATTERN.match(token))
+
+
+def _encode(value):
+    # numpy 标量等按 Python 值保存
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=lambda obj: obj.item() if hasattr(obj, "item") else str(obj))
+
+
+class MemoryBackend:
+    # 进程内替身，接口同 SqliteBackend
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # 令牌 -> [版本, 最后访问时间, {键: JSON}]
+
+    def version(self, token):
+        session = self._sessions.get(token)
+        return session[0] if session else 0
+
+    def load(self, token):
+        with self._lock:
+            session = self._sessions.get(token)
+            return (session[0], dict(session[2])) if session else (0, {})
+
+    def save(self, token, changes, removed):
+        with self._lock:
+            session = self._sessions.setdefault(token, [0, 0.0, {}])
+            session[2].update(changes)
+            for key in removed:
+                session[2].pop(key, None)
+            session[0] += 1
+            session[1] = time.time()
+            return session[0]
+
+    def drop(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def purge(self, before):
+        with self._lock:
+            stale = [token for token, session in self._sessions.items() if session[1] < before]
+            for token in stale:
+                del self._sessions[token]
+            return len(stale)
+
+
+class SqliteBackend:
+    # WAL 模式下读不阻塞写；每个线程一个连接（Streamlit 每个会话在各自线程里运行脚本）
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS session_values (token TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (token, key))")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, token):
+        row = self._connect().execute("SELECT version FROM sessions WHERE token = ?", (token,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, token):
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            version = self.version(token)
+            values = dict(conn.execute("SELECT key, value FROM session_values WHERE token = ?", (token,)).fetchall())
+        finally:
+            conn.execute("COMMIT")
+        return version, values
+
+    def save(self, token, changes, removed):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO session_values (token, key, value) VALUES (?, ?, ?)",
+                             [(token, key, value) for key, value in changes.items()])
+            conn.executemany("DELETE FROM session_values WHERE token = ? AND key = ?", [(token, key) for key in removed])
+            conn.execute("INSERT INTO sessions (token, version, updated) VALUES (?, 1, ?) "
+                         "ON CONFLICT (token) DO UPDATE SET version = version + 1, updated = excluded.updated", (token, time.time()))
+            version = self.version(token)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return version
+
+    def drop(self, token):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM session_values WHERE token = ?", (token,))
+        conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+        conn.execute("COMMIT")
+
+    def purge(self, before):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        stale = [row[0] for row in conn.execute("SELECT token FROM sessions WHERE updated < ?", (before,)).fetchall()]
+        conn.executemany("DELETE FROM session_values WHERE token = ?", [(token,) for token in stale])
+        conn.executemany("DELETE FROM sessions WHERE token = ?", [(token,) for token in stale])
+        conn.execute("COMMIT")
+        return len(stale)
+
+
+class SessionStore:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._cache = {}  # 令牌 -> (版本, {键: JSON})，本进程最近一次读到或写入的内容
+        backend.purge(time.time() - SESSION_TTL_DAYS * 86400)
+
+    @classmethod
+    def from_env(cls):
+        if os.environ.get("SESSION_BACKEND", "sqlite") == "memory":
+            return cls(MemoryBackend())
+        return cls(SqliteBackend(os.environ.get("SESSION_DB", DEFAULT_DB)))
+
+    def _read(self, token):
+        # 读穿缓存：版本号一致直接用本进程缓存，否则从后端读取
+        version = self.backend.version(token)
+        with self._lock:
+            cached = self._cache.get(token)
+        if cached is not None and cached[0] == version:
+            return cached
+        cached = self.backend.load(token)
+        with self._lock:
+            self._cache[token] = cached
+        return cached
+
+    def restore(self, token, state):
+        # 运行开始时调用：后端版本与本会话上次同步的版本相同则什么都不做，否则用后端内容覆盖会话状态
+        snapshot = state.get(_SNAPSHOT_KEY)
+        if snapshot is not None and snapshot[0] == token and snapshot[1] == self.backend.version(token):
+            return
+        version, values = self._read(token)
+        for key, raw in values.items():
+            state[key] = json.loads(raw)
+        state[_SNAPSHOT_KEY] = (token, version, dict(values))
+
+    def rotate(self, token, state):
+        # 登录、退出时调用：换发新令牌并删除旧令牌的记录，防止会话固定；
+        # 会话状态原样保留，本次运行结束时整体写到新令牌下，返回新令牌
+        self.backend.drop(token)
+        with self._lock:
+            self._cache.pop(token, None)
+        token = new_token()
+        state[_SNAPSHOT_KEY] = (token, 0, {})
+        return token
+
+    def persist(self, token, state):
+        # 运行结束时调用：把与快照不同的键一次写回
+        snapshot = state.get(_SNAPSHOT_KEY)
+        known = snapshot[2] if snapshot is not None and snapshot[0] == token else {}
+        current = {key: _encode(state[key]) for key in PERSISTED_KEYS if key in state}
+        changes = {key: raw for key, raw in current.items() if known.get(key) != raw}
+        removed = [key for key in known if key not in current]
+        if not changes and not removed:
+            return False
+        version = self.backend.save(token, changes, removed)
+        with self._lock:
+            self._cache[token] = (version, current)
+        state[_SNAPSHOT_KEY] = (token, version, current)
+        return True
@@ -0,0 +1,367 @@
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from geo import FARM_COORDS
+
+# 农场传感器数据导入：CSV 或 InfluxDB 行协议文件分块流式读取，每块向量化校验、按 (农场, 传感器, 时间) 去重后
+# 追加到 data/telemetry 下的列式日志，同时更新按小时的汇总，监测面板只读汇总，不回扫原始日志
+# 去重键 = 时间(40位) | 农场(16位) | 传感器(8位)，每个导入块的键排好序存为一个有序段，
+# 时间递增导入时各段的键区间互不重叠，新块只需在区间相交的段里二分查找
+
+# 传感器 -> 监测面板列名（与模拟数据的列一致）
+SENSOR_COLUMNS = {
+    "temperature": "温度(°C)",
+    "humidity": "湿度(%)",
+    "light": "光照(lux)",
+    "soil_moisture": "土壤湿度(%)",
+}
+SENSORS = list(SENSOR_COLUMNS)
+
+SENSOR_ALIASES = {
+    "temperature": "temperature", "temp": "temperature", "温度": "temperature", "温度(°C)": "temperature",
+    "humidity": "humidity", "湿度": "humidity", "湿度(%)": "humidity",
+    "light": "light", "illuminance": "light", "光照": "light", "光照(lux)": "light",
+    "soil_moisture": "soil_moisture", "soil": "soil_moisture", "土壤湿度": "soil_moisture", "土壤湿度(%)": "soil_moisture",
+}
+
+# 各传感器的合法取值范围
+VALID_RANGES = {
+    "temperature": (-50.0, 70.0),
+    "humidity": (0.0, 100.0),
+    "light": (0.0, 200000.0),
+    "soil_moisture": (0.0, 100.0),
+}
+
+# CSV 表头别名
+CSV_COLUMNS = {
+    "farm": "farm", "农场": "farm",
+    "sensor": "sensor", "传感器": "sensor",
+    "timestamp": "timestamp", "time": "timestamp", "时间": "timestamp",
+    "value": "value", "数值": "value",
+}
+
+COLUMNS = {
+    "ts": np.int64,       # Unix秒
+    "farm": np.int16,
+    "sensor": np.int8,
+    "value": np.float32,
+}
+
+# 每块读取的行数，决定导入时的内存上限
+CHUNK_ROWS = 200_000
+
+REJECT_REASONS = ["格式错误", "未知农场", "未知传感器", "时间无效", "数值越界"]
+
+_TS_LIMIT = 1 << 40
+_LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+
+def pack_keys(ts, farms, sensors):
+    return (ts.astype(np.int64) << 24) | (farms.astype(np.int64) << 8) | sensors.astype(np.int64)
+
+
+def parse_timestamps(raw):
+    # 数字按量级识别秒/毫秒/微秒/纳秒，字符串按 ISO 8601 解析（不带时区的按本地时间）；无法解析的为 -1
+    numeric = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64)
+    ts = np.full(len(raw), -1, dtype=np.int64)
+    is_number = ~np.isnan(numeric)
+    if is_number.any():
+        values = numeric[is_number]
+        magnitude = np.abs(values)
+        scale = np.select([magnitude >= 1e17, magnitude >= 1e14, magnitude >= 1e11], [1e9, 1e6, 1e3], 1.0)
+        ts[is_number] = np.floor(values / scale).astype(np.int64)
+    if (~is_number).any():
+        text = raw[~is_number].astype(str).str.strip()
+        aware = text.str.contains(r"(?:Z|[+-]\d{2}:?\d{2})$", regex=True).to_numpy()
+        seconds = np.full(len(text), -1, dtype=np.int64)
+        for mask, utc in ((aware, True), (~aware, False)):
+            if not mask.any():
+                continue
+            parsed = pd.to_datetime(text[mask], errors="coerce", format="ISO8601", utc=utc)
+            if not utc:
+                parsed = parsed.dt.tz_localize(_LOCAL_TZ, ambiguous="NaT", nonexistent="NaT")
+            part = parsed.to_numpy(dtype="datetime64[s]").astype(np.int64)
+            part[parsed.isna().to_numpy()] = -1
+            seconds[mask] = part
+        ts[~is_number] = seconds
+    return ts
+
+
+def csv_chunks(source, chunk_rows=CHUNK_ROWS):
+    # 每块返回 (农场, 传感器, 时间, 数值) 四列字符串；没有 sensor 列的宽表按传感器列展开
+    for df in pd.read_csv(source, chunksize=chunk_rows, dtype=str, skipinitialspace=True, on_bad_lines="skip"):
+        df = df.rename(columns=lambda c: CSV_COLUMNS.get(str(c).strip(), SENSOR_ALIASES.get(str(c).strip(), str(c).strip())))
+        if "sensor" not in df.columns:
+            sensor_columns = [c for c in df.columns if c in SENSOR_COLUMNS]
+            df = df.melt(id_vars=[c for c in ("farm", "timestamp") if c in df.columns], value_vars=sensor_columns, var_name="sensor")
+        yield tuple(df[c] if c in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object) for c in ("farm", "sensor", "timestamp", "value"))
+
+
+def line_protocol_chunks(source, chunk_rows=CHUNK_ROWS):
+    # InfluxDB 行协议：measurement,farm=河北农场 temperature=23.5,humidity=61 1735689600000000000
+    # 按空格切成 标签/字段/时间 三列由 C 解析器分块读取；一行可带多个字段，展开成多条读数；缺少时间戳的按导入时间
+    reader = pd.read_csv(
+        source, sep=" ", header=None, names=["tags", "fields", "ts"], dtype=str, chunksize=chunk_rows,
+        comment="#", quoting=csv.QUOTE_NONE, on_bad_lines="skip", encoding="utf-8",
+    )
+    for df in reader:
+        farm = df["tags"].str.extract(r"(?:^|,)farm=([^,]+)", expand=False)
+        fields = df["fields"]
+        if fields.str.contains(",", regex=False).any():
+            fields = fields.str.split(",").explode()
+        pairs = pd.read_csv(
+            io.StringIO("\n".join(fields.fillna("").tolist())), sep="=", header=None, names=["sensor", "value"],
+            dtype=str, quoting=csv.QUOTE_NONE, skip_blank_lines=False, on_bad_lines="skip",
+        )
+        if len(pairs) != len(fields):
+            # 有字段含多个等号时逐行切分，保证与原行对齐
+            pairs = fields.str.split("=", n=1, expand=True).reindex(columns=range(2))
+            pairs.columns = ["sensor", "value"]
+        else:
+            pairs.index = fields.index
+        ts = df["ts"].fillna(str(int(time.time())))
+        yield farm.loc[fields.index], pairs["sensor"], ts.loc[fields.index], pairs["value"].str.rstrip("i")
+
+
+def detect_format(name, head=b""):
+    name = (name or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".lp", ".line", ".influx")):
+        return "lp"
+    first = head.split(b"\n", 1)[0]
+    return "lp" if b"=" in first and b" " in first.strip() else "csv"
+
+
+class TelemetryStore:
+    def __init__(self, path=None, farms=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.farms = list(farms or FARM_COORDS)
+        self._farm_codes = {farm: i for i, farm in enumerate(self.farms)}
+        self._size = 0
+        self.version = 0
+        self.runs = []          # [{"file", "min", "max", "rows"}]，各有序去重键段
+        self._memory_runs = {}  # 无落盘路径时段数据存放在内存
+        self._hour_keys = np.zeros(0, dtype=np.int64)
+        self._hour_sum = np.zeros(0, dtype=np.float64)
+        self._hour_count = np.zeros(0, dtype=np.int64)
+        self._manifest_mtime = None
+        if path:
+            os.makedirs(os.path.join(path, "keys"), exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return self._size
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        manifest = self._file("manifest.json")
+        if os.path.exists(manifest):
+            self._manifest_mtime = os.stat(manifest).st_mtime_ns
+            with open(manifest, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self._size = saved["size"]
+            self.runs = saved["runs"]
+            self.version = saved["version"]
+        rollup = self._file("hourly.npz")
+        if os.path.exists(rollup):
+            with np.load(rollup) as data:
+                self._hour_keys, self._hour_sum, self._hour_count = data["keys"], data["sum"], data["count"]
+
+    def _save(self):
+        np.savez(self._file("hourly.tmp.npz"), keys=self._hour_keys, sum=self._hour_sum, count=self._hour_count)
+        os.replace(self._file("hourly.tmp.npz"), self._file("hourly.npz"))
+        with open(self._file("manifest.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"size": self._size, "runs": self.runs, "version": self.version}, f)
+        os.replace(self._file("manifest.json.tmp"), self._file("manifest.json"))
+        self._manifest_mtime = os.stat(self._file("manifest.json")).st_mtime_ns
+
+    def _refresh(self):
+        # 其他进程（如 python telemetry.py 命令行导入）写过清单时重新读取段列表与小时汇总，调用方持锁
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self._file("manifest.json")).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            self._load()
+
+    def _run_keys(self, run):
+        if not self.path:
+            return self._memory_runs[run["file"]]
+        return np.load(self._file(run["file"]), mmap_mode="r")
+
+    def _write_run(self, name, keys):
+        if not self.path:
+            self._memory_runs[name] = keys
+            return
+        np.save(self._file(name + ".tmp.npy"), keys)
+        os.replace(self._file(name + ".tmp.npy"), self._file(name))
+
+    def validate(self, farm, sensor, ts_raw, value_raw):
+        # 返回 (农场编码, 传感器编码, 时间, 数值, {拒绝原因: 行数})，每行只计第一个不通过的原因
+        farm = farm.astype(object).str.strip()
+        sensor_raw = sensor.astype(object).str.strip()
+        sensor = sensor_raw.map(SENSOR_ALIASES)
+        values = pd.to_numeric(value_raw, errors="coerce").to_numpy(dtype=np.float64)
+        farm_codes = farm.map(self._farm_codes).to_numpy(dtype=np.float64)
+        sensor_codes = sensor.map({name: i for i, name in enumerate(SENSORS)}).to_numpy(dtype=np.float64)
+        ts = parse_timestamps(ts_raw)
+
+        low = np.array([VALID_RANGES[name][0] for name in SENSORS])
+        high = np.array([VALID_RANGES[name][1] for name in SENSORS])
+        known_sensor = ~np.isnan(sensor_codes)
+        safe_sensor = np.where(known_sensor, sensor_codes, 0).astype(np.int64)
+        checks = [
+            farm.isna().to_numpy() | sensor_raw.isna().to_numpy() | np.isnan(values),
+            np.isnan(farm_codes),
+            ~known_sensor,
+            (ts < 0) | (ts >= _TS_LIMIT),
+            (values < low[safe_sensor]) | (values > high[safe_sensor]),
+        ]
+        rejected = {}
+        ok = np.ones(len(values), dtype=bool)
+        for reason, bad in zip(REJECT_REASONS, checks):
+            bad = bad & ok
+            rejected[reason] = int(bad.sum())
+            ok &= ~bad
+        return farm_codes[ok].astype(np.int16), sensor_codes[ok].astype(np.int8), ts[ok], values[ok].astype(np.float32), rejected
+
+    def append(self, farms, sensors, ts, values):
+        # 去重后追加一批读数，返回 (写入行数, 重复行数)
+        keys = pack_keys(ts, farms, sensors)
+        unique_keys, first = np.unique(keys, return_index=True)
+        with self._lock:
+            self._refresh()
+            fresh = np.ones(len(unique_keys), dtype=bool)
+            if len(unique_keys):
+                low, high = int(unique_keys[0]), int(unique_keys[-1])
+                for run in self.runs:
+                    if run["max"] < low or run["min"] > high:
+                        continue
+                    run_keys = self._run_keys(run)
+                    pos = np.minimum(np.searchsorted(run_keys, unique_keys), len(run_keys) - 1)
+                    fresh &= run_keys[pos] != unique_keys
+            keep = np.sort(first[fresh])
+            new_keys = unique_keys[fresh]
+            duplicates = len(keys) - len(keep)
+            if not len(keep):
+                return 0, duplicates
+
+            columns = {"ts": ts[keep], "farm": farms[keep], "sensor": sensors[keep], "value": values[keep]}
+            if self.path:
+                for name, dtype in COLUMNS.items():
+                    with open(self._file(f"{name}.bin"), "ab") as f:
+                        columns[name].astype(dtype).tofile(f)
+            self._size += len(keep)
+
+            last = self.runs[-1] if self.runs else None
+            if last is not None and last["max"] < int(new_keys[0]) and last["rows"] < CHUNK_ROWS:
+                # 按时间顺序的小批量导入接到上一段末尾，避免产生大量小段
+                merged = np.concatenate([np.asarray(self._run_keys(last)), new_keys])
+                self._write_run(last["file"], merged)
+                last.update(max=int(new_keys[-1]), rows=len(merged))
+            else:
+                # 段文件以首个键命名：新键都不在已有段中，名称不会与已有段（包括其他进程写的段）重复
+                name = f"keys/run-{int(new_keys[0]):016x}.npy"
+                self._write_run(name, new_keys)
+                self.runs.append({"file": name, "min": int(new_keys[0]), "max": int(new_keys[-1]), "rows": len(new_keys)})
+            self._rollup(columns)
+            self.version += 1
+            if self.path:
+                self._save()
+            return len(keep), duplicates
+
+    def _rollup(self, columns):
+        # 按 (小时, 农场, 传感器) 累加和与次数，与已有汇总合并
+        hour_keys = pack_keys(columns["ts"] // 3600, columns["farm"], columns["sensor"])
+        keys, inverse = np.unique(np.concatenate([self._hour_keys, hour_keys]), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate([self._hour_sum, columns["value"].astype(np.float64)]), minlength=len(keys))
+        counts = np.bincount(inverse, weights=np.concatenate([self._hour_count, np.ones(len(hour_keys), dtype=np.int64)]), minlength=len(keys))
+        self._hour_keys, self._hour_sum, self._hour_count = keys, sums, counts.astype(np.int64)
+
+    def import_stream(self, source, fmt="csv", chunk_rows=CHUNK_ROWS):
+        # 分块读取、校验、去重、追加，返回导入报告
+        start = time.perf_counter()
+        report = {"rows": 0, "accepted": 0, "duplicates": 0, "rejected": dict.fromkeys(REJECT_REASONS, 0)}
+        chunks = csv_chunks(source, chunk_rows) if fmt == "csv" else line_protocol_chunks(source, chunk_rows)
+        for farm, sensor, ts_raw, value_raw in chunks:
+            farms, sensors, ts, values, rejected = self.validate(farm, sensor, ts_raw, value_raw)
+            accepted, duplicates = self.append(farms, sensors, ts, values)
+            report["rows"] += len(farm)
+            report["accepted"] += accepted
+            report["duplicates"] += duplicates
+            for reason, count in rejected.items():
+                report["rejected"][reason] += count
+        report["seconds"] = time.perf_counter() - start
+        report["rows_per_second"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        return report
+
+    def import_file(self, file, name=None, chunk_rows=CHUNK_ROWS):
+        # file: 路径或二进制文件对象（例如上传的文件）
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                return self.import_file(f, name or file, chunk_rows)
+        fmt = detect_format(name or getattr(file, "name", ""), file.peek(256) if hasattr(file, "peek") else file.read(256))
+        if hasattr(file, "seek"):
+            file.seek(0)
+        return self.import_stream(file, fmt, chunk_rows)
+
+    def hourly(self, farm, hours=24):
+        # 该农场最近 hours 小时（截至最新导入的小时）的小时均值，缺失为 NaN；没有导入数据时返回空表
+        code = self._farm_codes.get(farm)
+        with self._lock:
+            self._refresh()
+            keys, all_sums, all_counts = self._hour_keys, self._hour_sum, self._hour_count
+        if code is None or not len(keys):
+            return pd.DataFrame()
+        mine = ((keys >> 8) & 0xFFFF) == code
+        if not mine.any():
+            return pd.DataFrame()
+        keys, sums, counts = keys[mine], all_sums[mine], all_counts[mine]
+        hour = keys >> 24
+        latest = int(hour.max())
+        recent = hour > latest - hours
+        grid = np.full((hours, len(SENSORS)), np.nan)
+        grid[hour[recent] - (latest - hours + 1), keys[recent] & 0xFF] = sums[recent] / counts[recent]
+        times = pd.to_datetime((np.arange(latest - hours + 1, latest + 1)) * 3600, unit="s", utc=True).tz_convert(_LOCAL_TZ).tz_localize(None)
+        frame = pd.DataFrame(grid, columns=[SENSOR_COLUMNS[name] for name in SENSORS])
+        frame.insert(0, "时间", times)
+        return frame
+
+
+def overlay(simulated, imported):
+    # 有导入数据的传感器用导入的小时均值（缺失小时插值），其余列沿用模拟数据
+    if imported is None or imported.empty:
+        return simulated
+    frame = imported.copy()
+    for column in SENSOR_COLUMNS.values():
+        if frame[column].notna().any():
+            frame[column] = frame[column].interpolate(limit_direction="both")
+        else:
+            frame[column] = simulated[column].to_numpy()
+    return frame
+
+
+if __name__ == "__main__":
+    # 导入传感器数据文件：python telemetry.py 文件 [数据目录]
+    store = TelemetryStore(sys.argv[2] if len(sys.argv) > 2 else "data/telemetry")
+    report = store.import_file(sys.argv[1])
+    print(f"读取 {report['rows']:,} 行，写入 {report['accepted']:,} 行，重复 {report['duplicates']:,} 行，"
+          f"耗时 {report['seconds']:.1f}s（{report['rows_per_second']:,.0f} 行/秒）")
+    for reason, count in report["rejected"].items():
+        if count:
+            print(f"  拒绝（{reason}）：{count:,} 行")
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from plots import PLOT_SHAPES
+
+# 认种产量与价值预估：按 农场 x 作物 x 地块面积 一次性向量化计算
+# 产量 = 单位面积基础产量 x 面积 x 积温系数 x 土壤湿度系数，区间宽度由作物波动和传感器波动决定
+
+SEASON_DAYS = 90
+PLOT_AREAS = np.array([h * w * 5 for h, w in PLOT_SHAPES.values()], dtype=float)
+
+# 各季节相对当前监测温度的气温修正（°C）
+SEASON_TEMP_SHIFT = {"春季": -3.0, "夏季": 4.0, "秋季": -1.0}
+
+# 作物参数：种植季节、单位面积基础产量(kg/㎡/季)、生长基温(°C)、
+# 整季所需积温(°C·天)、适宜土壤湿度区间(%)、产量波动系数、无商品价时的参考价(¥/kg)、对应商品名
+CROP_PARAMS = {
+    "菠菜": ("春季", 3.0, 4.0, 900, (55, 70), 0.15, 12, "有机菠菜"),
+    "生菜": ("春季", 3.2, 4.0, 800, (60, 75), 0.15, 10, None),
+    "胡萝卜": ("春季", 3.5, 5.0, 1100, (55, 70), 0.12, 8, "山区胡萝卜"),
+    "草莓": ("春季", 1.5, 5.0, 1200, (60, 75), 0.20, 40, None),
+    "西红柿": ("夏季", 5.0, 10.0, 1400, (60, 75), 0.18, 16, "生态西红柿"),
+    "黄瓜": ("夏季", 5.5, 12.0, 1100, (65, 80), 0.18, 10, None),
+    "茄子": ("夏季", 4.0, 12.0, 1400, (60, 75), 0.15, 14, "紫皮茄子"),
+    "辣椒": ("夏季", 2.5, 12.0, 1500, (55, 70), 0.20, 12, "新鲜辣椒"),
+    "白菜": ("秋季", 5.0, 5.0, 1000, (60, 75), 0.12, 12, "有机白菜"),
+    "萝卜": ("秋季", 4.5, 5.0, 900, (55, 70), 0.12, 6, None),
+    "南瓜": ("秋季", 4.0, 10.0, 1300, (50, 65), 0.20, 6, None),
+    "土豆": ("秋季", 3.5, 7.0, 1100, (55, 70), 0.15, 10, "新鲜土豆"),
+}
+
+
+def crops_for_season(season):
+    return [crop for crop, params in CROP_PARAMS.items() if params[0] == season]
+
+
+def crop_prices(catalog_prices):
+    # 用商城当前价格（¥/斤）为作物定价（¥/kg），商城没有的作物用参考价
+    return np.array([
+        catalog_prices[params[7]] * 2 if params[7] in catalog_prices else params[6]
+        for params in CROP_PARAMS.values()
+    ], dtype=float)
+
+
+def estimate_all(telemetry, catalog_prices):
+    # telemetry: {农场: DataFrame(含 温度(°C)、土壤湿度(%) 列)}
+    # 返回索引为 (农场, 作物, 面积) 的 DataFrame，包含产量和价值上下限
+    farms = list(telemetry)
+    crops = list(CROP_PARAMS)
+    params = list(CROP_PARAMS.values())
+
+    temps = np.array([df["温度(°C)"].to_numpy(dtype=float) for df in telemetry.values()])       # (F, H)
+    soil = np.array([df["土壤湿度(%)"].to_numpy(dtype=float) for df in telemetry.values()])     # (F, H)
+
+    seasons = [p[0] for p in params]
+    base_yield = np.array([p[1] for p in params])                                               # (C,)
+    base_temp = np.array([p[2] for p in params])
+    gdd_required = np.array([p[3] for p in params], dtype=float)
+    soil_low = np.array([p[4][0] for p in params], dtype=float)
+    soil_high = np.array([p[4][1] for p in params], dtype=float)
+    crop_cv = np.array([p[5] for p in params])
+    temp_shift = np.array([SEASON_TEMP_SHIFT[s] for s in seasons])
+
+    # 积温：每小时超出基温的部分折算为日均，再乘以整季天数
+    hourly = temps[:, None, :] + temp_shift[None, :, None] - base_temp[None, :, None]        # (F, C, H)
+    gdd = np.clip(hourly, 0, None).mean(axis=2) * SEASON_DAYS                                  # (F, C)
+    gdd_factor = np.clip(gdd / gdd_required, 0.5, 1.1)
+
+    # 土壤湿度：偏离适宜区间越远，减产越多
+    soil_mean = soil.mean(axis=1)[:, None]                                                     # (F, 1)
+    deviation = np.maximum(soil_low - soil_mean, 0) + np.maximum(soil_mean - soil_high, 0)
+    soil_factor = np.clip(1 - deviation / (soil_high - soil_low), 0.6, 1.0)                    # (F, C)
+
+    # 传感器波动越大，预估区间越宽
+    soil_cv = (soil.std(axis=1) / np.maximum(soil.mean(axis=1), 1))[:, None]
+    spread = crop_cv[None, :] + soil_cv                                                        # (F, C)
+
+    expected = (base_yield * gdd_factor * soil_factor)[:, :, None] * PLOT_AREAS[None, None, :]  # (F, C, S)
+    yield_low = expected * (1 - spread)[:, :, None]
+    yield_high = expected * (1 + spread)[:, :, None]
+    prices = crop_prices(catalog_prices)[None, :, None]
+
+    index = pd.MultiIndex.from_product([farms, crops, list(PLOT_SHAPES)], names=["农场", "作物", "面积"])
+    return pd.DataFrame({
+        "yield_low": yield_low.ravel(),
+        "yield_high": yield_high.ravel(),
+        "value_low": (yield_low * prices).ravel(),
+        "value_high": (yield_high * prices).ravel(),
+    }, index=index)
+
+
+def format_quote(row):
+    # 展示格式与原先一致："15-20kg"、"¥300-400"
+    return (
+        f"{row['yield_low']:.0f}-{row['yield_high']:.0f}kg",
+        f"¥{row['value_low']:.0f}-{row['value_high']:.0f}",
+    )